@@ -0,0 +1,66 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.core.database import Base, engine
+import app.models.database_models  # noqa: F401 - registers the models on Base.metadata
+
+config = context.config
+
+# Logging is left alone when migrations run inside the app (see create_tables)
+if config.config_file_name is not None and "connection" not in config.attributes:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Leave the search index objects created by raw SQL in 0005 and 0008 out of autogenerate"""
+    if type_ == "table" and name.startswith("qr_designs_fts"):
+        return False
+    if type_ == "column" and name in ("search_vector", "search_rowid"):
+        return False
+    if type_ == "index" and name in ("ix_qr_designs_search", "ix_qr_designs_search_rowid"):
+        return False
+    return True
+
+def run_migrations_offline():
+    """Emit migration SQL for the configured database URL without connecting"""
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    """Run migrations on the app's engine, or on a connection handed in by create_tables"""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+
+    with engine.connect() as connection:
+        _run(connection)
+        connection.commit()
+
+def _run(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        # SQLite cannot alter most constraints in place
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,84 @@
+"""baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "qr_designs",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("title", sa.String(length=255), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("qr_type", sa.String(length=50), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=True),
+        sa.Column("error_correction", sa.String(length=10), nullable=True),
+        sa.Column("border", sa.Integer(), nullable=True),
+        sa.Column("foreground_color", sa.String(length=7), nullable=True),
+        sa.Column("background_color", sa.String(length=7), nullable=True),
+        sa.Column("logo_url", sa.String(length=500), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "content_data",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("qr_design_id", sa.String(), nullable=False),
+        sa.Column("content_type", sa.String(length=50), nullable=False),
+        sa.Column("text_content", sa.Text(), nullable=True),
+        sa.Column("image_filename", sa.String(length=255), nullable=True),
+        sa.Column("image_path", sa.String(length=500), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["qr_design_id"], ["qr_designs.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "design_images",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("qr_design_id", sa.String(), nullable=False),
+        sa.Column("filename", sa.String(length=255), nullable=False),
+        sa.Column("original_filename", sa.String(length=255), nullable=False),
+        sa.Column("file_path", sa.String(length=500), nullable=False),
+        sa.Column("file_size", sa.Integer(), nullable=False),
+        sa.Column("mime_type", sa.String(length=100), nullable=False),
+        sa.Column("image_data", sa.LargeBinary(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["qr_design_id"], ["qr_designs.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "qr_code_usage",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("qr_design_id", sa.String(), nullable=False),
+        sa.Column("scanned_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("ip_address", sa.String(length=45), nullable=True),
+        sa.Column("user_agent", sa.String(length=500), nullable=True),
+        sa.Column("referrer", sa.String(length=500), nullable=True),
+        sa.Column("location", sa.String(length=100), nullable=True),
+        sa.ForeignKeyConstraint(["qr_design_id"], ["qr_designs.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("qr_code_usage")
+    op.drop_table("design_images")
+    op.drop_table("content_data")
+    op.drop_table("qr_designs")
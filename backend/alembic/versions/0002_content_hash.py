@@ -0,0 +1,29 @@
+"""shared text images: content_data.content_hash
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("content_data", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    op.create_index("ix_content_data_content_hash", "content_data", ["content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_content_data_content_hash", table_name="content_data")
+    with op.batch_alter_table("content_data") as batch_op:
+        batch_op.drop_column("content_hash")
@@ -0,0 +1,58 @@
+"""usage rollup tables
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "qr_usage_rollups",
+        sa.Column("qr_design_id", sa.String(), nullable=False),
+        sa.Column("period", sa.String(length=8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("scans", sa.Integer(), nullable=False),
+        sa.Column("unique_ips", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["qr_design_id"], ["qr_designs.id"]),
+        sa.PrimaryKeyConstraint("qr_design_id", "period", "bucket_start"),
+    )
+    op.create_table(
+        "qr_usage_rollup_visitors",
+        sa.Column("qr_design_id", sa.String(), nullable=False),
+        sa.Column("period", sa.String(length=8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("ip_hash", sa.String(length=32), nullable=False),
+        sa.ForeignKeyConstraint(["qr_design_id"], ["qr_designs.id"]),
+        sa.PrimaryKeyConstraint("qr_design_id", "period", "bucket_start", "ip_hash"),
+    )
+    op.create_table(
+        "qr_usage_rollup_referrers",
+        sa.Column("qr_design_id", sa.String(), nullable=False),
+        sa.Column("period", sa.String(length=8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("referrer", sa.String(length=255), nullable=False),
+        sa.Column("scans", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["qr_design_id"], ["qr_designs.id"]),
+        sa.PrimaryKeyConstraint("qr_design_id", "period", "bucket_start", "referrer"),
+    )
+    op.create_index("ix_qr_code_usage_design_scanned", "qr_code_usage", ["qr_design_id", "scanned_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_qr_code_usage_design_scanned", table_name="qr_code_usage")
+    op.drop_table("qr_usage_rollup_referrers")
+    op.drop_table("qr_usage_rollup_visitors")
+    op.drop_table("qr_usage_rollups")
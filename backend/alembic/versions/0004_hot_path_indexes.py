@@ -0,0 +1,37 @@
+"""indexes for DatabaseService lookups
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Active designs, newest first
+    op.create_index("ix_qr_designs_active_created", "qr_designs", ["is_active", "created_at"])
+    # Content and images of one design
+    op.create_index("ix_content_data_qr_design_id", "content_data", ["qr_design_id"])
+    op.create_index("ix_design_images_qr_design_id", "design_images", ["qr_design_id"])
+    # Blob reference counts and text image lookups by file name
+    op.create_index("ix_content_data_image_filename", "content_data", ["image_filename"])
+    op.create_index("ix_design_images_filename", "design_images", ["filename"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_design_images_filename", table_name="design_images")
+    op.drop_index("ix_content_data_image_filename", table_name="content_data")
+    op.drop_index("ix_design_images_qr_design_id", table_name="design_images")
+    op.drop_index("ix_content_data_qr_design_id", table_name="content_data")
+    op.drop_index("ix_qr_designs_active_created", table_name="qr_designs")
@@ -0,0 +1,106 @@
+"""full-text search over active designs
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+SQLite gets an external-content FTS5 table kept in sync by triggers;
+PostgreSQL gets a generated tsvector column with a partial GIN index. Other
+databases keep using substring search.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE qr_designs_fts USING fts5(
+        title, description, content,
+        content='qr_designs', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    # Only active designs are indexed; soft deletes and restores are updates
+    """
+    CREATE TRIGGER qr_designs_fts_insert AFTER INSERT ON qr_designs
+    WHEN new.is_active BEGIN
+        INSERT INTO qr_designs_fts(rowid, title, description, content)
+        VALUES (new.rowid, new.title, new.description, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER qr_designs_fts_delete AFTER DELETE ON qr_designs
+    WHEN old.is_active BEGIN
+        INSERT INTO qr_designs_fts(qr_designs_fts, rowid, title, description, content)
+        VALUES ('delete', old.rowid, old.title, old.description, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER qr_designs_fts_update AFTER UPDATE OF title, description, content, is_active ON qr_designs
+    BEGIN
+        INSERT INTO qr_designs_fts(qr_designs_fts, rowid, title, description, content)
+        SELECT 'delete', old.rowid, old.title, old.description, old.content WHERE old.is_active;
+        INSERT INTO qr_designs_fts(rowid, title, description, content)
+        SELECT new.rowid, new.title, new.description, new.content WHERE new.is_active;
+    END
+    """,
+    """
+    INSERT INTO qr_designs_fts(rowid, title, description, content)
+    SELECT rowid, title, description, content FROM qr_designs WHERE is_active
+    """,
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS qr_designs_fts_update",
+    "DROP TRIGGER IF EXISTS qr_designs_fts_delete",
+    "DROP TRIGGER IF EXISTS qr_designs_fts_insert",
+    "DROP TABLE IF EXISTS qr_designs_fts",
+]
+
+# Titles weigh most, then descriptions, then the encoded content
+POSTGRESQL_UPGRADE = [
+    """
+    ALTER TABLE qr_designs ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(content, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX ix_qr_designs_search ON qr_designs USING gin (search_vector) WHERE is_active",
+]
+
+POSTGRESQL_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_qr_designs_search",
+    "ALTER TABLE qr_designs DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _execute(statements) -> None:
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _execute(SQLITE_UPGRADE)
+    elif dialect == "postgresql":
+        _execute(POSTGRESQL_UPGRADE)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _execute(SQLITE_DOWNGRADE)
+    elif dialect == "postgresql":
+        _execute(POSTGRESQL_DOWNGRADE)
@@ -0,0 +1,31 @@
+"""include id in the active design listing index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+
+Listings are ordered and paged by (created_at, id), so the index carries id
+as a tie-breaker.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index("ix_qr_designs_active_created", table_name="qr_designs")
+    op.create_index("ix_qr_designs_active_created", "qr_designs", ["is_active", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_qr_designs_active_created", table_name="qr_designs")
+    op.create_index("ix_qr_designs_active_created", "qr_designs", ["is_active", "created_at"])
@@ -0,0 +1,40 @@
+"""text image captions: content_data.image_title, image_description
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:00
+
+Text images are named by a hash that covers the title and description they
+were drawn with, so those are kept on the content row for re-renders instead
+of being read from the design, which can be edited. Existing rows take the
+design's current values, the best record available.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("content_data", sa.Column("image_title", sa.String(length=255), nullable=True))
+    op.add_column("content_data", sa.Column("image_description", sa.Text(), nullable=True))
+    op.execute("""
+        UPDATE content_data SET
+            image_title = (SELECT title FROM qr_designs WHERE qr_designs.id = content_data.qr_design_id),
+            image_description = (SELECT description FROM qr_designs WHERE qr_designs.id = content_data.qr_design_id)
+        WHERE image_filename LIKE '%\\_text.png' ESCAPE '\\'
+    """)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("content_data") as batch_op:
+        batch_op.drop_column("image_description")
+        batch_op.drop_column("image_title")
@@ -0,0 +1,130 @@
+"""key the SQLite design search index on an explicit integer column
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:00
+
+qr_designs has a string primary key, so its rowid is implicit and VACUUM may
+renumber it, leaving qr_designs_fts pointing at the wrong designs. The index
+is now keyed on qr_designs.search_rowid, an ordinary column the insert
+trigger fills in, which VACUUM keeps. PostgreSQL is unaffected.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+DROP_SEARCH_INDEX = [
+    "DROP TRIGGER IF EXISTS qr_designs_fts_update",
+    "DROP TRIGGER IF EXISTS qr_designs_fts_delete",
+    "DROP TRIGGER IF EXISTS qr_designs_fts_insert",
+    "DROP TABLE IF EXISTS qr_designs_fts",
+]
+
+SQLITE_UPGRADE = DROP_SEARCH_INDEX + [
+    "ALTER TABLE qr_designs ADD COLUMN search_rowid INTEGER",
+    "UPDATE qr_designs SET search_rowid = rowid",
+    "CREATE UNIQUE INDEX ix_qr_designs_search_rowid ON qr_designs (search_rowid)",
+    """
+    CREATE VIRTUAL TABLE qr_designs_fts USING fts5(
+        title, description, content,
+        content='qr_designs', content_rowid='search_rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    # New designs take the next search_rowid; writes to SQLite are serialized,
+    # so max() + 1 cannot be handed out twice. Only active designs are indexed
+    """
+    CREATE TRIGGER qr_designs_fts_insert AFTER INSERT ON qr_designs BEGIN
+        UPDATE qr_designs SET search_rowid = (SELECT coalesce(max(search_rowid), 0) + 1 FROM qr_designs)
+        WHERE id = new.id AND search_rowid IS NULL;
+        INSERT INTO qr_designs_fts(rowid, title, description, content)
+        SELECT search_rowid, title, description, content FROM qr_designs WHERE id = new.id AND is_active;
+    END
+    """,
+    """
+    CREATE TRIGGER qr_designs_fts_delete AFTER DELETE ON qr_designs
+    WHEN old.is_active BEGIN
+        INSERT INTO qr_designs_fts(qr_designs_fts, rowid, title, description, content)
+        VALUES ('delete', old.search_rowid, old.title, old.description, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER qr_designs_fts_update AFTER UPDATE OF title, description, content, is_active ON qr_designs
+    BEGIN
+        INSERT INTO qr_designs_fts(qr_designs_fts, rowid, title, description, content)
+        SELECT 'delete', old.search_rowid, old.title, old.description, old.content WHERE old.is_active;
+        INSERT INTO qr_designs_fts(rowid, title, description, content)
+        SELECT new.search_rowid, new.title, new.description, new.content WHERE new.is_active;
+    END
+    """,
+    """
+    INSERT INTO qr_designs_fts(rowid, title, description, content)
+    SELECT search_rowid, title, description, content FROM qr_designs WHERE is_active
+    """,
+]
+
+# The 0005 index, keyed on the implicit rowid
+SQLITE_DOWNGRADE = DROP_SEARCH_INDEX + [
+    """
+    CREATE VIRTUAL TABLE qr_designs_fts USING fts5(
+        title, description, content,
+        content='qr_designs', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER qr_designs_fts_insert AFTER INSERT ON qr_designs
+    WHEN new.is_active BEGIN
+        INSERT INTO qr_designs_fts(rowid, title, description, content)
+        VALUES (new.rowid, new.title, new.description, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER qr_designs_fts_delete AFTER DELETE ON qr_designs
+    WHEN old.is_active BEGIN
+        INSERT INTO qr_designs_fts(qr_designs_fts, rowid, title, description, content)
+        VALUES ('delete', old.rowid, old.title, old.description, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER qr_designs_fts_update AFTER UPDATE OF title, description, content, is_active ON qr_designs
+    BEGIN
+        INSERT INTO qr_designs_fts(qr_designs_fts, rowid, title, description, content)
+        SELECT 'delete', old.rowid, old.title, old.description, old.content WHERE old.is_active;
+        INSERT INTO qr_designs_fts(rowid, title, description, content)
+        SELECT new.rowid, new.title, new.description, new.content WHERE new.is_active;
+    END
+    """,
+    """
+    INSERT INTO qr_designs_fts(rowid, title, description, content)
+    SELECT rowid, title, description, content FROM qr_designs WHERE is_active
+    """,
+]
+
+
+def _execute(statements) -> None:
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        _execute(SQLITE_UPGRADE)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        _execute(SQLITE_DOWNGRADE)
+        op.drop_index("ix_qr_designs_search_rowid", table_name="qr_designs")
+        with op.batch_alter_table("qr_designs") as batch_op:
+            batch_op.drop_column("search_rowid")
@@ -0,0 +1,29 @@
+"""index qr_designs.logo_url
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 00:00:00
+
+Uploaded blobs are only deleted once no row references them, and design
+logos are one of those references.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_qr_designs_logo_url", "qr_designs", ["logo_url"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_qr_designs_logo_url", table_name="qr_designs")
@@ -1,50 +1,101 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Request
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Request, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, Response, FileResponse
 from fastapi.staticfiles import StaticFiles
 from typing import Optional, List
+import asyncio
+import io
+import json
+import mimetypes
+from datetime import datetime
 from sqlalchemy.orm import Session
 from app.models.qr_models import (
-    QRCodeRequest, QRCodeResponse, AISuggestionRequest, AISuggestionResponse, QRContentDisplay
+    QRCodeRequest, QRCodeResponse, AISuggestionRequest, AISuggestionResponse, QRContentDisplay,
+    QRBatchRequest, OutputFormat, OutputProfile, PrintSheetRequest
 )
 from app.services.qr_service import QRCodeService
 from app.services.ai_service import AIService
 from app.services.content_service import ContentService
 from app.services.database_service import DatabaseService
+from app.services.batch_service import BatchService
+from app.services.preview_service import PreviewService
+from app.services.print_sheet_service import PrintSheetService
+from app.services.render_executor import render_executor, RenderQueueFull
+from app.services.blob_store import upload_store
+from app.services.scan_event_queue import scan_event_queue
 from app.core.database import get_db
+from app.core.config import settings
 
 # Create routers
 qr_router = APIRouter()
 ai_router = APIRouter()
 content_router = APIRouter()
+media_router = APIRouter()
 
 # Initialize services
 qr_service = QRCodeService()
 ai_service = AIService()
 content_service = ContentService()
 db_service = DatabaseService()
+batch_service = BatchService()
+preview_service = PreviewService(qr_service)
+print_sheet_service = PrintSheetService(qr_service)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+def _design_image_url(design_id: str, request: QRCodeRequest, render_key: str) -> str:
+    """Versioned URL of a design's rendered image"""
+    image_format = getattr(request.format, "value", request.format)
+    url = f"{settings.API_V1_STR}/qr/designs/{design_id}/image.{image_format}?v={render_key}"
+    # Encoding options are not stored on the design, so they travel in the URL
+    if request.output_profile:
+        url += f"&profile={getattr(request.output_profile, 'value', request.output_profile)}"
+    if request.compression_level is not None:
+        url += f"&compression_level={request.compression_level}"
+    return url
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
 
 @qr_router.post("/generate", response_model=QRCodeResponse)
-async def generate_qr_code(request: QRCodeRequest, db: Session = Depends(get_db)):
+async def generate_qr_code(
+    request: QRCodeRequest,
+    return_mode: str = Query("data", alias="return", pattern="^(data|url)$"),
+    db: Session = Depends(get_db)
+):
     """Generate a QR code with the specified parameters"""
     try:
         # Validate content
         if not request.content.strip():
             raise HTTPException(status_code=400, detail="Content cannot be empty")
         
-        # Save QR design to database
-        qr_design = db_service.create_qr_design(db, request)
-        qr_id = qr_design.id
+        # Save the QR design and, for content type, its content data in one transaction
+        with db_service.unit_of_work(db):
+            qr_design = db_service.create_qr_design(db, request)
+            qr_id = qr_design.id
+            
+            if request.qr_type == "content":
+                await content_service.save_content(
+                    content=request.content,
+                    qr_type=request.qr_type,
+                    title=request.title,
+                    description=request.description,
+                    db=db,
+                    qr_id=qr_id
+                )
         
-        # For content type, save content data
         if request.qr_type == "content":
-            await content_service.save_content(
-                content=request.content,
-                qr_type=request.qr_type,
-                title=request.title,
-                description=request.description,
-                db=db
-            )
-            
             # Get the content data to find image URL
             content_data = content_service.get_content(qr_id, db)
             image_url = content_data.image_url if content_data else None
@@ -52,7 +103,11 @@ async def generate_qr_code(request: QRCodeRequest, db: Session = Depends(get_db)
             image_url = None
         
         # Generate QR code
-        result = qr_service.generate_qr_code(request, qr_id, image_url)
+        # With return=url only the symbol is encoded; the image endpoint
+        # renders and caches the image on first fetch
+        result = await qr_service.generate_qr_code_async(
+            request, qr_id, image_url, include_data=return_mode != "url"
+        )
         
         if result["success"]:
             return QRCodeResponse(
@@ -60,6 +115,7 @@ async def generate_qr_code(request: QRCodeRequest, db: Session = Depends(get_db)
                 qr_code_data=result["qr_code_data"],
                 qr_id=qr_id,
                 view_url=result.get("view_url"),
+                image_url=_design_image_url(qr_id, request, result["render_key"]),
                 metadata=result["metadata"]
             )
         else:
@@ -67,6 +123,8 @@ async def generate_qr_code(request: QRCodeRequest, db: Session = Depends(get_db)
             
     except HTTPException:
         raise
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate QR code: {str(e)}")
 
@@ -93,26 +151,27 @@ async def generate_qr_code_with_image(
             description=description
         )
         
-        # Save QR design to database
-        qr_design = db_service.create_qr_design(db, qr_request)
-        qr_id = qr_design.id
-        
-        # Save content with image
-        await content_service.save_content(
-            content=content,
-            qr_type=qr_type,
-            title=title,
-            description=description,
-            image_file=image_file,
-            db=db
-        )
+        # Save the QR design, its content and image in one transaction
+        with db_service.unit_of_work(db):
+            qr_design = db_service.create_qr_design(db, qr_request)
+            qr_id = qr_design.id
+            
+            await content_service.save_content(
+                content=content,
+                qr_type=qr_type,
+                title=title,
+                description=description,
+                image_file=image_file,
+                db=db,
+                qr_id=qr_id
+            )
         
         # Get the content data to find image URL
         content_data = content_service.get_content(qr_id, db)
         image_url = content_data.image_url if content_data else None
         
         # Generate QR code
-        result = qr_service.generate_qr_code(qr_request, qr_id, image_url)
+        result = await qr_service.generate_qr_code_async(qr_request, qr_id, image_url)
         
         if result["success"]:
             return QRCodeResponse(
@@ -120,6 +179,7 @@ async def generate_qr_code_with_image(
                 qr_code_data=result["qr_code_data"],
                 qr_id=qr_id,
                 view_url=result.get("view_url"),
+                image_url=_design_image_url(qr_id, qr_request, result["render_key"]),
                 metadata=result["metadata"]
             )
         else:
@@ -127,9 +187,128 @@ async def generate_qr_code_with_image(
             
     except HTTPException:
         raise
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate QR code: {str(e)}")
 
+@qr_router.post("/generate-batch")
+async def generate_qr_code_batch(batch: QRBatchRequest, db: Session = Depends(get_db)):
+    """Generate many QR codes, streaming one NDJSON result line per item as it completes"""
+    if len(batch.items) > settings.QR_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch cannot contain more than {settings.QR_BATCH_MAX_ITEMS} items"
+        )
+    
+    # Content QR codes need per-item content storage, so they stay on /generate
+    errors = {}
+    renderable = []
+    for index, item in enumerate(batch.items):
+        if not item.content.strip():
+            errors[index] = "Content cannot be empty"
+        elif item.qr_type == "content":
+            errors[index] = "Content QR codes must be generated through /generate"
+        else:
+            renderable.append((index, item))
+    
+    try:
+        # Save all designs in one transaction
+        qr_ids = db_service.create_qr_designs(db, [item for _, item in renderable])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save QR designs: {str(e)}")
+    
+    async def stream_results():
+        for index, error in errors.items():
+            yield json.dumps({"index": index, "success": False, "qr_id": None, "error": error}) + "\n"
+        
+        indexes = [index for index, _ in renderable]
+        async for result in batch_service.render([item for _, item in renderable], qr_ids):
+            result["index"] = indexes[result["index"]]
+            yield json.dumps(result, default=str) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@qr_router.post("/generate-batch/csv")
+async def generate_qr_code_zip(
+    file: UploadFile = File(...),
+    qr_type: str = Form("url"),
+    format: OutputFormat = Form(OutputFormat.PNG),
+    size: int = Form(10),
+    error_correction: str = Form("M"),
+    border: int = Form(4),
+    foreground_color: str = Form("#000000"),
+    background_color: str = Form("#FFFFFF")
+):
+    """
+    Generate a QR code per CSV row, streaming back a ZIP archive of the images.
+    Form fields are defaults for columns a row leaves blank.
+    """
+    defaults = {
+        "qr_type": qr_type,
+        "format": format,
+        "size": size,
+        "error_correction": error_correction,
+        "border": border,
+        "foreground_color": foreground_color,
+        "background_color": background_color
+    }
+    # Rows are decoded and parsed as the renderer pulls them, never all at once
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", errors="replace", newline="")
+    rows = batch_service.parse_csv(lines, defaults)
+    
+    return StreamingResponse(
+        batch_service.export_zip(rows),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="qr-codes.zip"'}
+    )
+
+@qr_router.post("/print-sheet")
+async def generate_print_sheet(sheet: PrintSheetRequest, db: Session = Depends(get_db)):
+    """Lay out QR codes or saved designs as labels on a streamed, multi-page vector PDF"""
+    if bool(sheet.items) == bool(sheet.design_ids):
+        raise HTTPException(status_code=400, detail="Provide either items or design_ids")
+    
+    count = len(sheet.items or sheet.design_ids)
+    if count > settings.QR_PRINT_MAX_LABELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Print sheets cannot contain more than {settings.QR_PRINT_MAX_LABELS} labels"
+        )
+    
+    try:
+        print_sheet_service.validate_template(sheet.template)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if sheet.items:
+        labels = print_sheet_service.request_labels(sheet.items)
+    else:
+        # Fail before streaming starts rather than leaving gaps in the sheet
+        found = db_service.get_existing_design_ids(db, sheet.design_ids)
+        missing = [design_id for design_id in sheet.design_ids if design_id not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Designs not found: {', '.join(missing[:20])}")
+        labels = print_sheet_service.design_labels(sheet.design_ids)
+    
+    return StreamingResponse(
+        print_sheet_service.iter_pdf(labels, sheet.template),
+        media_type="application/pdf",
+        headers={"Content-Disposition": 'attachment; filename="qr-print-sheet.pdf"'}
+    )
+
+@qr_router.websocket("/preview")
+async def preview_qr_code(websocket: WebSocket):
+    """
+    Live preview channel: each JSON message is a QR code request (plus an
+    optional "seq"), answered with a low-resolution frame. Nothing is saved.
+    """
+    await websocket.accept()
+    try:
+        await preview_service.run_session(websocket.receive_text, websocket.send_json)
+    except WebSocketDisconnect:
+        pass
+
 @qr_router.get("/types")
 async def get_qr_types():
     """Get available QR code types"""
@@ -157,6 +336,23 @@ async def get_error_correction_levels():
         ]
     }
 
+@qr_router.get("/cache/stats")
+async def get_render_cache_stats():
+    """Get render cache hit/miss/eviction counters"""
+    stats = qr_service.cache_stats()
+    stats["content_images"] = content_service.text_to_image_service.cache.stats()
+    return stats
+
+@qr_router.get("/executor/stats")
+async def get_render_executor_stats():
+    """Get render pool queue depths and job counters"""
+    return render_executor.stats()
+
+@qr_router.get("/scans/queue/stats")
+async def get_scan_queue_stats():
+    """Get scan event buffer depth and write/drop counters"""
+    return scan_event_queue.stats()
+
 @qr_router.post("/validate-url")
 async def validate_url(url: str):
     """Validate URL format"""
@@ -219,20 +415,19 @@ async def ai_health_check():
 @content_router.get("/view/{qr_id}")
 async def view_content(qr_id: str, db: Session = Depends(get_db), request: Request = None):
     """View content by QR ID"""
-    # Record usage for analytics
+    content = content_service.get_content(qr_id, db)
+    if not content:
+        raise HTTPException(status_code=404, detail="Content not found")
+    
+    # Record usage for analytics; events are written in batches in the background
     if request:
-        db_service.record_qr_usage(
-            db=db,
+        scan_event_queue.record(
             qr_design_id=qr_id,
             ip_address=request.client.host if request.client else None,
             user_agent=request.headers.get("user-agent"),
             referrer=request.headers.get("referer")
         )
     
-    content = content_service.get_content(qr_id, db)
-    if not content:
-        raise HTTPException(status_code=404, detail="Content not found")
-    
     return HTMLResponse(content=f"""
     <!DOCTYPE html>
     <html>
@@ -256,6 +451,37 @@ async def view_content(qr_id: str, db: Session = Depends(get_db), request: Reque
     </html>
     """)
 
+# Rendered content images, served from the root path the QR codes point at
+@media_router.get("/content/{filename}")
+async def get_content_image(filename: str, db: Session = Depends(get_db)):
+    """Serve a content text image, rendering it on first request"""
+    try:
+        path = await content_service.get_text_image(filename, db)
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if not path:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    # Content-hashed names never change meaning; legacy per-design names might
+    content_hashed = len(filename) == 32 + len("_text.png")
+    cache_control = IMMUTABLE_CACHE_CONTROL if content_hashed else REVALIDATE_CACHE_CONTROL
+    return FileResponse(path, media_type="image/png", headers={"Cache-Control": cache_control})
+
+@media_router.get("/uploads/{filename}")
+async def get_upload(filename: str):
+    """Serve an uploaded file from the blob store"""
+    # Upload names, content hashes or legacy uuids, are never reused for other content
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    path = upload_store.local_path(filename)
+    if path:
+        return FileResponse(path, media_type=media_type, headers=headers)
+    
+    data = await asyncio.to_thread(upload_store.get, filename)
+    if data is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return Response(content=data, media_type=media_type, headers=headers)
+
 @content_router.get("/content/{qr_id}")
 async def get_content_data(qr_id: str, db: Session = Depends(get_db)):
     """Get content data by QR ID (API endpoint)"""
@@ -275,15 +501,32 @@ async def delete_content(qr_id: str, db: Session = Depends(get_db)):
     return {"success": True, "message": "Content deleted successfully"}
 
 # QR Design Management endpoints
-@qr_router.get("/designs", response_model=List[dict])
+def _design_page(items: List[dict], next_cursor: Optional[str], cursor: Optional[str], response: Response):
+    """
+    Page body: a bare list for legacy offset requests, or an envelope with
+    next_cursor once the client pages by cursor (pass cursor= for the first
+    page). The next cursor is also sent in the X-Next-Cursor header.
+    """
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if cursor is None:
+        return items
+    return {"items": items, "next_cursor": next_cursor}
+
+@qr_router.get("/designs")
 async def get_all_designs(
-    limit: int = 100, 
-    offset: int = 0, 
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor of the page to fetch; empty for the first page"),
     db: Session = Depends(get_db)
 ):
     """Get all QR designs with pagination"""
-    designs = db_service.get_all_qr_designs(db, limit=limit, offset=offset)
-    return [
+    try:
+        designs, next_cursor = db_service.get_qr_designs_page(db, limit=limit, offset=offset, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    items = [
         {
             "id": design.id,
             "title": design.title,
@@ -294,6 +537,7 @@ async def get_all_designs(
         }
         for design in designs
     ]
+    return _design_page(items, next_cursor, cursor, response)
 
 @qr_router.get("/designs/{design_id}")
 async def get_design(design_id: str, db: Session = Depends(get_db)):
@@ -334,32 +578,46 @@ async def update_design(
 @qr_router.delete("/designs/{design_id}")
 async def delete_design(design_id: str, db: Session = Depends(get_db)):
     """Delete a QR design"""
-    success = db_service.delete_qr_design(db, design_id)
+    success = content_service.delete_content(design_id, db)
     if not success:
         raise HTTPException(status_code=404, detail="Design not found")
     
     return {"success": True, "message": "Design deleted successfully"}
 
 @qr_router.get("/designs/{design_id}/usage")
-async def get_design_usage(design_id: str, db: Session = Depends(get_db)):
+async def get_design_usage(
+    design_id: str,
+    period: str = Query("day", description="Time series granularity: hour or day"),
+    since: Optional[datetime] = Query(None, description="Start of the time series (default: 48 hours or 30 days back)"),
+    until: Optional[datetime] = Query(None, description="End of the time series (default: now)"),
+    db: Session = Depends(get_db)
+):
     """Get usage statistics for a QR design"""
     # Check if design exists
     design = db_service.get_qr_design(db, design_id)
     if not design:
         raise HTTPException(status_code=404, detail="Design not found")
     
-    usage_stats = db_service.get_qr_usage_stats(db, design_id)
+    try:
+        usage_stats = db_service.get_qr_usage_stats(db, design_id, period, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return usage_stats
 
 @qr_router.get("/designs/search/{query}")
 async def search_designs(
     query: str, 
-    limit: int = 50, 
+    response: Response,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Cursor of the page to fetch; empty for the first page"),
     db: Session = Depends(get_db)
 ):
     """Search QR designs by title, description, or content"""
-    designs = db_service.search_qr_designs(db, query, limit=limit)
-    return [
+    try:
+        designs, next_cursor = db_service.search_qr_designs_page(db, query, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    items = [
         {
             "id": design.id,
             "title": design.title,
@@ -368,4 +626,51 @@ async def search_designs(
             "created_at": design.created_at
         }
         for design in designs
-    ] 
\ No newline at end of file
+    ]
+    return _design_page(items, next_cursor, cursor, response)
+
+@qr_router.get("/designs/{design_id}/image.{image_format}")
+async def get_design_image(
+    design_id: str,
+    image_format: OutputFormat,
+    request: Request,
+    v: Optional[str] = None,
+    profile: Optional[OutputProfile] = None,
+    compression_level: Optional[int] = Query(None, ge=0, le=9),
+    db: Session = Depends(get_db)
+):
+    """Serve the rendered image of a QR design as raw bytes with ETag revalidation"""
+    design = db_service.get_qr_design(db, design_id)
+    if not design:
+        raise HTTPException(status_code=404, detail="Design not found")
+    
+    qr_request = qr_service.request_for_design(
+        design,
+        format=image_format,
+        output_profile=profile,
+        compression_level=compression_level
+    )
+    
+    image_url = None
+    if design.qr_type == "content":
+        content = content_service.get_content(design_id, db)
+        image_url = content.image_url if content else None
+    
+    # The ETag only depends on the render parameters, so revalidation never renders
+    formatted_content = qr_service.format_qr_content(qr_request, design_id, image_url)
+    render_key = qr_service.render_key(qr_request, formatted_content)
+    etag = f'"{render_key}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if v == render_key else REVALIDATE_CACHE_CONTROL
+    }
+    
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        data = await qr_service.render_bytes_async(qr_request, formatted_content)
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return Response(content=data, media_type=qr_service.media_type(qr_request), headers=headers)
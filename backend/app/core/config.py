@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional, List
+from typing import Optional, List, Dict
 import os
 
 class Settings(BaseSettings):
@@ -34,10 +34,80 @@ class Settings(BaseSettings):
     QR_DEFAULT_ERROR_CORRECTION: str = "M"  # L, M, Q, H
     QR_DEFAULT_BORDER: int = 4
     
+    # Render Cache Configuration
+    QR_RENDER_CACHE_ENABLED: bool = True
+    QR_RENDER_CACHE_MAX_ENTRIES: int = 1024
+    QR_RENDER_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    QR_MATRIX_CACHE_MAX_ENTRIES: int = 2048
+    QR_ENCODER_BACKEND: str = "native"  # native or qrcode
+    QR_ENCODER_KANJI: bool = False  # Kanji mode segments (native backend only)
+    
+    # Raster Output Configuration
+    QR_OUTPUT_PROFILE: str = "auto"  # auto, mono, palette or rgb
+    QR_OUTPUT_COMPRESS_LEVEL: int = 6  # 0 (fastest) to 9 (smallest)
+    
+    # Print Sheet Configuration
+    QR_PRINT_MAX_LABELS: int = 20000
+    QR_PRINT_SYMBOL_CACHE_ENTRIES: int = 4096  # Reusable symbol objects kept per document
+    
+    # Preview Configuration
+    QR_PREVIEW_MAX_PIXELS: int = 256  # Largest preview edge, in pixels
+    QR_PREVIEW_COMPRESS_LEVEL: int = 1
+    
+    # Logo Overlay Configuration
+    QR_LOGO_SCALE: float = 0.2  # Logo width as a share of the symbol width
+    QR_LOGO_MAX_RECOVERY_SHARE: float = 0.5  # Share of the EC recovery capacity a logo may use
+    QR_LOGO_CACHE_MAX_ENTRIES: int = 256
+    QR_LOGO_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    
+    # Batch Generation Configuration
+    QR_BATCH_MAX_ITEMS: int = 1000
+    QR_BATCH_WINDOW_PER_WORKER: int = 4
+    QR_EXPORT_MAX_ROWS: int = 100000
+    
+    # Render Executor Configuration
+    RENDER_THREAD_WORKERS: int = 4
+    RENDER_PROCESS_WORKERS: Optional[int] = None  # Defaults to the CPU count
+    RENDER_MAX_QUEUE_DEPTH: int = 256
+    # Pool ("inline", "thread" or "process") used for each render stage
+    RENDER_STAGE_POOLS: Dict[str, str] = {
+        "qr": "thread",
+        "text": "thread",
+        "batch": "process",
+        "preview": "thread",
+    }
+    
+    # Text Image Configuration
+    TEXT_FONT_PATH: Optional[str] = None  # Preferred font file for text images
+    TEXT_MEASURE_CACHE_ENTRIES: int = 4096
+    
+    # Scan Analytics Configuration
+    SCAN_QUEUE_MAX_EVENTS: int = 10000  # Buffered scans; more are dropped
+    SCAN_FLUSH_BATCH_SIZE: int = 500  # Rows per multi-row insert
+    SCAN_FLUSH_INTERVAL_SECONDS: float = 1.0
+    USAGE_TOP_REFERRERS: int = 10
+    USAGE_MAX_SERIES_POINTS: int = 1000  # Largest usage time series, in buckets
+    
+    # Database Configuration (file SQLite only)
+    SQLITE_PROFILE: str = "default"  # default, or concurrent: WAL, reader pool, one writer
+    SQLITE_READER_POOL_SIZE: int = 8  # Pooled read-only connections (concurrent profile)
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # Wait for locks held by other processes
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    
     # File Storage
     UPLOAD_DIR: str = "uploads"
+    CONTENT_DIR: str = "content"  # Rendered text images, regenerated on demand
+    CONTENT_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
     STATIC_DIR: str = "static"
     
+    # Blob Storage (uploaded files, sharded by content hash)
+    BLOB_STORE_BACKEND: str = "local"  # local, s3 or s3-local
+    BLOB_S3_BUCKET: str = "quickqr"
+    BLOB_S3_ENDPOINT_URL: Optional[str] = None  # For S3-compatible services
+    BLOB_S3_REGION: Optional[str] = None
+    BLOB_S3_LOCAL_DIR: str = "s3-local"  # Object root of the s3-local stand-in
+    BLOB_GC_GRACE_SECONDS: int = 3600  # Unreferenced blobs younger than this are kept
+    
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
@@ -1,8 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
-import os
+from sqlalchemy.sql.dml import UpdateBase
+from typing import Optional, Tuple
+from app.core.config import settings
 
 # Database URL - using PostgreSQL for production, SQLite for development
 import os
@@ -13,22 +16,128 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./quickqr.db")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-# Create SQLAlchemy engine
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False},  # Needed for SQLite
-        poolclass=StaticPool,
-        echo=False
-    )
-else:
-    engine = create_engine(
-        DATABASE_URL,
-        echo=False
+# SQLite connection profiles, see Settings.SQLITE_PROFILE
+SQLITE_PROFILES = ("default", "concurrent")
+
+def _configure_sqlite_writer(dbapi_connection, connection_record):
+    """WAL with relaxed fsyncs; transactions are begun by _begin_immediate"""
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute("PRAGMA synchronous = NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
+
+def _configure_sqlite_reader(dbapi_connection, connection_record):
+    """Read-only connection; a write routed here by mistake fails instead of taking the lock"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only = ON")
+    cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.close()
+
+def _begin_immediate(connection):
+    """Take the write lock when a transaction starts, so it never fails to upgrade mid-transaction"""
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+def create_engines(database_url: str, profile: str = "default") -> Tuple[Engine, Engine]:
+    """
+    Writer and reader engines for a database. They are the same engine
+    except for file SQLite with the concurrent profile, which opens one
+    writer connection in WAL mode and a pool of read-only connections.
+    """
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"SQLITE_PROFILE must be one of: {', '.join(SQLITE_PROFILES)}")
+    
+    if database_url.startswith("sqlite") and ":memory:" in database_url:
+        # An in-memory database only exists on its one connection
+        engine = create_engine(
+            database_url,
+            connect_args={"check_same_thread": False},  # Needed for SQLite
+            poolclass=StaticPool,
+            echo=False
+        )
+        return engine, engine
+    
+    if database_url.startswith("sqlite") and profile == "concurrent":
+        # SQLite allows one writer at a time; queueing writers on a single
+        # pooled connection is cheaper than having them spin on the file lock
+        writer = create_engine(
+            database_url,
+            connect_args={"check_same_thread": False},
+            pool_size=1,
+            max_overflow=0,
+            echo=False
+        )
+        event.listen(writer, "connect", _configure_sqlite_writer)
+        event.listen(writer, "begin", _begin_immediate)
+        
+        # WAL readers never block the writer or each other
+        reader = create_engine(
+            database_url,
+            connect_args={"check_same_thread": False},
+            pool_size=settings.SQLITE_READER_POOL_SIZE,
+            max_overflow=settings.SQLITE_READER_POOL_SIZE,
+            echo=False
+        )
+        event.listen(reader, "connect", _configure_sqlite_reader)
+        return writer, reader
+    
+    if database_url.startswith("sqlite"):
+        # A connection per session, so background writers and request handlers
+        # on other threads never share (and roll back) each other's transactions
+        engine = create_engine(
+            database_url,
+            connect_args={"check_same_thread": False},  # Needed for SQLite
+            echo=False
+        )
+    else:
+        engine = create_engine(
+            database_url,
+            echo=False
+        )
+    return engine, engine
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to the reader engine and writes to its bind,
+    the writer. Once a transaction writes, every later statement in it goes
+    to the writer too, so read-modify-write sequences see their own changes.
+    """
+    
+    def __init__(self, *args, reader: Optional[Engine] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reader = reader
+    
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.reader is None or self.info.get("writing"):
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["writing"] = True
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        return self.reader
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _end_writing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("writing", None)
+
+def create_session_factory(writer: Engine, reader: Engine) -> sessionmaker:
+    """Session factory reading through reader when it is a separate engine"""
+    return sessionmaker(
+        class_=RoutingSession,
+        autocommit=False,
+        autoflush=False,
+        bind=writer,
+        reader=reader if reader is not writer else None
     )
 
+# Create SQLAlchemy engines; engine is the one that writes (and migrates)
+engine, reader_engine = create_engines(DATABASE_URL, settings.SQLITE_PROFILE)
+
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = create_session_factory(engine, reader_engine)
 
 # Create Base class
 Base = declarative_base()
@@ -41,6 +150,35 @@ def get_db():
     finally:
         db.close()
 
+# Alembic configuration; migrations live in backend/alembic
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
 # Create all tables
-def create_tables():
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+def create_tables(bind: Optional[Engine] = None):
+    """Bring the schema of bind (the app's engine by default) up to date by running the Alembic migrations"""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "alembic"))
+    with (bind or engine).begin() as connection:
+        config.attributes["connection"] = connection
+        revision = legacy_revision(connection)
+        if revision:
+            command.stamp(config, revision)
+        command.upgrade(config, "head")
+
+def legacy_revision(connection) -> Optional[str]:
+    """
+    Revision matching a database created by create_all before migrations
+    existed, or None if the database is empty or already versioned
+    """
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    if "alembic_version" in tables or "qr_designs" not in tables:
+        return None
+    if "qr_usage_rollups" in tables:
+        return "0003"
+    if "content_hash" in {info["name"] for info in inspector.get_columns("content_data")}:
+        return "0002"
+    return "0001"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, LargeBinary
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -26,17 +26,27 @@ class QRDesign(Base):
     # Relationships
     content_data = relationship("ContentData", back_populates="qr_design", cascade="all, delete-orphan")
     images = relationship("DesignImage", back_populates="qr_design", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Active designs, newest first, paged by (created_at, id)
+        Index("ix_qr_designs_active_created", "is_active", "created_at", "id"),
+        # Uploaded logos still in use, see DatabaseService.count_upload_references
+        Index("ix_qr_designs_logo_url", "logo_url"),
+    )
 
 class ContentData(Base):
     """Database model for storing content data associated with QR codes"""
     __tablename__ = "content_data"
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    qr_design_id = Column(String, ForeignKey("qr_designs.id"), nullable=False)
+    qr_design_id = Column(String, ForeignKey("qr_designs.id"), nullable=False, index=True)
     content_type = Column(String(50), nullable=False)  # 'text', 'image', 'text+image'
     text_content = Column(Text, nullable=True)
-    image_filename = Column(String(255), nullable=True)
+    image_filename = Column(String(255), nullable=True, index=True)
     image_path = Column(String(500), nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # Shared text image, see TextToImageService
+    image_title = Column(String(255), nullable=True)  # Title drawn on the text image when it was named
+    image_description = Column(Text, nullable=True)  # Description drawn on the text image
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -47,8 +57,8 @@ class DesignImage(Base):
     __tablename__ = "design_images"
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    qr_design_id = Column(String, ForeignKey("qr_designs.id"), nullable=False)
-    filename = Column(String(255), nullable=False)
+    qr_design_id = Column(String, ForeignKey("qr_designs.id"), nullable=False, index=True)
+    filename = Column(String(255), nullable=False, index=True)
     original_filename = Column(String(255), nullable=False)
     file_path = Column(String(500), nullable=False)
     file_size = Column(Integer, nullable=False)
@@ -69,4 +79,38 @@ class QRCodeUsage(Base):
     ip_address = Column(String(45), nullable=True)  # IPv6 compatible
     user_agent = Column(String(500), nullable=True)
     referrer = Column(String(500), nullable=True)
-    location = Column(String(100), nullable=True) 
\ No newline at end of file
+    location = Column(String(100), nullable=True)
+    
+    __table_args__ = (
+        # Recent scans of one design
+        Index("ix_qr_code_usage_design_scanned", "qr_design_id", "scanned_at"),
+    )
+
+class QRUsageRollup(Base):
+    """Scan and unique visitor counts per design per hour, day and all time"""
+    __tablename__ = "qr_usage_rollups"
+    
+    qr_design_id = Column(String, ForeignKey("qr_designs.id"), primary_key=True)
+    period = Column(String(8), primary_key=True)  # 'hour', 'day' or 'all'
+    bucket_start = Column(DateTime, primary_key=True)  # Naive UTC; 1970-01-01 for 'all'
+    scans = Column(Integer, nullable=False, default=0)
+    unique_ips = Column(Integer, nullable=False, default=0)
+
+class QRUsageRollupVisitor(Base):
+    """Visitors already counted in a rollup bucket, keyed by a hash of their IP"""
+    __tablename__ = "qr_usage_rollup_visitors"
+    
+    qr_design_id = Column(String, ForeignKey("qr_designs.id"), primary_key=True)
+    period = Column(String(8), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    ip_hash = Column(String(32), primary_key=True)
+
+class QRUsageRollupReferrer(Base):
+    """Scan counts per referring host in a rollup bucket"""
+    __tablename__ = "qr_usage_rollup_referrers"
+    
+    qr_design_id = Column(String, ForeignKey("qr_designs.id"), primary_key=True)
+    period = Column(String(8), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    referrer = Column(String(255), primary_key=True)
+    scans = Column(Integer, nullable=False, default=0) 
\ No newline at end of file
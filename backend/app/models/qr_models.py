@@ -20,6 +20,18 @@ class ErrorCorrectionLevel(str, Enum):
     Q = "Q"
     H = "H"
 
+class OutputFormat(str, Enum):
+    PNG = "png"
+    SVG = "svg"
+    PDF = "pdf"
+    WEBP = "webp"
+
+class OutputProfile(str, Enum):
+    AUTO = "auto"  # Smallest lossless format for the render
+    MONO = "mono"
+    PALETTE = "palette"
+    RGB = "rgb"
+
 class QRCodeRequest(BaseModel):
     content: str = Field(..., description="Content for the QR code")
     qr_type: QRCodeType = Field(..., description="Type of QR code")
@@ -31,15 +43,42 @@ class QRCodeRequest(BaseModel):
     logo_url: Optional[str] = Field(None, description="Logo URL to overlay on QR code")
     title: Optional[str] = Field(None, description="Title for content display")
     description: Optional[str] = Field(None, description="Description for content display")
+    format: OutputFormat = Field(OutputFormat.PNG, description="Output format (png, svg, pdf or webp)")
+    output_profile: Optional[OutputProfile] = Field(None, description="Raster pixel format, defaults to the server profile")
+    compression_level: Optional[int] = Field(None, ge=0, le=9, description="Raster compression, 0 fastest to 9 smallest")
 
 class QRCodeResponse(BaseModel):
     success: bool
     qr_code_data: Optional[str] = None
     qr_id: Optional[str] = None
     view_url: Optional[str] = None
+    image_url: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
 
+class QRBatchRequest(BaseModel):
+    items: List[QRCodeRequest] = Field(..., min_length=1, description="QR codes to generate")
+
+class SheetTemplate(BaseModel):
+    """Label grid for print sheets, in PDF points (1/72 inch)"""
+    page_width: float = Field(595.28, gt=0, description="Page width (A4 by default)")
+    page_height: float = Field(841.89, gt=0, description="Page height (A4 by default)")
+    columns: int = Field(3, ge=1, le=50, description="Labels per row")
+    rows: int = Field(8, ge=1, le=50, description="Labels per column")
+    margin_top: float = Field(36, ge=0)
+    margin_bottom: float = Field(36, ge=0)
+    margin_left: float = Field(36, ge=0)
+    margin_right: float = Field(36, ge=0)
+    gutter_x: float = Field(9, ge=0, description="Horizontal space between labels")
+    gutter_y: float = Field(9, ge=0, description="Vertical space between labels")
+    caption: bool = Field(True, description="Print the title under each code")
+    caption_font_size: float = Field(8, gt=0, le=72)
+
+class PrintSheetRequest(BaseModel):
+    items: Optional[List[QRCodeRequest]] = Field(None, description="QR codes to print")
+    design_ids: Optional[List[str]] = Field(None, description="Saved designs to print, in order")
+    template: SheetTemplate = Field(default_factory=SheetTemplate)
+
 class QRContentDisplay(BaseModel):
     qr_id: str
     title: Optional[str] = None
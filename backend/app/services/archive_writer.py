@@ -0,0 +1,62 @@
+import time
+import zipfile
+from typing import List
+
+class _ChunkSink:
+    """Write-only, unseekable file object that collects written chunks"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+class ZipStreamWriter:
+    """
+    Builds a ZIP archive incrementally, handing back the bytes of each entry as
+    soon as it is added.
+
+    The archive is written to an unseekable sink, so zipfile emits data
+    descriptors after each entry instead of seeking back to patch headers, and
+    only the central directory (a few dozen bytes per entry) is kept in memory.
+    """
+
+    def __init__(self):
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, mode="w")
+        self._names = set()
+
+    def _drain(self) -> bytes:
+        data = b"".join(self._sink.chunks)
+        self._sink.chunks.clear()
+        return data
+
+    def unique_name(self, name: str) -> str:
+        """Return name, suffixed if an entry with that name already exists"""
+        stem, dot, extension = name.rpartition(".")
+        if not dot:
+            stem, extension = name, ""
+        candidate, counter = name, 1
+        while candidate in self._names:
+            candidate = f"{stem}-{counter}{dot}{extension}"
+            counter += 1
+        return candidate
+
+    def add(self, name: str, data: bytes, compress: bool = True) -> bytes:
+        """Add an entry and return the archive bytes written for it"""
+        name = self.unique_name(name)
+        self._names.add(name)
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        info.external_attr = 0o644 << 16
+        self._zip.writestr(info, data)
+        return self._drain()
+
+    def close(self) -> bytes:
+        """Finish the archive and return the central directory bytes"""
+        self._zip.close()
+        return self._drain()
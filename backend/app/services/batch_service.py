@@ -0,0 +1,182 @@
+import asyncio
+import csv
+import io
+import itertools
+import re
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from app.core.config import settings
+from app.models.qr_models import QRCodeRequest
+from app.services.archive_writer import ZipStreamWriter
+from app.services.qr_service import generate_qr_code_in_worker, render_file_in_worker
+from app.services.render_executor import render_executor
+
+# Request fields that can be set per row in a CSV export
+CSV_FIELDS = (
+    "content", "qr_type", "size", "error_correction", "border",
+    "foreground_color", "background_color", "format",
+)
+
+Job = Tuple[Any, Callable, tuple]
+
+class BatchService:
+    """Service for rendering batches of QR codes on the batch render pool"""
+
+    async def render(self, requests: List[QRCodeRequest], qr_ids: List[Optional[str]]) -> AsyncIterator[Dict[str, Any]]:
+        """Render requests in parallel, yielding per-item results as they complete"""
+        jobs = (
+            ((index, qr_id), generate_qr_code_in_worker, (request.model_dump(mode="json"), qr_id))
+            for index, (request, qr_id) in enumerate(zip(requests, qr_ids))
+        )
+        async for (index, qr_id), result, error in self._run_windowed(jobs):
+            if error is not None:
+                result = {"success": False, "error": str(error)}
+            yield self._format_result(index, qr_id, result)
+
+    async def export_zip(self, rows: Iterable[Tuple[int, Optional[QRCodeRequest], str, Optional[str]]]) -> AsyncIterator[bytes]:
+        """
+        Render parsed CSV rows in parallel and stream a ZIP archive of the
+        images, adding each entry as soon as it is rendered. Rows that fail
+        are listed in an errors.csv entry at the end of the archive.
+        """
+        writer = ZipStreamWriter()
+        errors: List[Tuple[int, str]] = []
+
+        def jobs() -> Iterator[Job]:
+            for row, request, filename, error in rows:
+                if error is not None:
+                    errors.append((row, error))
+                    continue
+                yield (row, filename, request.format), render_file_in_worker, (request.model_dump(mode="json"),)
+
+        async for (row, filename, image_format), data, error in self._run_windowed(jobs()):
+            if error is not None:
+                errors.append((row, str(error)))
+                continue
+            # PNG, WebP and PDF output is already compressed
+            yield writer.add(filename, data, compress=image_format == "svg")
+
+        if errors:
+            report = io.StringIO()
+            report_writer = csv.writer(report)
+            report_writer.writerow(["row", "error"])
+            report_writer.writerows(sorted(errors))
+            yield writer.add("errors.csv", report.getvalue().encode("utf-8"))
+
+        yield writer.close()
+
+    def parse_csv(self, lines: Iterable[str], defaults: Dict[str, Any]) -> Iterator[Tuple[int, Optional[QRCodeRequest], str, Optional[str]]]:
+        """
+        Lazily parse CSV lines into (row, request, filename, error) tuples.
+
+        A header row naming a "content" column maps columns onto request fields
+        and an optional "filename" column; otherwise the first column of every
+        row is the content. defaults fill in fields a row leaves blank.
+        """
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if header is None:
+            return
+
+        columns = [column.strip().lower() for column in header]
+        if "content" in columns:
+            records = (dict(zip(columns, values)) for values in reader)
+            first_row = 2
+        else:
+            # No header, so the first line is already data
+            records = ({"content": values[0] if values else ""} for values in itertools.chain([header], reader))
+            first_row = 1
+
+        for row, record in enumerate(records, start=first_row):
+            if row - first_row >= settings.QR_EXPORT_MAX_ROWS:
+                yield row, None, "", f"Exports are limited to {settings.QR_EXPORT_MAX_ROWS} rows"
+                return
+
+            fields = dict(defaults)
+            fields.update({
+                key: value.strip() for key, value in record.items()
+                if key in CSV_FIELDS and value and value.strip()
+            })
+            if not fields.get("content"):
+                yield row, None, "", "Content cannot be empty"
+                continue
+
+            try:
+                request = QRCodeRequest(**fields)
+            except ValidationError as e:
+                yield row, None, "", "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+                )
+                continue
+
+            if request.qr_type == "content":
+                yield row, None, "", "Content QR codes must be generated through /generate"
+                continue
+
+            yield row, request, self._filename(record.get("filename"), row, request), None
+
+    def _filename(self, name: Optional[str], row: int, request: QRCodeRequest) -> str:
+        """Archive entry name for a row, from its filename column or its row number"""
+        extension = getattr(request.format, "value", request.format)
+        stem = ""
+        if name:
+            # Keep only the last path component and filesystem-safe characters
+            stem = re.sub(r"[^A-Za-z0-9._-]+", "_", name.replace("\\", "/").rsplit("/", 1)[-1]).strip("._")[:100]
+            if stem.lower().endswith(f".{extension}"):
+                stem = stem[:-len(extension) - 1]
+        return f"{stem or f'row-{row:06d}'}.{extension}"
+
+    async def _run_windowed(self, jobs: Iterator[Job]) -> AsyncIterator[Tuple[Any, Any, Optional[Exception]]]:
+        """
+        Run (key, fn, args) jobs on the batch pool, yielding (key, result, error)
+        as each one completes.
+        """
+        # Keep a bounded window of submitted jobs so rendered output doesn't
+        # pile up in memory faster than it is streamed out, and jobs are only
+        # pulled from the (possibly lazy) source as slots free up. The window
+        # is the backlog bound, so jobs wait for a worker rather than being
+        # rejected by the render queue depth limit.
+        workers = render_executor.workers(render_executor.pool_for("batch"))
+        window = max(1, workers * settings.QR_BATCH_WINDOW_PER_WORKER)
+        pending: Dict[asyncio.Task, Any] = {}
+
+        def submit_next() -> bool:
+            try:
+                key, fn, args = next(jobs)
+            except StopIteration:
+                return False
+            task = asyncio.ensure_future(render_executor.run_waiting("batch", fn, *args))
+            pending[task] = key
+            return True
+
+        try:
+            while len(pending) < window and submit_next():
+                pass
+
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    key = pending.pop(task)
+                    try:
+                        result, error = task.result(), None
+                    except Exception as e:
+                        result, error = None, e
+                    yield key, result, error
+                    submit_next()
+        finally:
+            # The consumer went away (e.g. client disconnect), drop queued work
+            for task in pending:
+                task.cancel()
+
+    def _format_result(self, index: int, qr_id: Optional[str], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Shape a render result into a batch item response"""
+        if not result.get("success"):
+            return {"index": index, "success": False, "qr_id": qr_id, "error": result.get("error")}
+        return {
+            "index": index,
+            "success": True,
+            "qr_id": qr_id,
+            "qr_code_data": result["qr_code_data"],
+            "view_url": result.get("view_url"),
+            "metadata": result.get("metadata"),
+        }
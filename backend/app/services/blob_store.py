@@ -0,0 +1,354 @@
+import hashlib
+import io
+import os
+import re
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple
+from app.core.config import settings
+
+# Blob names are single path components; anything else is never looked up
+BLOB_NAME = re.compile(r"^[0-9A-Za-z][0-9A-Za-z._-]*$")
+
+# Objects missing from an S3-compatible store are reported with these codes
+MISSING_CODES = ("404", "NoSuchKey", "NotFound")
+
+BlobInfo = Tuple[str, int, float]
+
+def content_blob_name(data: bytes, extension: str = "") -> str:
+    """Content-addressed name for data: its SHA-256 plus a sanitized extension"""
+    extension = extension.lower().lstrip(".")
+    extension = "".join(char for char in extension if char.isalnum())[:10]
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{digest}.{extension}" if extension else digest
+
+def shard_key(name: str) -> str:
+    """
+    Relative location of a blob in a sharded layout, e.g. ab/cd/abcd1234.png.
+    Two levels of 256 directories keep every directory small.
+    """
+    return f"{name[:2]}/{name[2:4]}/{name}"
+
+def valid_blob_name(name: str) -> bool:
+    """Whether name can be stored without escaping the store's directory"""
+    return bool(BLOB_NAME.match(name)) and ".." not in name
+
+class BlobStore(ABC):
+    """
+    Flat namespace of immutable files, addressed by name.
+
+    Callers name blobs by their content (see content_blob_name), so writing a
+    name that already exists is a no-op and identical uploads share storage.
+    """
+
+    @abstractmethod
+    def put(self, name: str, data: bytes, content_type: Optional[str] = None) -> bool:
+        """Store data under name; returns False if the blob already existed"""
+
+    @abstractmethod
+    def get(self, name: str) -> Optional[bytes]:
+        """Contents of a blob, or None if it does not exist"""
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        """Whether a blob exists"""
+
+    @abstractmethod
+    def delete(self, name: str) -> bool:
+        """Remove a blob; returns False if it did not exist"""
+
+    @abstractmethod
+    def iter_blobs(self) -> Iterator[BlobInfo]:
+        """Yield (name, size, modified timestamp) for every blob"""
+
+    def local_path(self, name: str) -> Optional[str]:
+        """Readable local file of a blob, or None if it is missing or remote"""
+        return None
+
+    @abstractmethod
+    def location(self, name: str) -> str:
+        """Where a blob lives, for storing alongside its database row"""
+
+class LocalBlobStore(BlobStore):
+    """
+    Blob store on the local filesystem, sharded as directory/ab/cd/name.
+
+    Files written flat into the directory before sharding are still found,
+    listed and deleted under their names.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        """Sharded location of a blob, creating its shard directories"""
+        path = os.path.join(self.directory, *shard_key(name).split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def find(self, name: str) -> Optional[str]:
+        """Existing file of a blob, sharded or legacy flat, or None"""
+        if not valid_blob_name(name):
+            return None
+        path = os.path.join(self.directory, *shard_key(name).split("/"))
+        if os.path.isfile(path):
+            return path
+        legacy = os.path.join(self.directory, name)
+        return legacy if os.path.isfile(legacy) else None
+
+    def put(self, name: str, data: bytes, content_type: Optional[str] = None) -> bool:
+        if not valid_blob_name(name):
+            raise ValueError(f"Invalid blob name: {name}")
+        if self.find(name):
+            return False
+        path = self.path(name)
+        # Write under a temporary name so readers never see a partial file
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return True
+
+    def get(self, name: str) -> Optional[bytes]:
+        path = self.find(name)
+        if not path:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def exists(self, name: str) -> bool:
+        return self.find(name) is not None
+
+    def delete(self, name: str) -> bool:
+        deleted = False
+        while True:
+            # A blob may exist both flat and sharded if it was re-uploaded
+            path = self.find(name)
+            if not path:
+                return deleted
+            try:
+                os.remove(path)
+                deleted = True
+            except FileNotFoundError:
+                pass
+
+    def iter_blobs(self) -> Iterator[BlobInfo]:
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and len(entry.name) == 2:
+                for shard in os.scandir(entry.path):
+                    if shard.is_dir() and len(shard.name) == 2:
+                        yield from self._scan(shard.path)
+        # Legacy files written before sharding
+        yield from self._scan(self.directory)
+
+    def _scan(self, directory: str) -> Iterator[BlobInfo]:
+        """Blobs directly inside one directory"""
+        for entry in os.scandir(directory):
+            if entry.is_file() and valid_blob_name(entry.name) and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                yield entry.name, stat.st_size, stat.st_mtime
+
+    def iter_temp_files(self) -> Iterator[Tuple[str, float]]:
+        """Yield (path, modified timestamp) of temporary files left by interrupted writes"""
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if filename.endswith(".tmp"):
+                    path = os.path.join(root, filename)
+                    yield path, os.stat(path).st_mtime
+
+    def local_path(self, name: str) -> Optional[str]:
+        return self.find(name)
+
+    def location(self, name: str) -> str:
+        return os.path.join(self.directory, *shard_key(name).split("/"))
+
+class S3BlobStore(BlobStore):
+    """
+    Blob store in an S3-compatible bucket, sharded as prefix/ab/cd/name.
+
+    The client is anything with the boto3 S3 client methods used here
+    (put_object, get_object, head_object, delete_object, list_objects_v2),
+    such as a boto3 client or LocalS3Client.
+    """
+
+    def __init__(self, client: Any, bucket: str, prefix: str = ""):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = f"{prefix.strip('/')}/" if prefix.strip("/") else ""
+
+    def key(self, name: str) -> str:
+        """Object key of a blob"""
+        return self.prefix + shard_key(name)
+
+    def _missing(self, error: Exception) -> bool:
+        """Whether a client error means the object does not exist"""
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return str(code) in MISSING_CODES
+
+    def put(self, name: str, data: bytes, content_type: Optional[str] = None) -> bool:
+        if not valid_blob_name(name):
+            raise ValueError(f"Invalid blob name: {name}")
+        if self.exists(name):
+            return False
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self.key(name),
+            Body=data,
+            ContentType=content_type or "application/octet-stream",
+        )
+        return True
+
+    def get(self, name: str) -> Optional[bytes]:
+        if not valid_blob_name(name):
+            return None
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.key(name))
+        except Exception as e:
+            if self._missing(e):
+                return None
+            raise
+        return response["Body"].read()
+
+    def exists(self, name: str) -> bool:
+        if not valid_blob_name(name):
+            return False
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key(name))
+            return True
+        except Exception as e:
+            if self._missing(e):
+                return False
+            raise
+
+    def delete(self, name: str) -> bool:
+        if not self.exists(name):
+            return False
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(name))
+        return True
+
+    def iter_blobs(self) -> Iterator[BlobInfo]:
+        kwargs: Dict[str, Any] = {"Bucket": self.bucket, "Prefix": self.prefix}
+        while True:
+            response = self.client.list_objects_v2(**kwargs)
+            for entry in response.get("Contents", []):
+                name = entry["Key"][len(self.prefix):].rsplit("/", 1)[-1]
+                if valid_blob_name(name):
+                    yield name, entry["Size"], entry["LastModified"].timestamp()
+            if not response.get("IsTruncated"):
+                return
+            kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+    def location(self, name: str) -> str:
+        return f"s3://{self.bucket}/{self.key(name)}"
+
+class LocalS3Error(Exception):
+    """Error raised by LocalS3Client, shaped like botocore's ClientError"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.response = {"Error": {"Code": code, "Message": message}}
+
+class LocalS3Client:
+    """
+    Stand-in for an S3 client that keeps objects as files under root/bucket/key.
+    Lets the S3 store run in development and tests without a server.
+    """
+
+    def __init__(self, root: str, page_size: int = 1000):
+        self.root = root
+        self.page_size = page_size
+
+    def _path(self, bucket: str, key: str) -> str:
+        parts = key.split("/")
+        if any(part in ("", ".", "..") for part in parts):
+            raise LocalS3Error("InvalidKey", f"Invalid key: {key}")
+        return os.path.join(self.root, bucket, *parts)
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> Dict[str, Any]:
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(Body)
+        os.replace(temp_path, path)
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def head_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        path = self._path(Bucket, Key)
+        if not os.path.isfile(path):
+            raise LocalS3Error("404", f"Not found: {Key}")
+        stat = os.stat(path)
+        return {"ContentLength": stat.st_size, "LastModified": _timestamp(stat.st_mtime)}
+
+    def get_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        path = self._path(Bucket, Key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise LocalS3Error("NoSuchKey", f"No such key: {Key}")
+        return {"Body": io.BytesIO(data), "ContentLength": len(data)}
+
+    def delete_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        try:
+            os.remove(self._path(Bucket, Key))
+        except FileNotFoundError:
+            pass
+        return {}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", ContinuationToken: Optional[str] = None,
+                        MaxKeys: Optional[int] = None) -> Dict[str, Any]:
+        bucket_dir = os.path.join(self.root, Bucket)
+        keys = []
+        for root, _, files in os.walk(bucket_dir):
+            for filename in files:
+                if filename.endswith(".tmp"):
+                    continue
+                key = os.path.relpath(os.path.join(root, filename), bucket_dir).replace(os.sep, "/")
+                if key.startswith(Prefix) and (ContinuationToken is None or key > ContinuationToken):
+                    keys.append(key)
+        keys.sort()
+
+        page = keys[:MaxKeys or self.page_size]
+        contents = []
+        for key in page:
+            stat = os.stat(os.path.join(bucket_dir, *key.split("/")))
+            contents.append({"Key": key, "Size": stat.st_size, "LastModified": _timestamp(stat.st_mtime)})
+        truncated = len(keys) > len(page)
+        response: Dict[str, Any] = {"Contents": contents, "KeyCount": len(contents), "IsTruncated": truncated}
+        if truncated:
+            response["NextContinuationToken"] = page[-1]
+        return response
+
+def _timestamp(value: float) -> datetime:
+    """Aware datetime for a file modification time, as S3 clients return"""
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+def create_blob_store(directory: str, prefix: str) -> BlobStore:
+    """
+    Blob store for one kind of file, chosen by BLOB_STORE_BACKEND:
+    "local" shards files under directory, "s3" uses a bucket through boto3 and
+    "s3-local" uses the same S3 code path backed by LocalS3Client.
+    """
+    backend = settings.BLOB_STORE_BACKEND
+    if backend == "local":
+        return LocalBlobStore(directory)
+    if backend == "s3-local":
+        return S3BlobStore(LocalS3Client(settings.BLOB_S3_LOCAL_DIR), settings.BLOB_S3_BUCKET, prefix)
+    if backend == "s3":
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("BLOB_STORE_BACKEND=s3 requires boto3 to be installed")
+        client = boto3.client(
+            "s3",
+            endpoint_url=settings.BLOB_S3_ENDPOINT_URL,
+            region_name=settings.BLOB_S3_REGION,
+        )
+        return S3BlobStore(client, settings.BLOB_S3_BUCKET, prefix)
+    raise ValueError(f"Unknown BLOB_STORE_BACKEND: {backend}")
+
+# Uploaded design images and logos, shared by every service instance
+upload_store = create_blob_store(settings.UPLOAD_DIR, "uploads")
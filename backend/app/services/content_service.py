@@ -1,17 +1,23 @@
-import os
+import asyncio
+import re
 import uuid
-from datetime import datetime
 from typing import Dict, Optional, List
 from fastapi import UploadFile
 from sqlalchemy.orm import Session
 from app.models.qr_models import QRContentDisplay, QRCodeType
 from app.services.database_service import DatabaseService
-from app.services.text_to_image_service import TextToImageService
+from app.services.text_to_image_service import TextToImageService, write_text_image_in_worker
+from app.services.render_executor import render_executor
+
+# Text images are named {content hash}_text.png, or {qr_id}_text.png for
+# content saved before images were shared
+TEXT_IMAGE_FILENAME = re.compile(r"^[0-9a-f-]{32,36}_text\.png$")
 
 class ContentService:
     def __init__(self):
         self.db_service = DatabaseService()
         self.text_to_image_service = TextToImageService()
+        self._pending_renders: Dict[str, asyncio.Future] = {}
     
     async def save_content(self, 
                           content: str, 
@@ -19,17 +25,18 @@ class ContentService:
                           title: Optional[str] = None,
                           description: Optional[str] = None,
                           image_file: Optional[UploadFile] = None,
-                          db: Session = None) -> str:
+                          db: Session = None,
+                          qr_id: Optional[str] = None) -> str:
         """Save content and return QR ID"""
         if not db:
             from app.core.database import SessionLocal
             db = SessionLocal()
             try:
-                return await self._save_content_internal(content, qr_type, title, description, image_file, db)
+                return await self._save_content_internal(content, qr_type, title, description, image_file, db, qr_id)
             finally:
                 db.close()
         else:
-            return await self._save_content_internal(content, qr_type, title, description, image_file, db)
+            return await self._save_content_internal(content, qr_type, title, description, image_file, db, qr_id)
     
     async def _save_content_internal(self, 
                                    content: str, 
@@ -37,14 +44,18 @@ class ContentService:
                                    title: Optional[str] = None,
                                    description: Optional[str] = None,
                                    image_file: Optional[UploadFile] = None,
-                                   db: Session = None) -> str:
+                                   db: Session = None,
+                                   qr_id: Optional[str] = None) -> str:
         """Internal method to save content with database session"""
-        qr_id = str(uuid.uuid4())
+        qr_id = qr_id or str(uuid.uuid4())
         
         # Determine content type and handle image creation
         content_type = "text"
         image_filename = None
         image_path = None
+        content_hash = None
+        image_title = None
+        image_description = None
         
         if image_file:
             # Save uploaded image using database service
@@ -53,15 +64,16 @@ class ContentService:
             image_path = design_image.file_path
             content_type = "text+image" if content.strip() else "image"
         elif content.strip() and qr_type == "content":
-            # Create text image for content type
-            image_filename = self.text_to_image_service.create_text_image(
-                text=content,
-                title=title,
-                description=description,
-                qr_id=qr_id
-            )
+            # Text images are shared by every design with the same content and
+            # only rendered when first requested (see get_text_image)
+            content_hash = self.text_to_image_service.text_image_hash(content, title, description)
+            image_filename = self.text_to_image_service.text_image_filename(content_hash)
             image_path = f"/content/{image_filename}"
             content_type = "text"
+            # Kept with the row, so a re-render matches the hash even after
+            # the design's title or description change
+            image_title = title
+            image_description = description
         
         # Save content data to database
         self.db_service.save_content_data(
@@ -70,53 +82,56 @@ class ContentService:
             content=content,
             content_type=content_type,
             image_filename=image_filename,
-            image_path=image_path
+            image_path=image_path,
+            content_hash=content_hash,
+            image_title=image_title,
+            image_description=image_description
         )
         
         return qr_id
     
-    async def save_content(self, 
-                          content: str, 
-                          qr_type: QRCodeType,
-                          title: Optional[str] = None,
-                          description: Optional[str] = None,
-                          image_file: Optional[UploadFile] = None) -> str:
-        """Save content and return QR ID"""
-        qr_id = str(uuid.uuid4())
+    async def get_text_image(self, image_filename: str, db: Session) -> Optional[str]:
+        """
+        Path of a text image, rendering it from its stored content on a cache
+        miss. Returns None if no content uses that image.
+        """
+        if not TEXT_IMAGE_FILENAME.match(image_filename):
+            return None
         
-        # Determine content type
-        content_type = "text"
-        image_url = None
+        path = self.text_to_image_service.cache.get(image_filename)
+        if path:
+            return path
         
-        if image_file:
-            # Save image
-            image_filename = f"{qr_id}_{image_file.filename}"
-            image_path = os.path.join(self.images_dir, image_filename)
+        # Concurrent misses for the same image share one render
+        render = self._pending_renders.get(image_filename)
+        if render is None:
+            content_data = self.db_service.get_content_data_for_image(db, image_filename)
+            if not content_data:
+                return None
+            # The bound method carries the cache's lock, which cannot be pickled
+            if render_executor.pool_for("text") == "process":
+                write = write_text_image_in_worker
+            else:
+                write = self.text_to_image_service.write_text_image
+            render = asyncio.ensure_future(render_executor.run(
+                "text",
+                write,
+                image_filename,
+                text=content_data.text_content or "",
+                title=content_data.image_title,
+                description=content_data.image_description
+            ))
+            self._pending_renders[image_filename] = render
             
-            async with aiofiles.open(image_path, 'wb') as f:
-                content_data = await image_file.read()
-                await f.write(content_data)
+            def finish(task: asyncio.Future):
+                self._pending_renders.pop(image_filename, None)
+                if not task.cancelled() and task.exception() is None:
+                    # Account for the new file and evict older ones to fit
+                    self.text_to_image_service.cache.add(image_filename)
             
-            image_url = f"/content/images/{image_filename}"
-            content_type = "text+image" if content.strip() else "image"
-        
-        # Create content display object
-        content_display = QRContentDisplay(
-            qr_id=qr_id,
-            title=title,
-            description=description,
-            content=content,
-            content_type=content_type,
-            image_url=image_url,
-            created_at=datetime.now(),
-            qr_type=qr_type
-        )
-        
-        # Save to data file
-        self.content_data[qr_id] = content_display.dict()
-        self._save_content_data()
+            render.add_done_callback(finish)
         
-        return qr_id
+        return await asyncio.shield(render)
     
     def get_content(self, qr_id: str, db: Session = None) -> Optional[QRContentDisplay]:
         """Get content by QR ID"""
@@ -132,15 +147,34 @@ class ContentService:
     
     def _get_content_internal(self, qr_id: str, db: Session) -> Optional[QRContentDisplay]:
         """Internal method to get content with database session"""
-        content_data = self.db_service.get_content_data(db, qr_id)
-        if not content_data:
-            return None
-        
-        # Get QR design info
-        qr_design = self.db_service.get_qr_design(db, qr_id)
+        # The design and its content come back from one joined query
+        qr_design = self.db_service.get_qr_design_with_content(db, qr_id)
         if not qr_design:
             return None
         
+        return self._content_display(qr_design)
+    
+    def get_all_content(self, db: Session = None) -> List[QRContentDisplay]:
+        """Get all content"""
+        if not db:
+            from app.core.database import SessionLocal
+            db = SessionLocal()
+            try:
+                return self._get_all_content_internal(db)
+            finally:
+                db.close()
+        else:
+            return self._get_all_content_internal(db)
+    
+    def _get_all_content_internal(self, db: Session) -> List[QRContentDisplay]:
+        """Internal method to get all content with database session"""
+        qr_designs = self.db_service.get_qr_designs_with_content(db)
+        return [self._content_display(design) for design in qr_designs]
+    
+    def _content_display(self, qr_design) -> QRContentDisplay:
+        """Display model of a design whose content_data is loaded"""
+        content_data = qr_design.content_data[0]
+        
         # Get image URL if exists
         image_url = None
         if content_data.image_filename:
@@ -152,7 +186,7 @@ class ContentService:
                 image_url = f"/uploads/{content_data.image_filename}"
         
         return QRContentDisplay(
-            qr_id=qr_id,
+            qr_id=qr_design.id,
             title=qr_design.title,
             description=qr_design.description,
             content=content_data.text_content or "",
@@ -162,43 +196,6 @@ class ContentService:
             qr_type=qr_design.qr_type
         )
     
-    def get_all_content(self, db: Session = None) -> List[QRContentDisplay]:
-        """Get all content"""
-        if not db:
-            from app.core.database import SessionLocal
-            db = SessionLocal()
-            try:
-                return self._get_all_content_internal(db)
-            finally:
-                db.close()
-        else:
-            return self._get_all_content_internal(db)
-    
-    def _get_all_content_internal(self, db: Session) -> List[QRContentDisplay]:
-        """Internal method to get all content with database session"""
-        qr_designs = self.db_service.get_all_qr_designs(db)
-        content_list = []
-        
-        for design in qr_designs:
-            content_data = self.db_service.get_content_data(db, design.id)
-            if content_data:
-                image_url = None
-                if content_data.image_filename:
-                    image_url = f"/uploads/{content_data.image_filename}"
-                
-                content_list.append(QRContentDisplay(
-                    qr_id=design.id,
-                    title=design.title,
-                    description=design.description,
-                    content=content_data.text_content or "",
-                    content_type=content_data.content_type,
-                    image_url=image_url,
-                    created_at=design.created_at,
-                    qr_type=design.qr_type
-                ))
-        
-        return content_list
-    
     def delete_content(self, qr_id: str, db: Session = None) -> bool:
         """Delete content by QR ID"""
         if not db:
@@ -213,5 +210,14 @@ class ContentService:
     
     def _delete_content_internal(self, qr_id: str, db: Session) -> bool:
         """Internal method to delete content with database session"""
+        content_data = self.db_service.get_content_data(db, qr_id)
+        
         # Delete QR design (this will cascade delete related content and images)
-        return self.db_service.delete_qr_design(db, qr_id) 
\ No newline at end of file
+        if not self.db_service.delete_qr_design(db, qr_id):
+            return False
+        
+        # Remove the shared text image once no active design references it
+        if content_data and content_data.content_hash:
+            if self.db_service.count_content_hash_references(db, content_data.content_hash) == 0:
+                self.text_to_image_service.delete_text_image(content_data.image_filename)
+        return True 
\ No newline at end of file
@@ -1,21 +1,56 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
-from typing import List, Optional, Dict, Any
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import and_, desc, insert
+from typing import List, Optional, Dict, Any, Tuple
 from app.models.database_models import QRDesign, ContentData, DesignImage, QRCodeUsage
 from app.models.qr_models import QRCodeRequest, QRCodeType
 from app.core.database import get_db
+from app.services.blob_store import upload_store, content_blob_name
+from app.services.usage_rollup_service import UsageRollupService
+from app.services.design_search import DesignSearch, listed_after
+from app.services.pagination import encode_cursor, decode_cursor
 import os
 import uuid
-from datetime import datetime
-import aiofiles
+from datetime import datetime, timezone
+import asyncio
+from contextlib import contextmanager
 from fastapi import UploadFile
 
+# Uploaded files are served, and referenced by logo_url, under this path
+UPLOAD_URL_PREFIX = "/uploads/"
+
 class DatabaseService:
     """Service for handling database operations related to QR designs"""
     
     def __init__(self):
-        self.upload_dir = "uploads"
-        os.makedirs(self.upload_dir, exist_ok=True)
+        self.uploads = upload_store
+        self.usage_rollups = UsageRollupService()
+        self.design_search = DesignSearch()
+    
+    @contextmanager
+    def unit_of_work(self, db: Session):
+        """
+        Stage the inserts of create_qr_design, save_content_data and
+        save_design_image made inside the block and commit them together on
+        exit, or roll all of them back if the block raises. Staged rows are not
+        flushed, so they cannot be queried back before the block ends.
+        """
+        depth = db.info.get("unit_of_work", 0)
+        db.info["unit_of_work"] = depth + 1
+        try:
+            yield db
+            if depth == 0:
+                db.commit()
+        except Exception:
+            if depth == 0:
+                db.rollback()
+            raise
+        finally:
+            db.info["unit_of_work"] = depth
+    
+    def _commit(self, db: Session):
+        """Commit now, or leave the changes to the enclosing unit of work"""
+        if not db.info.get("unit_of_work"):
+            db.commit()
     
     def create_qr_design(self, db: Session, qr_request: QRCodeRequest, qr_id: Optional[str] = None) -> QRDesign:
         """Create a new QR design in the database"""
@@ -34,21 +69,82 @@ class DatabaseService:
         )
         
         db.add(design)
-        db.commit()
-        db.refresh(design)
+        self._commit(db)
         return design
     
+    def create_qr_designs(self, db: Session, qr_requests: List[QRCodeRequest]) -> List[str]:
+        """Create several QR designs in a single transaction and return their IDs"""
+        designs = [
+            QRDesign(
+                id=str(uuid.uuid4()),
+                title=qr_request.title,
+                description=qr_request.description,
+                content=qr_request.content,
+                qr_type=qr_request.qr_type,
+                size=qr_request.size,
+                error_correction=qr_request.error_correction,
+                border=qr_request.border,
+                foreground_color=qr_request.foreground_color,
+                background_color=qr_request.background_color,
+                logo_url=qr_request.logo_url
+            )
+            for qr_request in qr_requests
+        ]
+        # IDs are assigned client-side, so read them before commit expires the objects
+        design_ids = [design.id for design in designs]
+        
+        db.add_all(designs)
+        db.commit()
+        return design_ids
+    
     def get_qr_design(self, db: Session, design_id: str) -> Optional[QRDesign]:
         """Get a QR design by ID"""
         return db.query(QRDesign).filter(
             and_(QRDesign.id == design_id, QRDesign.is_active == True)
         ).first()
     
-    def get_all_qr_designs(self, db: Session, limit: int = 100, offset: int = 0) -> List[QRDesign]:
-        """Get all QR designs with pagination"""
+    def get_qr_designs(self, db: Session, design_ids: List[str]) -> List[QRDesign]:
+        """Get the active QR designs among design_ids, in no particular order"""
+        if not design_ids:
+            return []
         return db.query(QRDesign).filter(
-            QRDesign.is_active == True
-        ).order_by(desc(QRDesign.created_at)).offset(offset).limit(limit).all()
+            and_(QRDesign.id.in_(design_ids), QRDesign.is_active == True)
+        ).all()
+    
+    def get_existing_design_ids(self, db: Session, design_ids: List[str], chunk_size: int = 500) -> set:
+        """Get which of design_ids belong to active designs, without loading the rows"""
+        existing = set()
+        for start in range(0, len(design_ids), chunk_size):
+            chunk = design_ids[start:start + chunk_size]
+            existing.update(
+                design_id for (design_id,) in db.query(QRDesign.id).filter(
+                    and_(QRDesign.id.in_(chunk), QRDesign.is_active == True)
+                )
+            )
+        return existing
+    
+    def get_all_qr_designs(self, db: Session, limit: int = 100, offset: int = 0,
+                           after_id: Optional[str] = None) -> List[QRDesign]:
+        """
+        Get all QR designs with pagination, newest first. Pass the last design
+        of the previous page as after_id to page by key instead of offset.
+        """
+        query = db.query(QRDesign).filter(QRDesign.is_active == True)
+        if after_id:
+            query = query.filter(listed_after(after_id))
+        return query.order_by(
+            desc(QRDesign.created_at), desc(QRDesign.id)
+        ).offset(offset).limit(limit).all()
+    
+    def get_qr_designs_page(self, db: Session, limit: int = 100, offset: int = 0,
+                            cursor: Optional[str] = None) -> Tuple[List[QRDesign], Optional[str]]:
+        """Get a page of QR designs and the cursor of the next page, if there is one"""
+        after_id = decode_cursor(cursor)["after"] if cursor else None
+        designs = self.get_all_qr_designs(db, limit + 1, offset, after_id)
+        if len(designs) <= limit:
+            return designs, None
+        designs = designs[:limit]
+        return designs, encode_cursor({"after": designs[-1].id})
     
     def update_qr_design(self, db: Session, design_id: str, update_data: Dict[str, Any]) -> Optional[QRDesign]:
         """Update a QR design"""
@@ -77,19 +173,24 @@ class DatabaseService:
     
     def save_content_data(self, db: Session, qr_design_id: str, content: str, 
                          content_type: str, image_filename: Optional[str] = None,
-                         image_path: Optional[str] = None) -> ContentData:
+                         image_path: Optional[str] = None, content_hash: Optional[str] = None,
+                         image_title: Optional[str] = None,
+                         image_description: Optional[str] = None) -> ContentData:
         """Save content data associated with a QR design"""
         content_data = ContentData(
+            id=str(uuid.uuid4()),
             qr_design_id=qr_design_id,
             content_type=content_type,
             text_content=content,
             image_filename=image_filename,
-            image_path=image_path
+            image_path=image_path,
+            content_hash=content_hash,
+            image_title=image_title,
+            image_description=image_description
         )
         
         db.add(content_data)
-        db.commit()
-        db.refresh(content_data)
+        self._commit(db)
         return content_data
     
     def get_content_data(self, db: Session, qr_design_id: str) -> Optional[ContentData]:
@@ -98,32 +199,63 @@ class DatabaseService:
             ContentData.qr_design_id == qr_design_id
         ).first()
     
+    def get_qr_design_with_content(self, db: Session, design_id: str) -> Optional[QRDesign]:
+        """Get an active QR design that has content data, loading its content in the same query"""
+        return db.query(QRDesign).join(QRDesign.content_data).options(
+            contains_eager(QRDesign.content_data)
+        ).filter(
+            and_(QRDesign.id == design_id, QRDesign.is_active == True)
+        ).first()
+    
+    def get_qr_designs_with_content(self, db: Session, limit: int = 100, offset: int = 0) -> List[QRDesign]:
+        """Get active QR designs that have content data, newest first, loading their content in the same query"""
+        return db.query(QRDesign).join(QRDesign.content_data).options(
+            contains_eager(QRDesign.content_data)
+        ).filter(QRDesign.is_active == True).order_by(
+            desc(QRDesign.created_at), desc(QRDesign.id)
+        ).offset(offset).limit(limit).all()
+    
+    def get_content_data_for_image(self, db: Session, image_filename: str) -> Optional[ContentData]:
+        """Get a content row of an active design whose text image is image_filename"""
+        query = db.query(ContentData).join(QRDesign, ContentData.qr_design_id == QRDesign.id).filter(
+            QRDesign.is_active == True
+        )
+        content_hash = image_filename[:-len("_text.png")]
+        if len(content_hash) == 32:
+            # Shared images are looked up by their indexed hash
+            return query.filter(ContentData.content_hash == content_hash).first()
+        return query.filter(ContentData.image_filename == image_filename).first()
+    
+    def count_content_hash_references(self, db: Session, content_hash: str) -> int:
+        """Count active designs whose content uses the text image with content_hash"""
+        return db.query(ContentData).join(QRDesign, ContentData.qr_design_id == QRDesign.id).filter(
+            and_(ContentData.content_hash == content_hash, QRDesign.is_active == True)
+        ).count()
+    
     async def save_design_image(self, db: Session, qr_design_id: str, 
                                image_file: UploadFile) -> DesignImage:
         """Save an image file associated with a QR design"""
-        # Generate unique filename
-        file_extension = os.path.splitext(image_file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = os.path.join(self.upload_dir, unique_filename)
+        content = await image_file.read()
         
-        # Save file to disk
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await image_file.read()
-            await f.write(content)
+        # Files are named by their content, so identical uploads share one blob
+        file_extension = os.path.splitext(image_file.filename or "")[1]
+        unique_filename = content_blob_name(content, file_extension)
+        await asyncio.to_thread(self.uploads.put, unique_filename, content, image_file.content_type)
+        file_path = self.uploads.location(unique_filename)
         
         # Create database record
         design_image = DesignImage(
+            id=str(uuid.uuid4()),
             qr_design_id=qr_design_id,
             filename=unique_filename,
-            original_filename=image_file.filename,
+            original_filename=image_file.filename or unique_filename,
             file_path=file_path,
             file_size=len(content),
             mime_type=image_file.content_type or "application/octet-stream"
         )
         
         db.add(design_image)
-        db.commit()
-        db.refresh(design_image)
+        self._commit(db)
         return design_image
     
     def get_design_images(self, db: Session, qr_design_id: str) -> List[DesignImage]:
@@ -138,14 +270,71 @@ class DatabaseService:
         if not image:
             return False
         
-        # Delete file from disk
-        if os.path.exists(image.file_path):
-            os.remove(image.file_path)
-        
         db.delete(image)
         db.commit()
+        
+        # Other designs may share the blob
+        if self.count_upload_references(db, image.filename) == 0:
+            self.uploads.delete(image.filename)
         return True
     
+    def count_upload_references(self, db: Session, filename: str) -> int:
+        """Count design images, content rows and active design logos that use the uploaded blob filename"""
+        images = db.query(DesignImage).filter(DesignImage.filename == filename).count()
+        contents = db.query(ContentData).filter(ContentData.image_filename == filename).count()
+        logos = db.query(QRDesign).filter(
+            and_(QRDesign.logo_url == f"{UPLOAD_URL_PREFIX}{filename}", QRDesign.is_active == True)
+        ).count()
+        return images + contents + logos
+    
+    def get_referenced_upload_filenames(self, db: Session) -> set:
+        """Uploaded blob filenames still used by active designs"""
+        filenames = {
+            filename for (filename,) in db.query(DesignImage.filename)
+            .join(QRDesign, DesignImage.qr_design_id == QRDesign.id)
+            .filter(QRDesign.is_active == True)
+        }
+        filenames.update(
+            filename for (filename,) in db.query(ContentData.image_filename)
+            .join(QRDesign, ContentData.qr_design_id == QRDesign.id)
+            .filter(and_(
+                QRDesign.is_active == True,
+                ContentData.image_filename != None,
+                ContentData.content_type != "text"
+            ))
+        )
+        # Logos are loaded from the upload store too (see LogoService.resolve)
+        filenames.update(
+            logo_url[len(UPLOAD_URL_PREFIX):] for (logo_url,) in db.query(QRDesign.logo_url)
+            .filter(and_(
+                QRDesign.is_active == True,
+                QRDesign.logo_url.startswith(UPLOAD_URL_PREFIX)
+            ))
+            .distinct()
+        )
+        return filenames
+    
+    def get_referenced_text_image_filenames(self, db: Session) -> set:
+        """Text image filenames still used by active designs"""
+        return {
+            filename for (filename,) in db.query(ContentData.image_filename)
+            .join(QRDesign, ContentData.qr_design_id == QRDesign.id)
+            .filter(and_(
+                QRDesign.is_active == True,
+                ContentData.content_type == "text",
+                ContentData.image_filename != None
+            ))
+        }
+    
+    def delete_inactive_design_images(self, db: Session) -> int:
+        """Delete image rows of soft-deleted designs and return how many were removed"""
+        inactive_ids = db.query(QRDesign.id).filter(QRDesign.is_active == False)
+        deleted = db.query(DesignImage).filter(
+            DesignImage.qr_design_id.in_(inactive_ids)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+    
     def record_qr_usage(self, db: Session, qr_design_id: str, 
                        ip_address: Optional[str] = None,
                        user_agent: Optional[str] = None,
@@ -154,6 +343,7 @@ class DatabaseService:
         """Record QR code usage for analytics"""
         usage = QRCodeUsage(
             qr_design_id=qr_design_id,
+            scanned_at=datetime.now(timezone.utc),
             ip_address=ip_address,
             user_agent=user_agent,
             referrer=referrer,
@@ -161,42 +351,55 @@ class DatabaseService:
         )
         
         db.add(usage)
+        self.usage_rollups.apply(db, [{
+            "qr_design_id": qr_design_id,
+            "scanned_at": usage.scanned_at,
+            "ip_address": ip_address,
+            "referrer": referrer
+        }])
         db.commit()
         db.refresh(usage)
         return usage
     
-    def get_qr_usage_stats(self, db: Session, qr_design_id: str) -> Dict[str, Any]:
-        """Get usage statistics for a QR design"""
-        total_scans = db.query(QRCodeUsage).filter(
-            QRCodeUsage.qr_design_id == qr_design_id
-        ).count()
+    def record_qr_usage_batch(self, db: Session, events: List[Dict[str, Any]]) -> int:
+        """Record many QR code usage events with a single multi-row insert"""
+        if not events:
+            return 0
+        db.execute(insert(QRCodeUsage).values(events))
+        self.usage_rollups.apply(db, events)
+        db.commit()
+        return len(events)
+    
+    def get_qr_usage_stats(self, db: Session, qr_design_id: str, period: str = "day",
+                           since: Optional[datetime] = None,
+                           until: Optional[datetime] = None) -> Dict[str, Any]:
+        """Get usage statistics for a QR design from its rollups"""
+        stats = self.usage_rollups.get_usage(db, qr_design_id, period, since, until)
         
         recent_scans = db.query(QRCodeUsage).filter(
             QRCodeUsage.qr_design_id == qr_design_id
         ).order_by(desc(QRCodeUsage.scanned_at)).limit(10).all()
         
-        return {
-            "total_scans": total_scans,
-            "recent_scans": [
-                {
-                    "scanned_at": scan.scanned_at,
-                    "ip_address": scan.ip_address,
-                    "user_agent": scan.user_agent
-                }
-                for scan in recent_scans
-            ]
-        }
+        stats["recent_scans"] = [
+            {
+                "scanned_at": scan.scanned_at,
+                "ip_address": scan.ip_address,
+                "user_agent": scan.user_agent
+            }
+            for scan in recent_scans
+        ]
+        return stats
     
     def search_qr_designs(self, db: Session, query: str, limit: int = 50) -> List[QRDesign]:
-        """Search QR designs by title, description, or content"""
-        search_term = f"%{query}%"
-        return db.query(QRDesign).filter(
-            and_(
-                QRDesign.is_active == True,
-                (
-                    QRDesign.title.ilike(search_term) |
-                    QRDesign.description.ilike(search_term) |
-                    QRDesign.content.ilike(search_term)
-                )
-            )
-        ).order_by(desc(QRDesign.created_at)).limit(limit).all() 
\ No newline at end of file
+        """Search QR designs by title, description, or content, best matches first"""
+        return [design for design, _ in self.design_search.search(db, query, limit)]
+    
+    def search_qr_designs_page(self, db: Session, query: str, limit: int = 50,
+                               cursor: Optional[str] = None) -> Tuple[List[QRDesign], Optional[str]]:
+        """Get a page of search results and the cursor of the next page, if there is one"""
+        after = decode_cursor(cursor) if cursor else None
+        results = self.design_search.search(db, query, limit + 1, after)
+        if len(results) <= limit:
+            return [design for design, _ in results], None
+        results = results[:limit]
+        return [design for design, _ in results], encode_cursor(self.design_search.position(*results[-1]))
\ No newline at end of file
@@ -0,0 +1,121 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import and_, desc, inspect, literal, literal_column, select, text, tuple_
+from sqlalchemy.orm import Session
+from app.models.database_models import QRDesign
+
+# Query words; everything else (quotes, operators, punctuation) is dropped
+WORD = re.compile(r"\w+", re.UNICODE)
+
+# Mapped columns only; PostgreSQL rows also carry search_vector
+DESIGN_COLUMNS = ", ".join(f"qr_designs.{column.name}" for column in QRDesign.__table__.columns)
+
+# bm25 weights of the FTS5 columns: title, description, content
+FTS5_WEIGHTS = "10.0, 4.0, 1.0"
+
+class DesignSearch:
+    """
+    Ranked prefix search over active designs.
+
+    Uses the full-text index of migrations 0005 and 0008 (FTS5 on SQLite,
+    tsvector on PostgreSQL); on other databases, or before the migration has
+    run, falls back to a substring scan. Every query word must match the
+    start of a word in the title, description or content.
+    """
+
+    def __init__(self):
+        self._backends = {}
+
+    def backend(self, db: Session) -> str:
+        """'fts5', 'tsvector' or 'like' for the session's database"""
+        bind = db.get_bind()
+        backend = self._backends.get(bind.url)
+        if backend is None:
+            dialect = bind.dialect.name
+            inspector = inspect(bind)
+            if dialect == "sqlite" and inspector.has_table("qr_designs_fts"):
+                backend = "fts5"
+            elif dialect == "postgresql" and "search_vector" in {
+                column["name"] for column in inspector.get_columns("qr_designs")
+            }:
+                backend = "tsvector"
+            else:
+                backend = "like"
+            self._backends[bind.url] = backend
+        return backend
+
+    def search(self, db: Session, query: str, limit: int = 50,
+               after: Optional[Dict[str, Any]] = None) -> List[Tuple[QRDesign, float]]:
+        """
+        Active designs matching query with their rank, best matches (lowest
+        rank) first. after is the position of the last result of the previous
+        page, as returned by position().
+        """
+        words = WORD.findall(query)
+        if not words:
+            return []
+
+        backend = self.backend(db)
+        if backend == "like":
+            return self._search_like(db, query, limit, after)
+
+        if backend == "fts5":
+            # Each word as a quoted prefix term; FTS5 ANDs adjacent terms
+            params: Dict[str, Any] = {"match": " ".join(f'"{word}"*' for word in words)}
+            ranked = f"""
+                SELECT {DESIGN_COLUMNS}, bm25(qr_designs_fts, {FTS5_WEIGHTS}) AS rank
+                FROM qr_designs_fts JOIN qr_designs ON qr_designs.search_rowid = qr_designs_fts.rowid
+                WHERE qr_designs_fts MATCH :match AND qr_designs.is_active
+            """
+        else:
+            params = {"tsquery": " & ".join(f"{word}:*" for word in words)}
+            ranked = f"""
+                SELECT {DESIGN_COLUMNS}, -ts_rank(search_vector, to_tsquery('simple', :tsquery)) AS rank
+                FROM qr_designs
+                WHERE qr_designs.is_active AND search_vector @@ to_tsquery('simple', :tsquery)
+            """
+
+        # Ties on rank are broken by the listing order, (created_at, id) descending
+        keyset = ""
+        if after:
+            keyset = """
+                WHERE rank > :after_rank OR (rank = :after_rank AND (created_at, id) <
+                    ((SELECT created_at FROM qr_designs WHERE id = :after_id), :after_id))
+            """
+            params.update(after_rank=float(after.get("rank", 0.0)), after_id=after["after"])
+        statement = text(f"""
+            SELECT * FROM ({ranked}) AS ranked
+            {keyset}
+            ORDER BY rank, created_at DESC, id DESC
+            LIMIT :limit
+        """)
+        params["limit"] = limit
+        rows = db.execute(select(QRDesign, literal_column("rank")).from_statement(statement), params)
+        return [(design, rank) for design, rank in rows]
+
+    def position(self, design: QRDesign, rank: float) -> Dict[str, Any]:
+        """Cursor position just after a search result"""
+        return {"after": design.id, "rank": rank}
+
+    def _search_like(self, db: Session, query: str, limit: int,
+                     after: Optional[Dict[str, Any]]) -> List[Tuple[QRDesign, float]]:
+        search_term = f"%{query}%"
+        designs = db.query(QRDesign).filter(
+            and_(
+                QRDesign.is_active == True,
+                (
+                    QRDesign.title.ilike(search_term) |
+                    QRDesign.description.ilike(search_term) |
+                    QRDesign.content.ilike(search_term)
+                )
+            )
+        )
+        if after:
+            designs = designs.filter(listed_after(after["after"]))
+        designs = designs.order_by(desc(QRDesign.created_at), desc(QRDesign.id)).limit(limit)
+        return [(design, 0.0) for design in designs]
+
+def listed_after(design_id: str):
+    """Filter for designs after design_id in the listing order, (created_at, id) descending"""
+    created_at = select(QRDesign.created_at).where(QRDesign.id == design_id).scalar_subquery()
+    return tuple_(QRDesign.created_at, QRDesign.id) < tuple_(created_at, literal(design_id))
@@ -0,0 +1,87 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.services.blob_store import LocalBlobStore
+
+class DiskCache:
+    """
+    Size-bounded directory of regenerable files with least-recently-used eviction.
+
+    Files are laid out in hash shards by a LocalBlobStore. The index is rebuilt
+    from the directory on startup (oldest modification first), so files
+    written by earlier runs are accounted for. Files may also
+    disappear underneath the index, e.g. when evicted by another worker
+    process; lookups check the disk and treat that as a miss.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.store = LocalBlobStore(directory)
+        files = [(mtime, name, size) for name, size, mtime in self.store.iter_blobs()]
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._bytes += size
+
+    def path(self, name: str) -> str:
+        """Location to write a cache entry to"""
+        return self.store.path(name)
+
+    def get(self, name: str) -> Optional[str]:
+        """Path of a cached file, marking it recently used, or None on a miss"""
+        with self._lock:
+            path = self.store.find(name)
+            if path:
+                if name not in self._entries:
+                    # Written by another process or an earlier code path
+                    self._entries[name] = os.path.getsize(path)
+                    self._bytes += self._entries[name]
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return path
+
+            self._bytes -= self._entries.pop(name, 0)
+            self.misses += 1
+            return None
+
+    def add(self, name: str):
+        """Account for a file just written into the cache directory and evict to fit"""
+        size = os.path.getsize(self.store.find(name) or self.path(name))
+        with self._lock:
+            self._bytes -= self._entries.pop(name, 0)
+            self._entries[name] = size
+            self._bytes += size
+
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                evicted, evicted_size = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+                self.store.delete(evicted)
+
+    def discard(self, name: str) -> bool:
+        """Remove an entry and its file"""
+        with self._lock:
+            self._bytes -= self._entries.pop(name, 0)
+        return self.store.delete(name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,86 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from PIL import ImageFont
+from app.core.config import settings
+
+# Font files tried in order for each face; the first one that loads wins
+FACE_CANDIDATES: Dict[str, List[str]] = {
+    "sans": [
+        "arial.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+        "/Library/Fonts/Arial.ttf",
+        "C:\\Windows\\Fonts\\arial.ttf",
+    ],
+}
+
+class FontRegistry:
+    """Process-wide cache of loaded fonts and measured line widths"""
+
+    def __init__(self, measure_cache_entries: int = 4096):
+        self._lock = threading.Lock()
+        self._paths: Dict[str, Optional[str]] = {}
+        self._fonts: Dict[Tuple[str, int], ImageFont.ImageFont] = {}
+        self._widths: "OrderedDict[Tuple[str, int, str], int]" = OrderedDict()
+        self.measure_cache_entries = measure_cache_entries
+
+    def _resolve(self, face: str) -> Optional[str]:
+        """Font file for a face, or None to use PIL's built-in font"""
+        if face not in self._paths:
+            candidates = list(FACE_CANDIDATES.get(face, []))
+            if settings.TEXT_FONT_PATH:
+                candidates.insert(0, settings.TEXT_FONT_PATH)
+            self._paths[face] = None
+            for path in candidates:
+                try:
+                    ImageFont.truetype(path, 12)
+                except OSError:
+                    continue
+                self._paths[face] = path
+                break
+        return self._paths[face]
+
+    def font_path(self, face: str = "sans") -> Optional[str]:
+        """Font file a face resolves to, or None for PIL's built-in font"""
+        with self._lock:
+            return self._resolve(face)
+
+    def get(self, face: str = "sans", size: int = 24) -> ImageFont.ImageFont:
+        """Get a font, loading it from disk only the first time"""
+        key = (face, size)
+        font = self._fonts.get(key)
+        if font is None:
+            with self._lock:
+                font = self._fonts.get(key)
+                if font is None:
+                    path = self._resolve(face)
+                    font = ImageFont.truetype(path, size) if path else ImageFont.load_default(size)
+                    self._fonts[key] = font
+        return font
+
+    def measure(self, text: str, face: str = "sans", size: int = 24) -> int:
+        """Ink width of a single line of text, in pixels"""
+        key = (face, size, text)
+        with self._lock:
+            width = self._widths.get(key)
+            if width is not None:
+                self._widths.move_to_end(key)
+                return width
+
+        bbox = self.get(face, size).getbbox(text)
+        width = bbox[2] - bbox[0]
+
+        with self._lock:
+            self._widths[key] = width
+            if len(self._widths) > self.measure_cache_entries:
+                self._widths.popitem(last=False)
+        return width
+
+    def warm(self, sizes: Iterable[int], face: str = "sans"):
+        """Load fonts ahead of the first render"""
+        for size in sizes:
+            self.get(face, size)
+
+font_registry = FontRegistry(measure_cache_entries=settings.TEXT_MEASURE_CACHE_ENTRIES)
@@ -0,0 +1,107 @@
+import os
+import numpy as np
+from PIL import Image
+from typing import List, Optional, Tuple
+from app.core.config import settings
+from app.services.blob_store import upload_store
+from app.services.render_cache import RenderCache
+
+# Share of codewords each error correction level can restore
+RECOVERY_CAPACITY = {"L": 0.07, "M": 0.15, "Q": 0.25, "H": 0.30}
+LEVEL_ORDER = ["L", "M", "Q", "H"]
+
+class LogoService:
+    """Loads, resizes and composites logos over rendered QR codes"""
+
+    def __init__(self, logo_dirs: Optional[List[str]] = None):
+        self.logo_dirs = [
+            os.path.realpath(directory)
+            for directory in (logo_dirs or [settings.UPLOAD_DIR, settings.STATIC_DIR])
+        ]
+        # Decoded logos keyed by source, file version and target size, stored
+        # already resampled with premultiplied alpha
+        self.cache = RenderCache(
+            max_entries=settings.QR_LOGO_CACHE_MAX_ENTRIES,
+            max_bytes=settings.QR_LOGO_CACHE_MAX_BYTES,
+        )
+
+    def resolve(self, logo_url: str) -> Optional[str]:
+        """Map a logo URL to a readable local file, or None if it is not servable"""
+        if logo_url.startswith("/uploads/"):
+            # Uploads in a remote blob store have no local file
+            candidate = upload_store.local_path(logo_url[len("/uploads/"):])
+            if not candidate:
+                return None
+        elif "://" in logo_url:
+            # Remote logos are not fetched
+            return None
+        else:
+            candidate = logo_url
+
+        path = os.path.realpath(candidate)
+        if not any(path.startswith(directory + os.sep) for directory in self.logo_dirs):
+            return None
+        return path if os.path.isfile(path) else None
+
+    def fingerprint(self, logo_url: Optional[str]) -> Optional[Tuple[str, int, int]]:
+        """Identify the current version of a logo file, for use in render keys"""
+        if not logo_url:
+            return None
+        path = self.resolve(logo_url)
+        if not path:
+            return None
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+
+    def error_correction_for(self, level: str) -> str:
+        """
+        Lowest error correction level, no lower than the requested one, whose
+        recovery capacity leaves a safety margin over the modules the logo hides
+        """
+        needed = settings.QR_LOGO_SCALE ** 2 / settings.QR_LOGO_MAX_RECOVERY_SHARE
+        for candidate in LEVEL_ORDER[LEVEL_ORDER.index(level):]:
+            if RECOVERY_CAPACITY[candidate] >= needed:
+                return candidate
+        return "H"
+
+    def load(self, logo_url: str, size: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Get a logo resampled to size x size as premultiplied RGB and alpha arrays"""
+        fingerprint = self.fingerprint(logo_url)
+        if fingerprint is None:
+            return None
+
+        key = (fingerprint, size)
+        logo = self.cache.get(key)
+        if logo is not None:
+            return logo
+
+        with Image.open(fingerprint[0]) as source:
+            source = source.convert("RGBA")
+            # Fit inside the square while keeping the aspect ratio
+            source.thumbnail((size, size), Image.LANCZOS)
+            canvas = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+            canvas.paste(source, ((size - source.width) // 2, (size - source.height) // 2))
+
+        pixels = np.asarray(canvas, dtype=np.uint16)
+        alpha = pixels[:, :, 3:4]
+        premultiplied = (pixels[:, :, :3] * alpha + 127) // 255
+        logo = (premultiplied.astype(np.uint16), alpha)
+        for array in logo:
+            array.flags.writeable = False
+        self.cache.put(key, logo, premultiplied.nbytes + alpha.nbytes)
+        return logo
+
+    def composite(self, image: Image.Image, logo_url: str, symbol_size: int, border_size: int) -> Image.Image:
+        """Draw a logo centered over the symbol area of a rendered RGB QR image"""
+        size = max(1, int(round(symbol_size * settings.QR_LOGO_SCALE)))
+        logo = self.load(logo_url, size)
+        if logo is None:
+            return image
+
+        premultiplied, alpha = logo
+        offset = border_size + (symbol_size - size) // 2
+        pixels = np.array(image.convert("RGB"), dtype=np.uint16)
+        region = pixels[offset:offset + size, offset:offset + size]
+        # Source-over with premultiplied alpha
+        region[:] = premultiplied + (region * (255 - alpha) + 127) // 255
+        return Image.fromarray(pixels.astype(np.uint8))
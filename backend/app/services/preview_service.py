@@ -0,0 +1,120 @@
+import asyncio
+import base64
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+from pydantic import ValidationError
+from app.core.config import settings
+from app.models.qr_models import QRCodeRequest, OutputFormat
+from app.services.qr_service import QRCodeService, render_uncached_in_worker
+from app.services.render_executor import render_executor
+
+class PreviewService:
+    """Renders low-resolution, non-persisted previews for interactive editing"""
+
+    def __init__(self, qr_service: QRCodeService):
+        self.qr_service = qr_service
+
+    async def run_session(self, receive: Callable[[], Awaitable[str]],
+                          send: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """
+        Serve preview frames until receive raises (e.g. on disconnect).
+
+        Frames keep arriving while a render is running, but only the newest
+        one is rendered next; superseded frames are dropped and counted in the
+        following response.
+        """
+        latest: Optional[str] = None
+        dropped = 0
+        frame_ready = asyncio.Event()
+
+        async def read_frames():
+            nonlocal latest, dropped
+            while True:
+                message = await receive()
+                if latest is not None:
+                    dropped += 1
+                latest = message
+                frame_ready.set()
+
+        reader = asyncio.create_task(read_frames())
+        try:
+            while True:
+                waiter = asyncio.create_task(frame_ready.wait())
+                await asyncio.wait({waiter, reader}, return_when=asyncio.FIRST_COMPLETED)
+                if reader.done():
+                    waiter.cancel()
+                    # Re-raise whatever ended the session
+                    reader.result()
+                    return
+
+                frame_ready.clear()
+                message, latest = latest, None
+                skipped, dropped = dropped, 0
+
+                response = await self.render_frame(message)
+                response["dropped"] = skipped
+                await send(response)
+        finally:
+            reader.cancel()
+
+    async def render_frame(self, raw_message: str) -> Dict[str, Any]:
+        """Render one preview frame from a raw client message"""
+        seq = None
+        try:
+            message = json.loads(raw_message)
+            if not isinstance(message, dict):
+                raise ValueError("Preview frames must be JSON objects")
+            seq = message.get("seq")
+            request = self.preview_request(message)
+        except (ValidationError, ValueError, TypeError) as e:
+            return {"seq": seq, "success": False, "error": str(e)}
+
+        try:
+            formatted_content = self.qr_service.format_qr_content(request)
+            error_correction = self.qr_service.error_correction_level(request)
+            # Reuses the cached module matrix, so color and border edits
+            # only pay for rasterizing
+            symbol = self.qr_service.engine.symbol_info(
+                formatted_content, self.qr_service._get_error_correction(error_correction)
+            )
+
+            # Scale down to fit the preview bound, never up
+            modules = symbol["modules"] + 2 * request.border
+            request.size = max(1, min(request.size, settings.QR_PREVIEW_MAX_PIXELS // modules))
+
+            # Frames are rendered once and thrown away, so they stay out of
+            # the output cache shared with /generate and image requests
+            if render_executor.pool_for("preview") == "process":
+                data = await render_executor.run(
+                    "preview", render_uncached_in_worker, request.model_dump(mode="json"), formatted_content
+                )
+            else:
+                data = await render_executor.run("preview", self.qr_service.render_uncached, request, formatted_content)
+        except Exception as e:
+            return {"seq": seq, "success": False, "error": str(e)}
+
+        return {
+            "seq": seq,
+            "success": True,
+            "qr_code_data": f"data:{self.qr_service.media_type(request)};base64,{base64.b64encode(data).decode()}",
+            "metadata": {
+                "content": formatted_content,
+                "size": request.size,
+                "error_correction": error_correction,
+                "version": symbol["version"],
+                "modules": symbol["modules"],
+                "encoded_bytes": len(data)
+            }
+        }
+
+    def preview_request(self, message: Dict[str, Any]) -> QRCodeRequest:
+        """Build the render request for a preview frame, forced to fast PNG output"""
+        fields = {key: value for key, value in message.items() if key != "seq"}
+        request = QRCodeRequest(**fields)
+        if not request.content.strip():
+            raise ValueError("Content cannot be empty")
+
+        request.format = OutputFormat.PNG
+        request.output_profile = None
+        request.compression_level = settings.QR_PREVIEW_COMPRESS_LEVEL
+        return request
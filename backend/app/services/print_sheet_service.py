@@ -0,0 +1,213 @@
+import io
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from app.core.config import settings
+from app.models.qr_models import QRCodeRequest, SheetTemplate, OutputFormat
+from app.services.content_service import ContentService
+from app.services.database_service import DatabaseService
+from app.services.qr_service import QRCodeService
+from app.services.vector_writers import PDFWriter, pdf_color, pdf_symbol_ops
+
+# Designs are loaded from the database this many at a time
+DESIGN_CHUNK_SIZE = 500
+
+# Average Helvetica glyph width as a share of the font size, used to fit and
+# center captions without font metrics
+CAPTION_CHAR_WIDTH = 0.55
+
+Label = Tuple[QRCodeRequest, str, Optional[str]]
+
+def _num(value: float) -> str:
+    """Compact PDF number"""
+    return f"{value:.3f}".rstrip("0").rstrip(".")
+
+def _pdf_text(text: str) -> str:
+    """Escape text as a WinAnsi PDF string literal"""
+    encoded = text.encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + encoded.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+class PrintSheetService:
+    """Lays out many QR codes per page as a streamed vector PDF"""
+
+    def __init__(self, qr_service: QRCodeService):
+        self.qr_service = qr_service
+
+    def validate_template(self, template: SheetTemplate):
+        """Raise ValueError if the template leaves no room for labels"""
+        width, height = self._cell_size(template)
+        if width <= 0 or height - self._caption_height(template) <= 0:
+            raise ValueError("Sheet template margins and gutters leave no room for labels")
+
+    def request_labels(self, requests: Iterable[QRCodeRequest]) -> Iterator[Label]:
+        """Labels for ad hoc requests"""
+        for request in requests:
+            yield request, self.qr_service.format_qr_content(request), request.title
+
+    def design_labels(self, design_ids: List[str]) -> Iterator[Label]:
+        """Labels for saved designs, loaded in chunks in the given order"""
+        from app.core.database import SessionLocal
+
+        db_service = DatabaseService()
+        content_service = ContentService()
+        db = SessionLocal()
+        try:
+            for start in range(0, len(design_ids), DESIGN_CHUNK_SIZE):
+                chunk = design_ids[start:start + DESIGN_CHUNK_SIZE]
+                designs = {design.id: design for design in db_service.get_qr_designs(db, chunk)}
+                for design_id in chunk:
+                    design = designs.get(design_id)
+                    if design is None:
+                        continue
+                    request = self.qr_service.request_for_design(design)
+                    image_url = None
+                    if design.qr_type == "content":
+                        content = content_service.get_content(design_id, db)
+                        image_url = content.image_url if content else None
+                    yield request, self.qr_service.format_qr_content(request, design_id, image_url), design.title
+                # Loaded designs are not needed once their chunk is laid out
+                db.expunge_all()
+        finally:
+            db.close()
+
+    def iter_pdf(self, labels: Iterable[Label], template: SheetTemplate) -> Iterator[bytes]:
+        """
+        Stream a print-sheet PDF, yielding each page's bytes as soon as it is
+        laid out.
+
+        Each distinct symbol is written once as a Form XObject and drawn by
+        reference wherever it repeats. Only the object numbers of recently used
+        symbols and the page list are kept in memory.
+        """
+        buffer = io.BytesIO()
+        writer = PDFWriter(buffer)
+        catalog, pages, font = writer.reserve(), writer.reserve(), writer.reserve()
+        writer.write_object(font, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+        symbols: "OrderedDict[tuple, Tuple[int, int]]" = OrderedDict()
+        page_numbers: List[int] = []
+        per_page = template.columns * template.rows
+
+        def drain() -> bytes:
+            data = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return data
+
+        page_labels: List[Label] = []
+        for label in labels:
+            page_labels.append(label)
+            if len(page_labels) == per_page:
+                page_numbers.append(self._write_page(writer, template, page_labels, symbols, pages, font))
+                page_labels = []
+                yield drain()
+
+        if page_labels or not page_numbers:
+            page_numbers.append(self._write_page(writer, template, page_labels, symbols, pages, font))
+
+        kids = " ".join(f"{number} 0 R" for number in page_numbers)
+        writer.write_object(pages, f"<< /Type /Pages /Kids [{kids}] /Count {len(page_numbers)} >>")
+        writer.write_object(catalog, f"<< /Type /Catalog /Pages {pages} 0 R >>")
+        writer.close(catalog)
+        yield drain()
+
+    def _write_page(self, writer: PDFWriter, template: SheetTemplate, labels: List[Label],
+                    symbols: "OrderedDict[tuple, Tuple[int, int]]", pages: int, font: int) -> int:
+        """Write one page of labels and return its object number"""
+        cell_width, cell_height = self._cell_size(template)
+        caption_height = self._caption_height(template)
+        symbol_size = min(cell_width, cell_height - caption_height)
+        font_size = template.caption_font_size
+
+        ops: List[str] = []
+        used: Dict[int, None] = {}
+        for index, (request, formatted_content, caption) in enumerate(labels):
+            column, row = index % template.columns, index // template.columns
+            cell_x = template.margin_left + column * (cell_width + template.gutter_x)
+            cell_top = template.page_height - template.margin_top - row * (cell_height + template.gutter_y)
+
+            number, modules = self._symbol(writer, request, formatted_content, symbols)
+            used[number] = None
+            scale = symbol_size / modules
+            x = cell_x + (cell_width - symbol_size) / 2
+            y = cell_top - symbol_size
+            ops.append(f"q {_num(scale)} 0 0 {_num(scale)} {_num(x)} {_num(y)} cm /S{number} Do Q")
+
+            if template.caption and caption:
+                text = self._fit_caption(caption, cell_width, font_size)
+                text_x = cell_x + max(0.0, (cell_width - len(text) * font_size * CAPTION_CHAR_WIDTH) / 2)
+                text_y = y - font_size * 1.1
+                ops.append(f"BT 0 g /F1 {_num(font_size)} Tf {_num(text_x)} {_num(text_y)} Td {_pdf_text(text)} Tj ET")
+
+        content = writer.reserve()
+        writer.write_stream(content, "\n".join(ops).encode("latin-1"))
+
+        xobjects = " ".join(f"/S{number} {number} 0 R" for number in used)
+        page = writer.reserve()
+        writer.write_object(
+            page,
+            f"<< /Type /Page /Parent {pages} 0 R "
+            f"/MediaBox [0 0 {_num(template.page_width)} {_num(template.page_height)}] "
+            f"/Contents {content} 0 R /Resources << /XObject << {xobjects} >> /Font << /F1 {font} 0 R >> >> >>"
+        )
+        return page
+
+    def _symbol(self, writer: PDFWriter, request: QRCodeRequest, formatted_content: str,
+                symbols: "OrderedDict[tuple, Tuple[int, int]]") -> Tuple[int, int]:
+        """Object number and size in modules of the Form XObject for a symbol, writing it if needed"""
+        # Logos are only drawn on raster output, so don't let them raise the EC level
+        vector_request = request.model_copy(update={"format": OutputFormat.PDF})
+        error_correction = self.qr_service.error_correction_level(vector_request)
+        key = (
+            formatted_content,
+            error_correction,
+            request.border,
+            request.foreground_color.lower(),
+            request.background_color.lower(),
+        )
+        if key in symbols:
+            symbols.move_to_end(key)
+            return symbols[key]
+
+        matrix = self.qr_service.engine.encode(
+            formatted_content, self.qr_service._get_error_correction(error_correction)
+        )
+        modules = matrix.shape[0] + 2 * request.border
+        # One unit is one module, with the y axis flipped so row 0 is at the top
+        stream = b"\n".join([
+            f"{pdf_color(request.background_color)} rg 0 0 {modules} {modules} re f".encode("latin-1"),
+            f"{pdf_color(request.foreground_color)} rg".encode("latin-1"),
+            f"1 0 0 -1 {request.border} {modules - request.border} cm".encode("latin-1"),
+            pdf_symbol_ops(matrix),
+        ])
+        number = writer.reserve()
+        writer.write_stream(number, stream, f" /Type /XObject /Subtype /Form /BBox [0 0 {modules} {modules}]")
+
+        symbols[key] = (number, modules)
+        if len(symbols) > settings.QR_PRINT_SYMBOL_CACHE_ENTRIES:
+            # An evicted symbol that comes back is simply written again
+            symbols.popitem(last=False)
+        return number, modules
+
+    def _cell_size(self, template: SheetTemplate) -> Tuple[float, float]:
+        """Width and height of one label cell"""
+        width = (
+            template.page_width - template.margin_left - template.margin_right
+            - (template.columns - 1) * template.gutter_x
+        ) / template.columns
+        height = (
+            template.page_height - template.margin_top - template.margin_bottom
+            - (template.rows - 1) * template.gutter_y
+        ) / template.rows
+        return width, height
+
+    def _caption_height(self, template: SheetTemplate) -> float:
+        """Vertical space reserved under each symbol for its caption"""
+        return template.caption_font_size * 1.5 if template.caption else 0.0
+
+    def _fit_caption(self, caption: str, width: float, font_size: float) -> str:
+        """Truncate a caption to fit the cell width"""
+        caption = " ".join(caption.split())
+        max_chars = max(1, int(width / (font_size * CAPTION_CHAR_WIDTH)))
+        if len(caption) <= max_chars:
+            return caption
+        return caption[:max(1, max_chars - 3)].rstrip() + "..."
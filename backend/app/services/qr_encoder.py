@@ -0,0 +1,338 @@
+import numpy as np
+from functools import lru_cache
+from typing import List, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+from qrcode import base, util
+from app.services.qr_segments import ALPHANUMERIC, BYTE, KANJI, MODE_INDICATORS, NUMERIC, CHAR_COUNT_BITS
+
+# GF(256) with the QR primitive polynomial x^8 + x^4 + x^3 + x^2 + 1. The
+# antilog table is doubled so products can index it without a modulo.
+GF_EXP = np.zeros(512, dtype=np.uint8)
+GF_LOG = np.zeros(256, dtype=np.int32)
+
+_value = 1
+for _power in range(255):
+    GF_EXP[_power] = _value
+    GF_LOG[_value] = _power
+    _value <<= 1
+    if _value & 0x100:
+        _value ^= 0x11D
+GF_EXP[255:510] = GF_EXP[:255]
+
+ALPHANUMERIC_TABLE = {char: index for index, char in enumerate("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:")}
+
+PAD_BYTES = (0xEC, 0x11)
+
+FORMAT_GENERATOR = 0b10100110111
+FORMAT_MASK = 0b101010000010010
+VERSION_GENERATOR = 0b1111100100101
+
+# The 11-module finder-like patterns penalized by mask evaluation
+FINDER_PATTERNS = np.array([
+    [1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0],
+    [0, 0, 0, 0, 1, 0, 1, 1, 1, 0, 1],
+], dtype=bool)
+
+@lru_cache(maxsize=None)
+def generator_polynomial(degree: int) -> np.ndarray:
+    """Reed-Solomon generator polynomial of a degree, as log coefficients without the leading term"""
+    poly = [1]
+    for power in range(degree):
+        # Multiply by (x - alpha^power)
+        product = poly + [0]
+        for index, coefficient in enumerate(poly):
+            if coefficient:
+                product[index + 1] ^= int(GF_EXP[GF_LOG[coefficient] + power])
+        poly = product
+    return GF_LOG[np.array(poly[1:], dtype=np.int32)]
+
+def reed_solomon_remainder(data: np.ndarray, degree: int) -> np.ndarray:
+    """Error correction codewords for a block of data codewords"""
+    generator_logs = generator_polynomial(degree)
+    remainder = np.zeros(degree, dtype=np.uint8)
+    for byte in data:
+        factor = int(byte) ^ int(remainder[0])
+        remainder[:-1] = remainder[1:]
+        remainder[-1] = 0
+        if factor:
+            remainder ^= GF_EXP[generator_logs + GF_LOG[factor]]
+    return remainder
+
+class _BitWriter:
+    """Accumulates a big-endian bit string in a Python integer"""
+
+    def __init__(self):
+        self.value = 0
+        self.length = 0
+
+    def put(self, number: int, length: int):
+        self.value = (self.value << length) | number
+        self.length += length
+
+def _write_segment(writer: _BitWriter, mode: str, text: str, version: int):
+    """Append a segment's mode indicator, character count and data bits"""
+    group = 0 if version < 10 else 1 if version < 27 else 2
+    data = text.encode("utf-8") if mode == BYTE else text
+    writer.put(MODE_INDICATORS[mode], 4)
+    writer.put(len(data), CHAR_COUNT_BITS[mode][group])
+
+    if mode == NUMERIC:
+        for index in range(0, len(text), 3):
+            chunk = text[index:index + 3]
+            writer.put(int(chunk), util.NUMBER_LENGTH[len(chunk)])
+    elif mode == ALPHANUMERIC:
+        for index in range(0, len(text) - 1, 2):
+            writer.put(ALPHANUMERIC_TABLE[text[index]] * 45 + ALPHANUMERIC_TABLE[text[index + 1]], 11)
+        if len(text) % 2:
+            writer.put(ALPHANUMERIC_TABLE[text[-1]], 6)
+    elif mode == KANJI:
+        for char in text:
+            encoded = char.encode("shift_jis")
+            code = (encoded[0] << 8) | encoded[1]
+            code -= 0x8140 if code <= 0x9FFC else 0xC140
+            writer.put((code >> 8) * 0xC0 + (code & 0xFF), 13)
+    else:
+        for byte in data:
+            writer.put(byte, 8)
+
+def codewords(segments: List[Tuple[str, str]], version: int, error_correction: int) -> np.ndarray:
+    """Final interleaved data and error correction codewords for a symbol"""
+    blocks = base.rs_blocks(version, error_correction)
+    capacity = sum(block.data_count for block in blocks) * 8
+
+    writer = _BitWriter()
+    for mode, text in segments:
+        _write_segment(writer, mode, text, version)
+    if writer.length > capacity:
+        raise ValueError(f"Data needs {writer.length} bits but version {version} holds {capacity}")
+
+    # Terminator, byte alignment, then alternating pad codewords
+    writer.put(0, min(4, capacity - writer.length))
+    writer.put(0, -writer.length % 8)
+    data = writer.value.to_bytes(writer.length // 8, "big")
+    pad_count = capacity // 8 - len(data)
+    data += bytes(PAD_BYTES[index % 2] for index in range(pad_count))
+    data = np.frombuffer(data, dtype=np.uint8)
+
+    data_blocks = []
+    ec_blocks = []
+    offset = 0
+    for block in blocks:
+        block_data = data[offset:offset + block.data_count]
+        offset += block.data_count
+        data_blocks.append(block_data)
+        ec_blocks.append(reed_solomon_remainder(block_data, block.total_count - block.data_count))
+
+    return np.concatenate([_interleave(data_blocks), _interleave(ec_blocks)])
+
+def _interleave(blocks: List[np.ndarray]) -> np.ndarray:
+    """Interleave codewords column-wise across blocks of possibly unequal length"""
+    longest = max(len(block) for block in blocks)
+    grid = np.full((len(blocks), longest), -1, dtype=np.int16)
+    for index, block in enumerate(blocks):
+        grid[index, :len(block)] = block
+    flat = grid.T.ravel()
+    return flat[flat >= 0].astype(np.uint8)
+
+def _bch_remainder(value: int, generator: int) -> int:
+    """Remainder of value modulo a BCH generator polynomial over GF(2)"""
+    generator_degree = generator.bit_length() - 1
+    while value.bit_length() - 1 >= generator_degree:
+        value ^= generator << (value.bit_length() - 1 - generator_degree)
+    return value
+
+def format_bits(error_correction: int, mask: int) -> int:
+    """15-bit format information for an error correction level and mask"""
+    data = (error_correction << 3) | mask
+    return ((data << 10) | _bch_remainder(data << 10, FORMAT_GENERATOR)) ^ FORMAT_MASK
+
+def version_bits(version: int) -> int:
+    """18-bit version information"""
+    return (version << 12) | _bch_remainder(version << 12, VERSION_GENERATOR)
+
+@lru_cache(maxsize=None)
+def _format_positions(size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Coordinates of the two copies of the format bits, indexed by bit number"""
+    vertical = [(i if i < 6 else i + 1 if i < 8 else size - 15 + i, 8) for i in range(15)]
+    horizontal = [(8, size - i - 1 if i < 8 else 15 - i if i < 9 else 15 - i - 1) for i in range(15)]
+    vertical_rows, vertical_cols = np.array(vertical).T
+    horizontal_rows, horizontal_cols = np.array(horizontal).T
+    return (np.concatenate([vertical_rows, horizontal_rows]),
+            np.concatenate([vertical_cols, horizontal_cols]),
+            np.arange(30) % 15,
+            np.array([size - 8, 8]))
+
+@lru_cache(maxsize=None)
+def _version_positions(size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Coordinates of the two copies of the version bits, indexed by bit number"""
+    bits = np.arange(18)
+    rows = np.concatenate([bits // 3, bits % 3 + size - 11])
+    cols = np.concatenate([bits % 3 + size - 11, bits // 3])
+    return rows, cols, np.concatenate([bits, bits])
+
+@lru_cache(maxsize=None)
+def function_template(version: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Function patterns for a version.
+
+    Returns the module values and a mask of reserved (non-data) modules. Format
+    and version areas are reserved but left light, which is also how masks are
+    evaluated.
+    """
+    size = version * 4 + 17
+    modules = np.zeros((size, size), dtype=bool)
+    reserved = np.zeros((size, size), dtype=bool)
+
+    # Finder patterns with their separators
+    finder = np.zeros((9, 9), dtype=bool)
+    finder[1:8, 1:8] = True
+    finder[2:7, 2:7] = False
+    finder[3:6, 3:6] = True
+    for row, col in ((0, 0), (size - 7, 0), (0, size - 7)):
+        top, left = max(row - 1, 0), max(col - 1, 0)
+        bottom, right = min(row + 8, size), min(col + 8, size)
+        modules[top:bottom, left:right] = finder[top - row + 1:bottom - row + 1, left - col + 1:right - col + 1]
+        reserved[top:bottom, left:right] = True
+
+    # Alignment patterns, skipping any that overlap the finders
+    alignment = np.ones((5, 5), dtype=bool)
+    alignment[1:4, 1:4] = False
+    alignment[2, 2] = True
+    positions = util.pattern_position(version)
+    for row in positions:
+        for col in positions:
+            if reserved[row, col]:
+                continue
+            modules[row - 2:row + 3, col - 2:col + 3] = alignment
+            reserved[row - 2:row + 3, col - 2:col + 3] = True
+
+    # Timing patterns
+    timing = np.arange(8, size - 8)
+    free_rows = ~reserved[timing, 6]
+    modules[timing[free_rows], 6] = timing[free_rows] % 2 == 0
+    reserved[timing[free_rows], 6] = True
+    free_cols = ~reserved[6, timing]
+    modules[6, timing[free_cols]] = timing[free_cols] % 2 == 0
+    reserved[6, timing[free_cols]] = True
+
+    format_rows, format_cols, _, _ = _format_positions(size)
+    reserved[format_rows, format_cols] = True
+    reserved[size - 8, 8] = True
+
+    if version >= 7:
+        version_rows, version_cols, _ = _version_positions(size)
+        reserved[version_rows, version_cols] = True
+
+    modules.flags.writeable = False
+    reserved.flags.writeable = False
+    return modules, reserved
+
+@lru_cache(maxsize=None)
+def data_positions(version: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Coordinates of data modules in placement order (upwards/downwards column pairs)"""
+    size = version * 4 + 17
+    _, reserved = function_template(version)
+    rows: List[int] = []
+    cols: List[int] = []
+    upwards = True
+    for right in range(size - 1, 0, -2):
+        if right <= 6:
+            right -= 1
+        row_order = range(size - 1, -1, -1) if upwards else range(size)
+        for row in row_order:
+            for col in (right, right - 1):
+                if not reserved[row, col]:
+                    rows.append(row)
+                    cols.append(col)
+        upwards = not upwards
+    return np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)
+
+@lru_cache(maxsize=None)
+def mask_patterns(size: int) -> np.ndarray:
+    """All eight mask patterns for a symbol size, shape (8, size, size)"""
+    i, j = np.indices((size, size))
+    masks = np.stack([
+        (i + j) % 2 == 0,
+        i % 2 == 0,
+        j % 3 == 0,
+        (i + j) % 3 == 0,
+        (i // 2 + j // 3) % 2 == 0,
+        (i * j) % 2 + (i * j) % 3 == 0,
+        ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+        ((i * j) % 3 + (i + j) % 2) % 2 == 0,
+    ])
+    masks.flags.writeable = False
+    return masks
+
+def mask_penalties(candidates: np.ndarray) -> np.ndarray:
+    """Penalty scores for a stack of candidate symbols, shape (masks, size, size)"""
+    count, size, _ = candidates.shape
+    lines = np.concatenate([candidates, candidates.transpose(0, 2, 1)], axis=1)
+
+    # Rule 1: runs of five or more same-colored modules score length - 2.
+    # Boundaries are marked per line, with sentinels at both ends of each line.
+    boundaries = np.ones((count, 2 * size, size + 1), dtype=bool)
+    boundaries[:, :, 1:-1] = lines[:, :, 1:] != lines[:, :, :-1]
+    flat = np.flatnonzero(boundaries.ravel())
+    run_lengths = np.diff(flat)
+    run_masks = flat[:-1] // (2 * size * (size + 1))
+    long_runs = run_lengths >= 5
+    penalties = np.bincount(
+        run_masks[long_runs], weights=run_lengths[long_runs] - 2, minlength=count
+    ).astype(np.int64)
+
+    # Rule 2: each 2x2 block of one color scores 3
+    top_left = candidates[:, :-1, :-1]
+    blocks = (
+        (top_left == candidates[:, 1:, :-1])
+        & (top_left == candidates[:, :-1, 1:])
+        & (top_left == candidates[:, 1:, 1:])
+    )
+    penalties += 3 * blocks.sum(axis=(1, 2))
+
+    # Rule 3: finder-like 1:1:3:1:1 patterns with a light run on one side score 40
+    if size >= 11:
+        windows = sliding_window_view(lines, 11, axis=2)
+        matches = (windows == FINDER_PATTERNS[0]).all(axis=-1) | (windows == FINDER_PATTERNS[1]).all(axis=-1)
+        penalties += 40 * matches.sum(axis=(1, 2))
+
+    # Rule 4: every 5% the dark ratio departs from 50% scores 10
+    dark_counts = candidates.sum(axis=(1, 2))
+    for index, dark_count in enumerate(dark_counts):
+        percent = float(dark_count) / (size ** 2)
+        penalties[index] += int(abs(percent * 100 - 50) / 5) * 10
+
+    return penalties
+
+def encode_segments(segments: List[Tuple[str, str]], version: int, error_correction: int) -> np.ndarray:
+    """Encode segments into a boolean module matrix without a border"""
+    size = version * 4 + 17
+    template, reserved = function_template(version)
+    rows, cols = data_positions(version)
+
+    data = codewords(segments, version, error_correction)
+    bits = np.zeros(len(rows), dtype=bool)
+    data_bits = np.unpackbits(data).astype(bool)
+    bits[:len(data_bits)] = data_bits[:len(rows)]
+
+    unmasked = template.copy()
+    unmasked[rows, cols] = bits
+
+    # Evaluate all eight masks at once, with format and version areas light
+    masks = mask_patterns(size)
+    data_area = ~reserved
+    candidates = unmasked[np.newaxis] ^ (masks & data_area)
+    mask = int(np.argmin(mask_penalties(candidates)))
+
+    matrix = candidates[mask].copy()
+
+    format_rows, format_cols, format_index, dark_module = _format_positions(size)
+    bits_value = format_bits(error_correction, mask)
+    matrix[format_rows, format_cols] = (bits_value >> format_index) & 1 == 1
+    matrix[dark_module[0], dark_module[1]] = True
+
+    if version >= 7:
+        version_rows, version_cols, version_index = _version_positions(size)
+        matrix[version_rows, version_cols] = (version_bits(version) >> version_index) & 1 == 1
+
+    return matrix
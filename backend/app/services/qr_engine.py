@@ -0,0 +1,121 @@
+import io
+import qrcode
+import numpy as np
+from PIL import Image, ImageColor
+from qrcode import util
+from typing import Any, Dict, List, Tuple
+from app.services.qr_encoder import encode_segments
+from app.services.qr_segments import MODE_INDICATORS, choose_segments, describe_segments, total_bits
+from app.services.render_cache import RenderCache
+
+class QREngine:
+    """Two-stage QR engine: cached module-matrix encoding, then vectorized rasterization"""
+
+    BACKENDS = ("native", "qrcode")
+
+    def __init__(self, matrix_cache_entries: int = 2048, backend: str = "native", allow_kanji: bool = False):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown QR encoder backend '{backend}'")
+        self.backend = backend
+        # The qrcode library cannot write kanji segments
+        self.allow_kanji = allow_kanji and backend == "native"
+        # A version 40 matrix is 177x177 booleans (~31KB), so the byte bound
+        # only matters for very large entry counts.
+        self.matrix_cache = RenderCache(
+            max_entries=matrix_cache_entries,
+            max_bytes=matrix_cache_entries * 177 * 177,
+        )
+
+    def encode(self, content: str, error_correction: int) -> np.ndarray:
+        """Stage one: encode content into a boolean module matrix without a border"""
+        return self.encode_symbol(content, error_correction)[0]
+
+    def symbol_info(self, content: str, error_correction: int) -> Dict[str, Any]:
+        """Version and per-segment breakdown of the symbol encoded for content"""
+        return self.encode_symbol(content, error_correction)[1]
+
+    def encode_symbol(self, content: str, error_correction: int) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """Encode content with optimal mode segmentation, returning the matrix and its symbol info"""
+        key = (content, error_correction)
+        symbol = self.matrix_cache.get(key)
+        if symbol is not None:
+            return symbol
+
+        version, segments = choose_segments(content, error_correction, self.allow_kanji)
+        if self.backend == "native":
+            matrix = encode_segments(segments, version, error_correction)
+        else:
+            matrix = self._encode_with_qrcode(segments, version, error_correction)
+        matrix.flags.writeable = False
+        info = {
+            "version": version,
+            "modules": matrix.shape[0],
+            "data_bits": total_bits(segments, version),
+            "capacity_bits": util.BIT_LIMIT_TABLE[error_correction][version],
+            "segments": describe_segments(segments, version),
+            "backend": self.backend,
+        }
+        symbol = (matrix, info)
+        self.matrix_cache.put(key, symbol, matrix.nbytes)
+        return symbol
+
+    def _encode_with_qrcode(self, segments: List[Tuple[str, str]], version: int, error_correction: int) -> np.ndarray:
+        """Encode segments through the qrcode library"""
+        qr = qrcode.QRCode(
+            version=version,
+            error_correction=error_correction,
+            box_size=1,
+            border=0,
+        )
+        for mode, text in segments:
+            qr.add_data(util.QRData(text.encode("utf-8"), mode=MODE_INDICATORS[mode], check_data=False))
+        qr.make(fit=False)
+        return np.array(qr.modules, dtype=bool)
+
+    def rasterize(self, matrix: np.ndarray, box_size: int, border: int,
+                  foreground_color: str, background_color: str) -> Image.Image:
+        """Stage two: scale the module matrix, add the quiet zone and apply colors"""
+        return self.rasterize_indexed(matrix, box_size, border, foreground_color, background_color).convert("RGB")
+
+    def rasterize_indexed(self, matrix: np.ndarray, box_size: int, border: int,
+                          foreground_color: str, background_color: str) -> Image.Image:
+        """Rasterize to a two-entry palette image (index 0 is the background)"""
+        padded = np.pad(matrix, border, mode="constant", constant_values=False)
+        scaled = padded.view(np.uint8).repeat(box_size, axis=0).repeat(box_size, axis=1)
+
+        # The scaled matrix is used directly as a two-entry palette index plane,
+        # so PIL applies the colors in C without an intermediate RGB array.
+        image = Image.frombuffer("P", (scaled.shape[1], scaled.shape[0]), scaled, "raw", "P", 0, 1)
+        image.putpalette(self._parse_color(background_color) + self._parse_color(foreground_color))
+        return image
+
+    def encode_image(self, image: Image.Image, image_format: str = "png", profile: str = "rgb",
+                     compress_level: int = 6) -> bytes:
+        """
+        Encode a rasterized image.
+
+        profile selects the stored pixel format: "mono" (1-bit grayscale),
+        "palette" (the image's own palette, which PIL writes 1 bit deep for two
+        entries) or "rgb". compress_level runs from 0 (fastest) to 9 (smallest)
+        and maps onto the WebP effort settings; WebP method 5 and 6 are left out
+        as they cost two orders of magnitude more time for no gain on QR codes.
+        """
+        if profile == "mono":
+            image = image.convert("L").convert("1", dither=Image.Dither.NONE)
+        elif profile == "rgb" or image.mode not in ("P", "1"):
+            image = image.convert("RGB")
+
+        buffer = io.BytesIO()
+        if image_format == "webp":
+            image.save(
+                buffer, format="WEBP", lossless=True,
+                quality=round(compress_level * 100 / 9), method=1 + compress_level // 3
+            )
+        else:
+            image.save(buffer, format="PNG", compress_level=compress_level)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _parse_color(color: str) -> Tuple[int, int, int]:
+        """Parse a CSS color string into an RGB tuple"""
+        return ImageColor.getrgb(color)[:3]
@@ -0,0 +1,160 @@
+from typing import Dict, List, Optional, Tuple
+from qrcode import util
+
+NUMERIC = "numeric"
+ALPHANUMERIC = "alphanumeric"
+BYTE = "byte"
+KANJI = "kanji"
+
+MODE_INDICATORS = {
+    NUMERIC: util.MODE_NUMBER,
+    ALPHANUMERIC: util.MODE_ALPHA_NUM,
+    BYTE: util.MODE_8BIT_BYTE,
+    KANJI: util.MODE_KANJI,
+}
+
+# Character count indicator widths for versions 1-9, 10-26 and 27-40
+CHAR_COUNT_BITS = {
+    NUMERIC: (10, 12, 14),
+    ALPHANUMERIC: (9, 11, 13),
+    BYTE: (8, 16, 16),
+    KANJI: (8, 10, 12),
+}
+
+VERSION_GROUPS = ((1, 9), (10, 26), (27, 40))
+
+ALPHANUMERIC_CHARS = frozenset("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:")
+
+def _kanji_code(char: str) -> Optional[int]:
+    """Shift JIS double-byte code of char if it can be encoded in kanji mode"""
+    try:
+        encoded = char.encode("shift_jis")
+    except UnicodeEncodeError:
+        return None
+    if len(encoded) != 2:
+        return None
+    code = (encoded[0] << 8) | encoded[1]
+    if 0x8140 <= code <= 0x9FFC or 0xE040 <= code <= 0xEBBF:
+        return code
+    return None
+
+def _char_cost(mode: str, char: str) -> Optional[int]:
+    """Cost of one character in a mode, in sixths of a bit, or None if unsupported"""
+    if mode == BYTE:
+        return len(char.encode("utf-8")) * 8 * 6
+    if mode == ALPHANUMERIC:
+        return 33 if char in ALPHANUMERIC_CHARS else None
+    if mode == NUMERIC:
+        return 20 if "0" <= char <= "9" else None
+    if mode == KANJI:
+        return 78 if _kanji_code(char) is not None else None
+    return None
+
+def segment_bits(mode: str, text: str, version: int) -> int:
+    """Exact number of bits a segment occupies, including its header"""
+    group = _version_group(version)
+    header = 4 + CHAR_COUNT_BITS[mode][group]
+    length = len(text)
+    if mode == NUMERIC:
+        return header + 10 * (length // 3) + (0, 4, 7)[length % 3]
+    if mode == ALPHANUMERIC:
+        return header + 11 * (length // 2) + 6 * (length % 2)
+    if mode == KANJI:
+        return header + 13 * length
+    return header + 8 * len(text.encode("utf-8"))
+
+def _version_group(version: int) -> int:
+    """Index of the character count indicator group for a version"""
+    if version < 10:
+        return 0
+    if version < 27:
+        return 1
+    return 2
+
+def optimal_segments(text: str, version: int, allow_kanji: bool = False) -> List[Tuple[str, str]]:
+    """
+    Split text into (mode, text) segments with the minimum total bit length
+    for the character count widths used by version.
+
+    Dynamic programming over characters in sixths of a bit, so the 10/3-bit
+    numeric and 11/2-bit alphanumeric character costs stay integral.
+    """
+    if not text:
+        return []
+
+    modes = [BYTE, ALPHANUMERIC, NUMERIC] + ([KANJI] if allow_kanji else [])
+    group = _version_group(version)
+    head_costs = [(4 + CHAR_COUNT_BITS[mode][group]) * 6 for mode in modes]
+
+    # char_modes[position][state] is the mode the character at position is
+    # encoded in, for the cheapest prefix that leaves the encoder in state.
+    previous_costs = list(head_costs)
+    char_modes: List[List[int]] = []
+
+    for char in text:
+        # Extend an open segment of the same mode
+        extend_costs: List[Optional[int]] = []
+        for index, mode in enumerate(modes):
+            cost = _char_cost(mode, char)
+            extend_costs.append(None if cost is None else previous_costs[index] + cost)
+
+        costs = list(extend_costs)
+        encoded_in = [index if cost is not None else None for index, cost in enumerate(extend_costs)]
+
+        # Close the segment after this character (rounding up to whole bits)
+        # and open a new one in the target mode
+        for target, head_cost in enumerate(head_costs):
+            for source, cost in enumerate(extend_costs):
+                if cost is None:
+                    continue
+                switched = (cost + 5) // 6 * 6 + head_cost
+                if costs[target] is None or switched < costs[target]:
+                    costs[target] = switched
+                    encoded_in[target] = source
+
+        char_modes.append(encoded_in)
+        # Byte mode can encode any character, so every state is reachable
+        previous_costs = costs
+
+    state = min(range(len(modes)), key=lambda index: previous_costs[index])
+    char_mode_indexes = [0] * len(text)
+    for position in range(len(text) - 1, -1, -1):
+        state = char_modes[position][state]
+        char_mode_indexes[position] = state
+
+    segments: List[Tuple[str, str]] = []
+    for char, index in zip(text, char_mode_indexes):
+        mode = modes[index]
+        if segments and segments[-1][0] == mode:
+            segments[-1] = (mode, segments[-1][1] + char)
+        else:
+            segments.append((mode, char))
+    return segments
+
+def total_bits(segments: List[Tuple[str, str]], version: int) -> int:
+    """Total data bits for segments at a version"""
+    return sum(segment_bits(mode, text, version) for mode, text in segments)
+
+def choose_segments(text: str, error_correction: int,
+                    allow_kanji: bool = False) -> Tuple[int, List[Tuple[str, str]]]:
+    """
+    Pick the smallest version that fits text, with its optimal segmentation.
+
+    Segmentation depends on the character count widths, which change between
+    version groups, so each group is tried in order.
+    """
+    capacities = util.BIT_LIMIT_TABLE[error_correction]
+    for first, last in VERSION_GROUPS:
+        segments = optimal_segments(text, first, allow_kanji)
+        needed = total_bits(segments, first)
+        for version in range(first, last + 1):
+            if needed <= capacities[version]:
+                return version, segments
+    raise ValueError("Content is too long to fit in a QR code")
+
+def describe_segments(segments: List[Tuple[str, str]], version: int) -> List[Dict[str, object]]:
+    """Per-segment breakdown for response metadata"""
+    return [
+        {"mode": mode, "length": len(text), "bits": segment_bits(mode, text, version)}
+        for mode, text in segments
+    ]
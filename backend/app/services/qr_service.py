@@ -1,10 +1,25 @@
 import qrcode
 from PIL import Image, ImageDraw
 import base64
-import io
 import re
-from typing import Optional
+import time
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
 from app.models.qr_models import QRCodeRequest, ContactInfo, WiFiInfo, EmailInfo, SMSInfo
+from app.services.logo_service import LogoService
+from app.services.qr_engine import QREngine
+from app.services.render_cache import RenderCache
+from app.services.render_executor import render_executor
+from app.services.vector_writers import parse_color, render_svg, render_pdf
+
+MIME_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "pdf": "application/pdf",
+    "webp": "image/webp",
+}
+
+RASTER_FORMATS = ("png", "webp")
 
 class QRCodeService:
     def __init__(self):
@@ -14,59 +29,51 @@ class QRCodeService:
             box_size=10,
             border=4,
         )
+        self.render_cache = RenderCache(
+            max_entries=settings.QR_RENDER_CACHE_MAX_ENTRIES,
+            max_bytes=settings.QR_RENDER_CACHE_MAX_BYTES,
+        )
+        self.engine = QREngine(
+            matrix_cache_entries=settings.QR_MATRIX_CACHE_MAX_ENTRIES,
+            backend=settings.QR_ENCODER_BACKEND,
+            allow_kanji=settings.QR_ENCODER_KANJI,
+        )
+        self.logos = LogoService()
     
-    def generate_qr_code(self, request: QRCodeRequest, qr_id: str = None, image_url: str = None) -> dict:
+    def generate_qr_code(self, request: QRCodeRequest, qr_id: str = None, image_url: str = None,
+                         include_data: bool = True) -> dict:
         """Generate QR code based on the request parameters"""
         try:
-            # For content type, generate a link to the image
-            if request.qr_type == "content" and qr_id:
-                if image_url:
-                    # Use the backend URL for the image
-                    base_url = "https://quickqr-backend.onrender.com"
-                    formatted_content = f"{base_url}{image_url}"
-                else:
-                    # Fallback to view URL
-                    formatted_content = f"https://quickqr-frontend.onrender.com/view/{qr_id}"
-            else:
-                # Format content based on QR type
-                formatted_content = self._format_content(request.content, request.qr_type)
-            
-            # Create QR code
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=self._get_error_correction(request.error_correction),
-                box_size=request.size,
-                border=request.border,
+            formatted_content = self.format_qr_content(request, qr_id, image_url)
+            error_correction = self.error_correction_level(request)
+            symbol = self.engine.symbol_info(
+                formatted_content,
+                self._get_error_correction(error_correction)
             )
             
-            qr.add_data(formatted_content)
-            qr.make(fit=True)
-            
-            # Create image
-            img = qr.make_image(
-                fill_color=request.foreground_color,
-                back_color=request.background_color
-            )
-            
-            # Add logo if provided
-            if request.logo_url:
-                img = self._add_logo(img, request.logo_url)
-            
-            # Convert to base64
-            buffer = io.BytesIO()
-            img.save(buffer, format='PNG')
-            img_str = base64.b64encode(buffer.getvalue()).decode()
+            qr_code_data = None
+            encoding = None
+            if include_data:
+                data, encoding = self.render_with_stats(request, formatted_content)
+                img_str = base64.b64encode(data).decode()
+                qr_code_data = f"data:{self.media_type(request)};base64,{img_str}"
             
             return {
                 "success": True,
-                "qr_code_data": f"data:image/png;base64,{img_str}",
+                "qr_code_data": qr_code_data,
                 "qr_id": qr_id,
                 "view_url": f"https://quickqr-frontend.onrender.com/view/{qr_id}" if qr_id else None,
+                "render_key": self.render_key(request, formatted_content),
                 "metadata": {
                     "content": formatted_content,
                     "qr_type": request.qr_type,
                     "size": request.size,
-                    "error_correction": request.error_correction
+                    "error_correction": error_correction,
+                    "format": request.format,
+                    "logo_applied": self._draws_logo(request),
+                    "version": symbol["version"],
+                    "symbol": symbol,
+                    "encoding": encoding
                 }
             }
             
@@ -76,6 +83,195 @@ class QRCodeService:
                 "error": str(e)
             }
     
+    async def generate_qr_code_async(self, request: QRCodeRequest, qr_id: str = None, image_url: str = None,
+                                     include_data: bool = True) -> dict:
+        """Generate a QR code on the render pool configured for the "qr" stage"""
+        if render_executor.pool_for("qr") == "process":
+            return await render_executor.run(
+                "qr", generate_qr_code_in_worker, request.model_dump(mode="json"), qr_id, image_url, include_data
+            )
+        return await render_executor.run("qr", self.generate_qr_code, request, qr_id, image_url, include_data)
+    
+    async def render_bytes_async(self, request: QRCodeRequest, formatted_content: str) -> bytes:
+        """Render raw image bytes on the render pool configured for the "qr" stage"""
+        if render_executor.pool_for("qr") == "process":
+            return await render_executor.run(
+                "qr", render_bytes_in_worker, request.model_dump(mode="json"), formatted_content
+            )
+        return await render_executor.run("qr", self.render_bytes, request, formatted_content)
+    
+    def format_qr_content(self, request: QRCodeRequest, qr_id: str = None, image_url: str = None) -> str:
+        """Build the payload that gets encoded into the QR symbol"""
+        # For content type, generate a link to the image
+        if request.qr_type == "content" and qr_id:
+            if image_url:
+                # Use the backend URL for the image
+                base_url = "https://quickqr-backend.onrender.com"
+                return f"{base_url}{image_url}"
+            # Fallback to view URL
+            return f"https://quickqr-frontend.onrender.com/view/{qr_id}"
+        
+        # Format content based on QR type
+        return self._format_content(request.content, request.qr_type)
+    
+    def request_for_design(self, design, **overrides) -> QRCodeRequest:
+        """Rebuild the render request for a saved QR design"""
+        fields = {
+            "content": design.content,
+            "qr_type": design.qr_type,
+            "size": design.size,
+            "error_correction": design.error_correction,
+            "border": design.border,
+            "foreground_color": design.foreground_color,
+            "background_color": design.background_color,
+            "logo_url": design.logo_url,
+            "title": design.title,
+        }
+        fields.update(overrides)
+        return QRCodeRequest(**fields)
+    
+    def media_type(self, request: QRCodeRequest) -> str:
+        """MIME type of the rendered output for a request"""
+        return MIME_TYPES[getattr(request.format, "value", request.format)]
+    
+    def error_correction_level(self, request: QRCodeRequest) -> str:
+        """Requested error correction level, raised if a logo hides too many modules"""
+        level = getattr(request.error_correction, "value", request.error_correction)
+        if self._draws_logo(request):
+            return self.logos.error_correction_for(level)
+        return level
+    
+    def render_key(self, request: QRCodeRequest, formatted_content: str) -> str:
+        """Content-addressed key for a render of formatted_content with the request styling"""
+        return RenderCache.make_key(
+            formatted_content,
+            request.size,
+            request.border,
+            getattr(request.error_correction, "value", request.error_correction),
+            request.foreground_color.lower(),
+            request.background_color.lower(),
+            request.logo_url,
+            # Changes when the logo file is replaced in place
+            self.logos.fingerprint(request.logo_url),
+            getattr(request.format, "value", request.format),
+            self.output_profile(request),
+            self.compress_level(request),
+        )
+    
+    def output_profile(self, request: QRCodeRequest) -> Optional[str]:
+        """Resolve the pixel format a raster render is stored in"""
+        if request.format not in RASTER_FORMATS:
+            return None
+        # Logos add colors beyond the two-entry palette
+        if self._draws_logo(request):
+            return "rgb"
+        
+        profile = getattr(request.output_profile, "value", request.output_profile) or settings.QR_OUTPUT_PROFILE
+        if profile == "mono":
+            colors = {
+                parse_color(request.foreground_color),
+                parse_color(request.background_color)
+            }
+            # 1-bit grayscale can only hold pure black and white
+            if colors != {(0, 0, 0), (255, 255, 255)}:
+                return "palette"
+        if profile == "auto":
+            # A two-entry palette PNG is already 1 bit deep, and encodes
+            # smaller and faster than 1-bit grayscale
+            return "palette"
+        return profile
+    
+    def compress_level(self, request: QRCodeRequest) -> Optional[int]:
+        """Resolve the raster compression level"""
+        if request.format not in RASTER_FORMATS:
+            return None
+        if request.compression_level is not None:
+            return request.compression_level
+        return settings.QR_OUTPUT_COMPRESS_LEVEL
+    
+    def render_bytes(self, request: QRCodeRequest, formatted_content: str) -> bytes:
+        """Return the encoded image bytes for a render, reusing cached output when available"""
+        return self.render_with_stats(request, formatted_content)[0]
+    
+    def render_uncached(self, request: QRCodeRequest, formatted_content: str) -> bytes:
+        """
+        Return the encoded image bytes for a throwaway render, such as a
+        preview frame. Uses the matrix cache but never the output cache, so it
+        cannot evict renders that will be requested again.
+        """
+        return self._render(request, formatted_content)[0]
+    
+    def render_with_stats(self, request: QRCodeRequest, formatted_content: str) -> Tuple[bytes, Dict[str, Any]]:
+        """Return the encoded image bytes for a render along with its encoding profile, size and time"""
+        stats = {
+            "profile": self.output_profile(request),
+            "compression_level": self.compress_level(request),
+            "cached": False
+        }
+        
+        key = self.render_key(request, formatted_content) if settings.QR_RENDER_CACHE_ENABLED else None
+        data = self.render_cache.get(key) if key else None
+        if data is None:
+            data, encode_seconds = self._render(request, formatted_content)
+            stats["encode_ms"] = round(encode_seconds * 1000, 3)
+            if key:
+                self.render_cache.put(key, data, len(data))
+        else:
+            stats["cached"] = True
+            stats["encode_ms"] = 0.0
+        
+        stats["encoded_bytes"] = len(data)
+        return data, stats
+    
+    def _render(self, request: QRCodeRequest, formatted_content: str) -> Tuple[bytes, float]:
+        """Encode and render a QR code in the requested format, returning the bytes and encode time"""
+        matrix = self.engine.encode(
+            formatted_content,
+            self._get_error_correction(self.error_correction_level(request))
+        )
+        
+        started = time.perf_counter()
+        if request.format == "svg":
+            data = render_svg(
+                matrix, request.size, request.border,
+                request.foreground_color, request.background_color
+            )
+            return data, time.perf_counter() - started
+        if request.format == "pdf":
+            data = render_pdf(
+                matrix, request.size, request.border,
+                request.foreground_color, request.background_color
+            )
+            return data, time.perf_counter() - started
+        
+        img = self.engine.rasterize_indexed(
+            matrix,
+            box_size=request.size,
+            border=request.border,
+            foreground_color=request.foreground_color,
+            background_color=request.background_color
+        )
+        
+        # Add logo if provided
+        if self._draws_logo(request):
+            img = self._add_logo(img, request.logo_url, matrix.shape[0] * request.size, request.border * request.size)
+        
+        started = time.perf_counter()
+        data = self.engine.encode_image(
+            img,
+            getattr(request.format, "value", request.format),
+            self.output_profile(request),
+            self.compress_level(request)
+        )
+        return data, time.perf_counter() - started
+    
+    def cache_stats(self) -> dict:
+        """Get render cache counters"""
+        stats = self.render_cache.stats()
+        stats["enabled"] = settings.QR_RENDER_CACHE_ENABLED
+        stats["matrix_cache"] = self.engine.matrix_cache.stats()
+        return stats
+    
     def _format_content(self, content: str, qr_type: str) -> str:
         """Format content based on QR code type"""
         if qr_type == "url":
@@ -146,10 +342,17 @@ class QRCodeService:
         }
         return levels.get(level, qrcode.constants.ERROR_CORRECT_M)
     
-    def _add_logo(self, qr_image: Image.Image, logo_url: str) -> Image.Image:
-        """Add logo to QR code (placeholder implementation)"""
-        # In a real implementation, you'd download and add the logo
-        return qr_image
+    def _draws_logo(self, request: QRCodeRequest) -> bool:
+        """Whether a render of request gets a logo overlay (raster output with a servable logo)"""
+        return (
+            bool(request.logo_url)
+            and request.format in RASTER_FORMATS
+            and self.logos.fingerprint(request.logo_url) is not None
+        )
+    
+    def _add_logo(self, qr_image: Image.Image, logo_url: str, symbol_size: int, border_size: int) -> Image.Image:
+        """Add logo to the center of the QR code symbol"""
+        return self.logos.composite(qr_image, logo_url, symbol_size, border_size)
     
     def validate_url(self, url: str) -> bool:
         """Validate URL format"""
@@ -160,4 +363,35 @@ class QRCodeService:
             r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
             r'(?::\d+)?'  # optional port
             r'(?:/?|[/?]\S+)$', re.IGNORECASE)
-        return bool(url_pattern.match(url)) 
\ No newline at end of file
+        return bool(url_pattern.match(url))
+
+# Per-process service so each render worker keeps its own warm caches
+_worker_qr_service: Optional[QRCodeService] = None
+
+def _get_worker_qr_service() -> QRCodeService:
+    """Get the QR service owned by the current worker process"""
+    global _worker_qr_service
+    if _worker_qr_service is None:
+        _worker_qr_service = QRCodeService()
+    return _worker_qr_service
+
+def generate_qr_code_in_worker(request_data: dict, qr_id: str = None, image_url: str = None,
+                               include_data: bool = True) -> dict:
+    """Generate a QR code from a serialized request inside a pool worker"""
+    return _get_worker_qr_service().generate_qr_code(
+        QRCodeRequest(**request_data), qr_id, image_url, include_data
+    )
+
+def render_bytes_in_worker(request_data: dict, formatted_content: str) -> bytes:
+    """Render raw image bytes from a serialized request inside a pool worker"""
+    return _get_worker_qr_service().render_bytes(QRCodeRequest(**request_data), formatted_content)
+
+def render_uncached_in_worker(request_data: dict, formatted_content: str) -> bytes:
+    """Render raw image bytes without the output cache from a serialized request inside a pool worker"""
+    return _get_worker_qr_service().render_uncached(QRCodeRequest(**request_data), formatted_content)
+
+def render_file_in_worker(request_data: dict) -> bytes:
+    """Render the image file for a serialized, non-content request inside a pool worker"""
+    service = _get_worker_qr_service()
+    request = QRCodeRequest(**request_data)
+    return service.render_bytes(request, service.format_qr_content(request))
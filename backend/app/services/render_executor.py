@@ -0,0 +1,138 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from app.core.config import settings
+
+class RenderQueueFull(Exception):
+    """Raised when a render pool already has its maximum number of queued jobs"""
+
+class RenderExecutor:
+    """Runs CPU-bound render stages on bounded thread and process pools"""
+
+    POOLS = ("inline", "thread", "process")
+
+    def __init__(self):
+        self._executors: Dict[str, Optional[Executor]] = {"thread": None, "process": None}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats = {
+            pool: {"queued": 0, "waiting": 0, "active": 0, "completed": 0, "failed": 0, "rejected": 0}
+            for pool in self.POOLS
+        }
+
+    def workers(self, pool: str) -> int:
+        """Number of workers for a pool"""
+        if pool == "thread":
+            return settings.RENDER_THREAD_WORKERS
+        if pool == "process":
+            return settings.RENDER_PROCESS_WORKERS or os.cpu_count() or 1
+        return 1
+
+    def pool_for(self, stage: str) -> str:
+        """Pool configured for a render stage"""
+        pool = settings.RENDER_STAGE_POOLS.get(stage, "thread")
+        if pool not in self.POOLS:
+            raise ValueError(f"Unknown render pool '{pool}' for stage '{stage}'")
+        return pool
+
+    def _executor(self, pool: str) -> Executor:
+        """Lazily create the executor backing a pool"""
+        executor = self._executors[pool]
+        if executor is None:
+            if pool == "process":
+                executor = ProcessPoolExecutor(max_workers=self.workers(pool))
+            else:
+                executor = ThreadPoolExecutor(
+                    max_workers=self.workers(pool), thread_name_prefix="render"
+                )
+            self._executors[pool] = executor
+        return executor
+
+    def _semaphore(self, pool: str) -> asyncio.Semaphore:
+        """Semaphore limiting in-flight jobs to the pool's worker count"""
+        semaphore = self._semaphores.get(pool)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.workers(pool))
+            self._semaphores[pool] = semaphore
+        return semaphore
+
+    async def run(self, stage: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run fn for a render stage on its configured pool and await the result"""
+        return await self._run(stage, fn, args, kwargs, bounded=True)
+
+    async def run_waiting(self, stage: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Like run, but wait for a worker however many jobs are queued. For
+        callers that bound their own backlog, like windowed batches; their
+        jobs are counted as waiting and never fill the queue for run.
+        """
+        return await self._run(stage, fn, args, kwargs, bounded=False)
+
+    async def _run(self, stage: str, fn: Callable[..., Any], args: tuple, kwargs: Dict[str, Any],
+                   bounded: bool) -> Any:
+        """Run fn on the stage's pool, rejecting it when bounded and the queue is full"""
+        pool = self.pool_for(stage)
+        stats = self._stats[pool]
+
+        if pool == "inline":
+            stats["active"] += 1
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                stats["failed"] += 1
+                raise
+            finally:
+                stats["active"] -= 1
+            stats["completed"] += 1
+            return result
+
+        if bounded and stats["queued"] >= settings.RENDER_MAX_QUEUE_DEPTH:
+            stats["rejected"] += 1
+            raise RenderQueueFull(f"Render queue for the {pool} pool is full")
+
+        # Jobs wait here rather than inside the executor so the queue depth
+        # is observable and bounded.
+        counter = "queued" if bounded else "waiting"
+        stats[counter] += 1
+        try:
+            await self._semaphore(pool).acquire()
+        finally:
+            stats[counter] -= 1
+
+        stats["active"] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._executor(pool), functools.partial(fn, *args, **kwargs)
+            )
+        except Exception:
+            stats["failed"] += 1
+            raise
+        finally:
+            stats["active"] -= 1
+            self._semaphore(pool).release()
+
+        stats["completed"] += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-pool queue depth and job counters"""
+        return {
+            "stages": dict(settings.RENDER_STAGE_POOLS),
+            "max_queue_depth": settings.RENDER_MAX_QUEUE_DEPTH,
+            "pools": {
+                pool: {"workers": self.workers(pool), **counters}
+                for pool, counters in self._stats.items()
+            },
+        }
+
+    def shutdown(self):
+        """Stop all worker threads and processes"""
+        for pool, executor in self._executors.items():
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executors[pool] = None
+        self._semaphores.clear()
+
+render_executor = RenderExecutor()
@@ -0,0 +1,149 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from app.core.config import settings
+from app.services.database_service import DatabaseService
+
+class ScanEventQueue:
+    """
+    Buffers QR scan events in memory and writes them to qr_code_usage in
+    batches from a background task, so recording a scan never waits on the
+    database.
+
+    A flush starts when flush_batch_size events are waiting or
+    flush_interval seconds have passed. The buffer holds at most max_events;
+    scans arriving while it is full are dropped and counted rather than
+    slowing down the page being viewed. record() must be called from the
+    event loop the queue was started on.
+    """
+
+    def __init__(self,
+                 max_events: int = 10000,
+                 flush_batch_size: int = 500,
+                 flush_interval: float = 1.0):
+        self.max_events = max_events
+        self.flush_batch_size = flush_batch_size
+        self.flush_interval = flush_interval
+        self.db_service = DatabaseService()
+        self._buffer: List[Dict[str, Any]] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "recorded": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "flushes": 0,
+        }
+        self._last_error: Optional[str] = None
+        self._last_flush_ms = 0.0
+
+    def record(self,
+               qr_design_id: str,
+               ip_address: Optional[str] = None,
+               user_agent: Optional[str] = None,
+               referrer: Optional[str] = None,
+               location: Optional[str] = None) -> bool:
+        """Queue a scan event; returns False if it was dropped because the buffer is full"""
+        if len(self._buffer) >= self.max_events:
+            self._stats["dropped"] += 1
+            return False
+
+        self._buffer.append({
+            "id": str(uuid.uuid4()),
+            "qr_design_id": qr_design_id,
+            # Stamped now, not when the batch reaches the database
+            "scanned_at": datetime.now(timezone.utc),
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "referrer": referrer,
+            "location": location,
+        })
+        self._stats["recorded"] += 1
+        if len(self._buffer) >= self.flush_batch_size and self._wake is not None:
+            self._wake.set()
+        return True
+
+    def start(self):
+        """Start the background flusher on the running event loop"""
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flusher and write every event still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._buffer:
+            await self.flush()
+
+    async def _run(self):
+        """Flush whenever a batch fills up or the flush interval passes"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            while self._buffer:
+                await self.flush()
+                if len(self._buffer) < self.flush_batch_size:
+                    break
+
+    async def flush(self) -> int:
+        """Write up to one batch of buffered events and return how many were written"""
+        batch = self._buffer[:self.flush_batch_size]
+        if not batch:
+            return 0
+        del self._buffer[:len(batch)]
+
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as e:
+            # Lost events are counted; the flusher keeps going with the next batch
+            self._stats["failed"] += len(batch)
+            self._last_error = str(e)
+            return 0
+        finally:
+            self._last_flush_ms = (time.perf_counter() - started) * 1000
+            self._stats["flushes"] += 1
+
+        self._stats["written"] += len(batch)
+        return len(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        """Insert one batch in its own session, on a worker thread"""
+        from app.core.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            self.db_service.record_qr_usage_batch(db, batch)
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of buffer depth and event counters"""
+        return {
+            "buffered": len(self._buffer),
+            "max_events": self.max_events,
+            "flush_batch_size": self.flush_batch_size,
+            "flush_interval": self.flush_interval,
+            "running": self._task is not None,
+            **self._stats,
+            "last_flush_ms": round(self._last_flush_ms, 3),
+            "last_error": self._last_error,
+        }
+
+scan_event_queue = ScanEventQueue(
+    max_events=settings.SCAN_QUEUE_MAX_EVENTS,
+    flush_batch_size=settings.SCAN_FLUSH_BATCH_SIZE,
+    flush_interval=settings.SCAN_FLUSH_INTERVAL_SECONDS,
+)
@@ -1,15 +1,28 @@
 import os
 import uuid
-from PIL import Image, ImageDraw, ImageFont
+import hashlib
+import json
+from PIL import Image, ImageDraw
 from typing import Optional
 import textwrap
+from app.core.config import settings
+from app.services.disk_cache import DiskCache
+from app.services.font_registry import font_registry
+
+# Bump when layout changes alter the pixels of existing text images
+LAYOUT_VERSION = 1
+
+# Rendered text images can always be re-rendered from the database, so they
+# live in a size-bounded cache shared by every service instance
+content_image_cache = DiskCache(settings.CONTENT_DIR, settings.CONTENT_CACHE_MAX_BYTES)
 
 class TextToImageService:
     def __init__(self):
-        self.images_dir = "content"
-        os.makedirs(self.images_dir, exist_ok=True)
+        self.cache = content_image_cache
+        self.images_dir = self.cache.directory
         
         # Default font settings
+        self.font_face = "sans"
         self.default_font_size = 24
         self.default_font_color = (0, 0, 0)  # Black
         self.default_bg_color = (255, 255, 255)  # White
@@ -17,78 +30,111 @@ class TextToImageService:
         self.line_height = 30
         self.padding = 40
         
+    def text_image_hash(self,
+                        text: str,
+                        title: Optional[str] = None,
+                        description: Optional[str] = None,
+                        font_size: Optional[int] = None,
+                        font_color: Optional[tuple] = None,
+                        bg_color: Optional[tuple] = None) -> str:
+        """
+        Hash of everything that affects a text image's pixels, used as its file name
+        """
+        key = json.dumps([
+            LAYOUT_VERSION,
+            text,
+            title,
+            description,
+            font_registry.font_path(self.font_face),
+            font_size or self.default_font_size,
+            list(font_color or self.default_font_color),
+            list(bg_color or self.default_bg_color),
+            self.max_width,
+            self.line_height,
+            self.padding,
+        ])
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+    
+    def text_image_filename(self, content_hash: str) -> str:
+        """File name of the text image with a content hash"""
+        return f"{content_hash}_text.png"
+    
     def create_text_image(self, 
                          text: str, 
                          title: Optional[str] = None,
-                         description: Optional[str] = None,
-                         qr_id: str = None) -> str:
+                         description: Optional[str] = None) -> str:
         """
-        Create an image from text content and return the image path
+        Create an image from text content and return the image file name
         """
-        if not qr_id:
-            qr_id = str(uuid.uuid4())
-            
-        # Create the full content text
-        full_content = ""
-        if title:
-            full_content += f"Title: {title}\n\n"
-        if description:
-            full_content += f"Description: {description}\n\n"
-        full_content += text
-        
-        # Calculate image dimensions
-        lines = textwrap.wrap(full_content, width=50)  # Wrap text to 50 characters
-        text_height = len(lines) * self.line_height
-        image_height = text_height + (2 * self.padding)
-        
-        # Create image
-        image = Image.new('RGB', (self.max_width, image_height), self.default_bg_color)
-        draw = ImageDraw.Draw(image)
-        
-        # Try to use a default font, fallback to basic if not available
-        try:
-            # Try to use a system font
-            font = ImageFont.truetype("arial.ttf", self.default_font_size)
-        except:
-            try:
-                # Try DejaVu Sans
-                font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", self.default_font_size)
-            except:
-                # Fallback to default font
-                font = ImageFont.load_default()
-        
-        # Draw text
-        y_position = self.padding
-        for line in lines:
-            # Calculate text width for centering
-            bbox = draw.textbbox((0, 0), line, font=font)
-            text_width = bbox[2] - bbox[0]
-            x_position = (self.max_width - text_width) // 2
-            
-            draw.text((x_position, y_position), line, font=font, fill=self.default_font_color)
-            y_position += self.line_height
-        
-        # Save image
-        image_filename = f"{qr_id}_text.png"
-        image_path = os.path.join(self.images_dir, image_filename)
-        image.save(image_path, "PNG")
-        
-        return image_filename
+        return self.create_styled_text_image(
+            text, title, description,
+            font_size=self.default_font_size,
+            font_color=self.default_font_color,
+            bg_color=self.default_bg_color
+        )
     
     def create_styled_text_image(self, 
                                 text: str, 
                                 title: Optional[str] = None,
                                 description: Optional[str] = None,
-                                qr_id: str = None,
                                 font_size: int = 24,
                                 font_color: tuple = (0, 0, 0),
                                 bg_color: tuple = (255, 255, 255)) -> str:
         """
-        Create a styled image from text content with custom colors and font size
+        Create a styled image from text content with custom colors and font size.
+        Identical inputs share one file, which is only rendered the first time.
+        """
+        content_hash = self.text_image_hash(text, title, description, font_size, font_color, bg_color)
+        image_filename = self.text_image_filename(content_hash)
+        if self.cache.get(image_filename):
+            return image_filename
+        
+        self.write_text_image(image_filename, text, title, description, font_size, font_color, bg_color)
+        self.cache.add(image_filename)
+        return image_filename
+    
+    def write_text_image(self,
+                         image_filename: str,
+                         text: str,
+                         title: Optional[str] = None,
+                         description: Optional[str] = None,
+                         font_size: Optional[int] = None,
+                         font_color: Optional[tuple] = None,
+                         bg_color: Optional[tuple] = None) -> str:
+        """
+        Render a text image into the cache directory under image_filename.
+        Does not touch the cache index; on a process pool, run it through
+        write_text_image_in_worker, since the service's cache holds a lock.
+        """
+        image = self.render_text_image(
+            text, title, description,
+            font_size or self.default_font_size,
+            font_color or self.default_font_color,
+            bg_color or self.default_bg_color
+        )
+        
+        # Write under a temporary name so concurrent renders of the same
+        # content never expose a partial file
+        image_path = self.cache.path(image_filename)
+        temp_path = f"{image_path}.{uuid.uuid4().hex}.tmp"
+        image.save(temp_path, "PNG")
+        os.replace(temp_path, image_path)
+        return image_path
+    
+    def delete_text_image(self, image_filename: str) -> bool:
+        """Remove a text image from the cache"""
+        return self.cache.discard(image_filename)
+    
+    def render_text_image(self,
+                          text: str,
+                          title: Optional[str] = None,
+                          description: Optional[str] = None,
+                          font_size: int = 24,
+                          font_color: tuple = (0, 0, 0),
+                          bg_color: tuple = (255, 255, 255)) -> Image.Image:
+        """
+        Lay out content text as centered lines on an image
         """
-        if not qr_id:
-            qr_id = str(uuid.uuid4())
-            
         # Create the full content text
         full_content = ""
         if title:
@@ -98,36 +144,40 @@ class TextToImageService:
         full_content += text
         
         # Calculate image dimensions
-        lines = textwrap.wrap(full_content, width=50)
+        lines = textwrap.wrap(full_content, width=50)  # Wrap text to 50 characters
         text_height = len(lines) * self.line_height
         image_height = text_height + (2 * self.padding)
         
         # Create image
         image = Image.new('RGB', (self.max_width, image_height), bg_color)
         draw = ImageDraw.Draw(image)
-        
-        # Try to use a default font
-        try:
-            font = ImageFont.truetype("arial.ttf", font_size)
-        except:
-            try:
-                font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", font_size)
-            except:
-                font = ImageFont.load_default()
+        font = font_registry.get(self.font_face, font_size)
         
         # Draw text
         y_position = self.padding
         for line in lines:
-            bbox = draw.textbbox((0, 0), line, font=font)
-            text_width = bbox[2] - bbox[0]
+            # Line widths are cached, since the same lines recur across renders
+            text_width = font_registry.measure(line, self.font_face, font_size)
             x_position = (self.max_width - text_width) // 2
             
             draw.text((x_position, y_position), line, font=font, fill=font_color)
             y_position += self.line_height
         
-        # Save image
-        image_filename = f"{qr_id}_text.png"
-        image_path = os.path.join(self.images_dir, image_filename)
-        image.save(image_path, "PNG")
-        
-        return image_filename 
\ No newline at end of file
+        return image
+
+# Per-process service so each render worker keeps its own font caches
+_worker_text_to_image_service: Optional[TextToImageService] = None
+
+def _get_worker_text_to_image_service() -> TextToImageService:
+    """Get the text image service owned by the current worker process"""
+    global _worker_text_to_image_service
+    if _worker_text_to_image_service is None:
+        _worker_text_to_image_service = TextToImageService()
+    return _worker_text_to_image_service
+
+def write_text_image_in_worker(image_filename: str,
+                               text: str,
+                               title: Optional[str] = None,
+                               description: Optional[str] = None) -> str:
+    """Render a text image into the cache directory inside a pool worker"""
+    return _get_worker_text_to_image_service().write_text_image(image_filename, text, title, description)
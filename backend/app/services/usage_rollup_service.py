@@ -0,0 +1,239 @@
+import hashlib
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+from sqlalchemy import and_, desc
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.database_models import (
+    QRCodeUsage, QRUsageRollup, QRUsageRollupReferrer, QRUsageRollupVisitor
+)
+
+# Rollup granularities; "all" has a single bucket holding the design's totals
+PERIODS = ("hour", "day", "all")
+ALL_TIME_BUCKET = datetime(1970, 1, 1)
+PERIOD_STEPS = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+DEFAULT_SERIES_SPANS = {"hour": timedelta(hours=48), "day": timedelta(days=30)}
+
+# Referrer rollups are keyed by host to keep their cardinality low
+DIRECT_REFERRER = "(direct)"
+
+RollupKey = Tuple[str, str, datetime]
+
+def utc_naive(value: datetime) -> datetime:
+    """A datetime as naive UTC, the form rollup buckets are stored and compared in"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def bucket_start(value: datetime, period: str) -> datetime:
+    """Start of the rollup bucket containing a naive UTC time"""
+    if period == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    if period == "day":
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return ALL_TIME_BUCKET
+
+def referrer_host(referrer: Optional[str]) -> str:
+    """Host a scan was referred from, or DIRECT_REFERRER"""
+    if not referrer:
+        return DIRECT_REFERRER
+    host = urlparse(referrer).netloc or referrer
+    return host.lower()[:255]
+
+def visitor_hash(ip_address: str) -> str:
+    """Stable pseudonymous key for counting unique visitors"""
+    return hashlib.sha256(ip_address.encode("utf-8")).hexdigest()[:32]
+
+def upsert(db: Session, model):
+    """INSERT supporting ON CONFLICT for the session's database"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite_insert(model)
+    if dialect == "postgresql":
+        return postgresql_insert(model)
+    raise NotImplementedError(f"Usage rollups need SQLite or PostgreSQL, not {dialect}")
+
+class UsageRollupService:
+    """
+    Maintains per-design scan counts, unique visitors and referrers by hour,
+    day and all time, so usage statistics never scan qr_code_usage.
+    """
+
+    def apply(self, db: Session, events: Iterable[Dict[str, Any]]):
+        """
+        Fold usage events into the rollups. Runs in the caller's transaction,
+        so rollups commit together with the raw rows. Counters are bumped by
+        upserts in the database rather than read and written back, so
+        concurrent writers never lose increments or collide on new buckets.
+        """
+        scans: Dict[RollupKey, int] = Counter()
+        visitors: Dict[RollupKey, set] = defaultdict(set)
+        referrers: Dict[RollupKey, Counter] = defaultdict(Counter)
+
+        for event in events:
+            scanned_at = utc_naive(event.get("scanned_at") or datetime.now(timezone.utc))
+            ip_address = event.get("ip_address")
+            referrer = referrer_host(event.get("referrer"))
+            for period in PERIODS:
+                key = (event["qr_design_id"], period, bucket_start(scanned_at, period))
+                scans[key] += 1
+                if ip_address:
+                    visitors[key].add(visitor_hash(ip_address))
+                referrers[key][referrer] += 1
+
+        if not scans:
+            return
+
+        # A visitor is new to a bucket if this insert, not an earlier one, added
+        # it. Rows go in key order so concurrent batches lock them in the same
+        # order and cannot deadlock
+        new_visitors: Dict[RollupKey, int] = Counter()
+        visitor_rows = [
+            {"qr_design_id": key[0], "period": key[1], "bucket_start": key[2], "ip_hash": ip_hash}
+            for key, hashes in sorted(visitors.items())
+            for ip_hash in sorted(hashes)
+        ]
+        if visitor_rows:
+            statement = upsert(db, QRUsageRollupVisitor).on_conflict_do_nothing().returning(
+                QRUsageRollupVisitor.qr_design_id,
+                QRUsageRollupVisitor.period,
+                QRUsageRollupVisitor.bucket_start
+            )
+            for design_id, period, start in db.execute(statement, visitor_rows):
+                new_visitors[(design_id, period, utc_naive(start))] += 1
+
+        statement = upsert(db, QRUsageRollup)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["qr_design_id", "period", "bucket_start"],
+            set_={
+                "scans": QRUsageRollup.scans + statement.excluded.scans,
+                "unique_ips": QRUsageRollup.unique_ips + statement.excluded.unique_ips,
+            }
+        ), [
+            {"qr_design_id": key[0], "period": key[1], "bucket_start": key[2],
+             "scans": count, "unique_ips": new_visitors[key]}
+            for key, count in sorted(scans.items())
+        ])
+
+        statement = upsert(db, QRUsageRollupReferrer)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["qr_design_id", "period", "bucket_start", "referrer"],
+            set_={"scans": QRUsageRollupReferrer.scans + statement.excluded.scans}
+        ), [
+            {"qr_design_id": key[0], "period": key[1], "bucket_start": key[2],
+             "referrer": host, "scans": host_count}
+            for key, counts in sorted(referrers.items())
+            for host, host_count in sorted(counts.items())
+        ])
+
+    def backfill(self, db: Session, design_id: Optional[str] = None, batch_size: int = 5000) -> int:
+        """
+        Rebuild rollups from qr_code_usage, for one design or all of them, and
+        return how many events were folded in. Scans recorded while this runs
+        may be counted twice or lost, so run it with the app stopped.
+        """
+        for model in (QRUsageRollup, QRUsageRollupVisitor, QRUsageRollupReferrer):
+            query = db.query(model)
+            if design_id:
+                query = query.filter(model.qr_design_id == design_id)
+            query.delete(synchronize_session=False)
+        db.commit()
+
+        processed = 0
+        last_id = None
+        while True:
+            # Keyset pagination on the primary key; event order does not matter
+            query = db.query(
+                QRCodeUsage.id,
+                QRCodeUsage.qr_design_id,
+                QRCodeUsage.scanned_at,
+                QRCodeUsage.ip_address,
+                QRCodeUsage.referrer
+            )
+            if design_id:
+                query = query.filter(QRCodeUsage.qr_design_id == design_id)
+            if last_id is not None:
+                query = query.filter(QRCodeUsage.id > last_id)
+            rows = query.order_by(QRCodeUsage.id).limit(batch_size).all()
+            if not rows:
+                return processed
+
+            self.apply(db, (
+                {
+                    "qr_design_id": row.qr_design_id,
+                    "scanned_at": row.scanned_at,
+                    "ip_address": row.ip_address,
+                    "referrer": row.referrer,
+                }
+                for row in rows
+            ))
+            db.commit()
+            processed += len(rows)
+            last_id = rows[-1].id
+
+    def series_bounds(self, period: str,
+                      since: Optional[datetime] = None,
+                      until: Optional[datetime] = None) -> Tuple[datetime, datetime, int]:
+        """
+        First and last bucket of a time series and its number of points.
+        Raises ValueError for unknown periods and empty or oversized ranges.
+        """
+        if period not in PERIOD_STEPS:
+            raise ValueError(f"period must be one of: {', '.join(PERIOD_STEPS)}")
+        last = bucket_start(utc_naive(until or datetime.now(timezone.utc)), period)
+        first = bucket_start(utc_naive(since), period) if since else last - DEFAULT_SERIES_SPANS[period] + PERIOD_STEPS[period]
+        if first > last:
+            raise ValueError("since must not be after until")
+        points = (last - first) // PERIOD_STEPS[period] + 1
+        if points > settings.USAGE_MAX_SERIES_POINTS:
+            raise ValueError(f"Time range spans more than {settings.USAGE_MAX_SERIES_POINTS} {period} buckets")
+        return first, last, points
+
+    def get_usage(self, db: Session, design_id: str, period: str = "day",
+                  since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict[str, Any]:
+        """Totals, top referrers and a gap-filled time series for a design"""
+        first, last, points = self.series_bounds(period, since, until)
+
+        totals = db.query(QRUsageRollup).filter(and_(
+            QRUsageRollup.qr_design_id == design_id,
+            QRUsageRollup.period == "all",
+            QRUsageRollup.bucket_start == ALL_TIME_BUCKET
+        )).first()
+
+        top_referrers = db.query(QRUsageRollupReferrer).filter(and_(
+            QRUsageRollupReferrer.qr_design_id == design_id,
+            QRUsageRollupReferrer.period == "all"
+        )).order_by(desc(QRUsageRollupReferrer.scans)).limit(settings.USAGE_TOP_REFERRERS).all()
+
+        rows = {
+            utc_naive(row.bucket_start): row
+            for row in db.query(QRUsageRollup).filter(and_(
+                QRUsageRollup.qr_design_id == design_id,
+                QRUsageRollup.period == period,
+                QRUsageRollup.bucket_start >= first,
+                QRUsageRollup.bucket_start <= last
+            ))
+        }
+        series: List[Dict[str, Any]] = []
+        for index in range(points):
+            start = first + index * PERIOD_STEPS[period]
+            row = rows.get(start)
+            series.append({
+                "bucket_start": start.replace(tzinfo=timezone.utc),
+                "scans": row.scans if row else 0,
+                "unique_visitors": row.unique_ips if row else 0,
+            })
+
+        return {
+            "total_scans": totals.scans if totals else 0,
+            "unique_visitors": totals.unique_ips if totals else 0,
+            "top_referrers": [
+                {"referrer": row.referrer, "scans": row.scans} for row in top_referrers
+            ],
+            "period": period,
+            "series": series,
+        }
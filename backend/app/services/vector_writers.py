@@ -0,0 +1,151 @@
+import io
+import zlib
+import numpy as np
+from PIL import ImageColor
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+Rect = Tuple[int, int, int, int]
+
+def module_rects(matrix: np.ndarray) -> Iterator[Rect]:
+    """
+    Merge dark modules into rectangles (x, y, width, height) in module units.
+
+    Dark modules are first merged into horizontal runs per row, then runs with
+    the same start and width on consecutive rows are merged into one rectangle.
+    """
+    rows, cols = matrix.shape
+    open_rects: Dict[Tuple[int, int], int] = {}
+
+    for y in range(rows + 1):
+        runs = set()
+        if y < rows:
+            # Run boundaries are where the padded row changes value
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], matrix[y].view(np.uint8), [0]))))
+            runs = {(int(start), int(end - start)) for start, end in zip(edges[::2], edges[1::2])}
+
+        for run in list(open_rects):
+            if run not in runs:
+                start_y = open_rects.pop(run)
+                yield run[0], start_y, run[1], y - start_y
+
+        for run in runs:
+            open_rects.setdefault(run, y)
+
+def parse_color(color: str) -> Tuple[int, int, int]:
+    """Parse a CSS color string into an RGB tuple"""
+    return ImageColor.getrgb(color)[:3]
+
+def iter_svg(matrix: np.ndarray, box_size: int, border: int,
+             foreground_color: str, background_color: str) -> Iterator[str]:
+    """Stream an SVG document for a module matrix as text chunks"""
+    modules = matrix.shape[0] + 2 * border
+    pixels = modules * box_size
+    fg = "#%02x%02x%02x" % parse_color(foreground_color)
+    bg = "#%02x%02x%02x" % parse_color(background_color)
+
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" width="{pixels}" height="{pixels}" '
+        f'viewBox="0 0 {modules} {modules}" shape-rendering="crispEdges">\n'
+        f'<rect width="{modules}" height="{modules}" fill="{bg}"/>\n'
+        f'<path fill="{fg}" d="'
+    )
+
+    chunk: List[str] = []
+    for x, y, width, height in module_rects(matrix):
+        chunk.append(f"M{x + border} {y + border}h{width}v{height}h-{width}z")
+        if len(chunk) >= 256:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+    yield '"/>\n</svg>\n'
+
+def render_svg(matrix: np.ndarray, box_size: int, border: int,
+               foreground_color: str, background_color: str) -> bytes:
+    """Render a module matrix as an SVG document"""
+    return "".join(iter_svg(matrix, box_size, border, foreground_color, background_color)).encode("utf-8")
+
+class PDFWriter:
+    """Minimal PDF writer that emits each object as soon as it is written"""
+
+    def __init__(self, out: BinaryIO):
+        self.out = out
+        self.position = 0
+        self.offsets: List[Optional[int]] = []
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data: bytes):
+        self.out.write(data)
+        self.position += len(data)
+
+    def reserve(self) -> int:
+        """Reserve an object number to be written later"""
+        self.offsets.append(None)
+        return len(self.offsets)
+
+    def write_object(self, number: int, body: str):
+        """Write a non-stream object"""
+        self.offsets[number - 1] = self.position
+        self._write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+
+    def write_stream(self, number: int, data: bytes, entries: str = "", compress: bool = True):
+        """Write a stream object, Flate-compressed by default"""
+        if compress:
+            data = zlib.compress(data)
+            entries += " /Filter /FlateDecode"
+        self.offsets[number - 1] = self.position
+        self._write(f"{number} 0 obj\n<< /Length {len(data)}{entries} >>\nstream\n".encode("latin-1"))
+        self._write(data)
+        self._write(b"\nendstream\nendobj\n")
+
+    def close(self, root: int):
+        """Write the cross-reference table and trailer"""
+        xref = self.position
+        lines = [f"xref\n0 {len(self.offsets) + 1}\n", "0000000000 65535 f \n"]
+        lines.extend(f"{offset or 0:010d} 00000 n \n" for offset in self.offsets)
+        lines.append(
+            f"trailer\n<< /Size {len(self.offsets) + 1} /Root {root} 0 R >>\n"
+            f"startxref\n{xref}\n%%EOF\n"
+        )
+        self._write("".join(lines).encode("latin-1"))
+
+def pdf_color(color: str) -> str:
+    """PDF RGB color operands for a CSS color string"""
+    return " ".join(f"{channel / 255:.4g}" for channel in parse_color(color))
+
+def pdf_symbol_ops(matrix: np.ndarray) -> bytes:
+    """PDF path operators filling the dark modules of a matrix in module units"""
+    ops = [f"{x} {y} {width} {height} re" for x, y, width, height in module_rects(matrix)]
+    ops.append("f")
+    return "\n".join(ops).encode("latin-1")
+
+def render_pdf(matrix: np.ndarray, box_size: int, border: int,
+               foreground_color: str, background_color: str) -> bytes:
+    """Render a module matrix as a single-page vector PDF"""
+    modules = matrix.shape[0] + 2 * border
+    points = modules * box_size
+
+    buffer = io.BytesIO()
+    writer = PDFWriter(buffer)
+    catalog, pages, page, content = (writer.reserve() for _ in range(4))
+
+    # Flip the y axis and scale so that one unit is one module
+    stream = b"\n".join([
+        f"{pdf_color(background_color)} rg 0 0 {points} {points} re f".encode("latin-1"),
+        f"{pdf_color(foreground_color)} rg".encode("latin-1"),
+        f"{box_size} 0 0 {-box_size} {border * box_size} {points - border * box_size} cm".encode("latin-1"),
+        pdf_symbol_ops(matrix),
+    ])
+
+    writer.write_object(catalog, f"<< /Type /Catalog /Pages {pages} 0 R >>")
+    writer.write_object(pages, f"<< /Type /Pages /Kids [{page} 0 R] /Count 1 >>")
+    writer.write_object(
+        page,
+        f"<< /Type /Page /Parent {pages} 0 R /MediaBox [0 0 {points} {points}] "
+        f"/Contents {content} 0 R /Resources << >> >>"
+    )
+    writer.write_stream(content, stream)
+    writer.close(catalog)
+    return buffer.getvalue()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Usage rollup backfill script for QuickQR
+Rebuilds the per-design hourly, daily and all-time scan rollups from the raw
+qr_code_usage rows. Run it once after upgrading, with the app stopped:
+
+    python backfill_usage_rollups.py                 # all designs
+    python backfill_usage_rollups.py --design-id ID  # one design
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.append(str(Path(__file__).parent))
+
+from app.core.database import SessionLocal, create_tables
+from app.services.usage_rollup_service import UsageRollupService
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild usage rollups from recorded scans")
+    parser.add_argument("--design-id", help="only rebuild this design's rollups")
+    parser.add_argument("--batch-size", type=int, default=5000, help="scans folded in per transaction")
+    args = parser.parse_args()
+
+    # Make sure the rollup tables exist
+    create_tables()
+
+    db = SessionLocal()
+    try:
+        print("Backfilling usage rollups...")
+        started = time.perf_counter()
+        processed = UsageRollupService().backfill(db, args.design_id, args.batch_size)
+        print(f"✅ Folded {processed} scans into rollups in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error backfilling usage rollups: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+SQLite concurrency benchmark for QuickQR
+Measures content lookup throughput (the /view read path) with a growing number
+of reader processes, for each SQLite profile, while a background writer keeps
+recording scan batches the way the scan queue does. Each worker is a process
+with its own engines, like a server worker; --threads runs them as threads of
+one process instead, where the GIL caps throughput at about one core:
+
+    python benchmark_database.py                       # both profiles, 1-16 workers
+    python benchmark_database.py --workers 1,4 --duration 5
+    python benchmark_database.py --no-writer           # reads only
+    python benchmark_database.py --threads             # workers share one process
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.append(str(Path(__file__).parent))
+
+from sqlalchemy import insert
+from app.core.database import SQLITE_PROFILES, create_engines, create_session_factory, create_tables
+from app.models.database_models import ContentData, QRDesign
+from app.services.database_service import DatabaseService
+
+# Scans per second recorded by the writer
+SCAN_RATE = 1000
+
+def populate(path: str, designs: int):
+    """Create a migrated database holding designs content QR codes"""
+    engine, _ = create_engines(f"sqlite:///{path}")
+    create_tables(engine)
+    with engine.begin() as connection:
+        for start in range(0, designs, 5000):
+            rows = [
+                {"id": str(uuid.uuid4()), "content": f"Benchmark content {index}", "qr_type": "content",
+                 "title": f"Benchmark design {index}", "is_active": True}
+                for index in range(start, min(start + 5000, designs))
+            ]
+            connection.execute(insert(QRDesign), rows)
+            connection.execute(insert(ContentData), [
+                {"id": str(uuid.uuid4()), "qr_design_id": row["id"], "content_type": "text",
+                 "text_content": row["content"]}
+                for row in rows
+            ])
+    engine.dispose()
+
+def open_database(path: str, profile: str):
+    """Engines and a session factory for a profile, as the app would open them"""
+    writer, reader = create_engines(f"sqlite:///{path}", profile)
+    return writer, reader, create_session_factory(writer, reader)
+
+def read_designs(session_factory, design_ids, seed: int, ready, stop) -> dict:
+    """Look up random content QR codes until stop is set, timing each lookup"""
+    db_service = DatabaseService()
+    rng = random.Random(seed)
+    latencies, errors = [], 0
+
+    def lookup():
+        db = session_factory()
+        try:
+            db_service.get_qr_design_with_content(db, rng.choice(design_ids))
+        finally:
+            db.close()
+
+    # Open a connection and warm the caches before the clock starts
+    try:
+        lookup()
+    except Exception:
+        errors += 1
+    ready.wait()
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            lookup()
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+    return {"latencies": latencies, "writes": 0, "errors": errors}
+
+def record_scans(session_factory, design_ids, seed: int, ready, stop) -> dict:
+    """
+    Record batches of 100 scans, the way the scan queue flushes them, at
+    SCAN_RATE scans per second until stop is set. A fixed rate keeps the
+    write load the same for every profile, however fast it commits.
+    """
+    db_service = DatabaseService()
+    rng = random.Random(seed)
+    writes, errors = 0, 0
+    ready.wait()
+    next_batch = time.perf_counter()
+    while not stop.is_set():
+        delay = next_batch - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        next_batch += 100 / SCAN_RATE
+        events = [
+            {"id": str(uuid.uuid4()), "qr_design_id": rng.choice(design_ids),
+             "scanned_at": datetime.now(timezone.utc), "ip_address": f"10.0.0.{rng.randint(1, 254)}"}
+            for _ in range(100)
+        ]
+        db = session_factory()
+        try:
+            writes += db_service.record_qr_usage_batch(db, events)
+        except Exception:
+            db.rollback()
+            errors += 1
+        finally:
+            db.close()
+    return {"latencies": [], "writes": writes, "errors": errors}
+
+def process_worker(task, path: str, profile: str, design_ids, seed: int, ready, stop, results):
+    """Run a reader or writer task in its own process, with its own engines"""
+    writer, reader, session_factory = open_database(path, profile)
+    try:
+        results.put(task(session_factory, design_ids, seed, ready, stop))
+    finally:
+        writer.dispose()
+        reader.dispose()
+
+def run(path: str, profile: str, design_ids, workers: int, duration: float, writer: bool, threads: bool) -> dict:
+    """Run workers readers (and the writer) for duration seconds"""
+    tasks = [(read_designs, worker) for worker in range(workers)]
+    if writer:
+        tasks.append((record_scans, -1))
+
+    if threads:
+        # Workers share one set of engines, like the request threads of one app process
+        writer_engine, reader_engine, session_factory = open_database(path, profile)
+        ready, stop, results = threading.Barrier(len(tasks) + 1), threading.Event(), queue.Queue()
+
+        def thread_worker(task, seed: int):
+            results.put(task(session_factory, design_ids, seed, ready, stop))
+
+        runners = [threading.Thread(target=thread_worker, args=(task, seed)) for task, seed in tasks]
+    else:
+        # A process per worker, like running the app with several server workers
+        context = multiprocessing.get_context()
+        ready, stop, results = context.Barrier(len(tasks) + 1), context.Event(), context.Queue()
+        runners = [
+            context.Process(target=process_worker, args=(task, path, profile, design_ids, seed, ready, stop, results))
+            for task, seed in tasks
+        ]
+
+    for runner in runners:
+        runner.start()
+    ready.wait()
+    time.sleep(duration)
+    stop.set()
+    outcomes = [results.get() for _ in runners]
+    for runner in runners:
+        runner.join()
+    if threads:
+        writer_engine.dispose()
+        reader_engine.dispose()
+
+    samples = sorted(latency for outcome in outcomes for latency in outcome["latencies"])
+    return {
+        "reads_per_second": len(samples) / duration,
+        "p50_ms": samples[len(samples) // 2] * 1000 if samples else 0.0,
+        "p99_ms": samples[int(len(samples) * 0.99)] * 1000 if samples else 0.0,
+        "writes_per_second": sum(outcome["writes"] for outcome in outcomes) / duration,
+        "errors": sum(outcome["errors"] for outcome in outcomes),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SQLite read throughput under concurrency")
+    parser.add_argument("--designs", type=int, default=20000, help="designs in the benchmark database")
+    parser.add_argument("--workers", default="1,2,4,8,16", help="comma-separated reader worker counts")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per run")
+    parser.add_argument("--profiles", default=",".join(SQLITE_PROFILES), help="comma-separated SQLite profiles")
+    parser.add_argument("--no-writer", action="store_true", help="do not record scans while reading")
+    parser.add_argument("--threads", action="store_true", help="run workers as threads of one process")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="quickqr-bench-")
+    try:
+        template = os.path.join(workdir, "template.db")
+        print(f"Creating benchmark database with {args.designs} designs...")
+        populate(template, args.designs)
+
+        for profile in args.profiles.split(","):
+            # Every profile starts from the same rollback-journal database file
+            path = os.path.join(workdir, f"{profile}.db")
+            shutil.copyfile(template, path)
+            writer, _, _ = open_database(path, profile)
+            with writer.connect() as connection:
+                design_ids = [row[0] for row in connection.exec_driver_sql("SELECT id FROM qr_designs")]
+            writer.dispose()
+
+            print(f"\n📊 Profile: {profile}{'' if args.no_writer else ' (with scan writer)'}")
+            print(f"{'workers':>8} {'reads/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'writes/s':>9} {'errors':>7}")
+            for workers in (int(value) for value in args.workers.split(",")):
+                result = run(path, profile, design_ids, workers, args.duration, not args.no_writer, args.threads)
+                print(
+                    f"{workers:>8} {result['reads_per_second']:>10.0f} {result['p50_ms']:>8.2f} "
+                    f"{result['p99_ms']:>8.2f} {result['writes_per_second']:>9.0f} {result['errors']:>7}"
+                )
+    except Exception as e:
+        print(f"❌ Error running benchmark: {e}")
+        sys.exit(1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Blob garbage collection script for QuickQR
+Reconciles stored files against DesignImage/ContentData rows and removes files
+no active design references. Run it periodically, e.g. from cron:
+
+    python gc_blobs.py            # delete orphaned files
+    python gc_blobs.py --dry-run  # only report what would be deleted
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the current directory to Python path
+sys.path.append(str(Path(__file__).parent))
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.blob_store import upload_store
+from app.services.database_service import DatabaseService
+from app.services.text_to_image_service import content_image_cache
+
+def collect_uploads(db, db_service: DatabaseService, cutoff: float, dry_run: bool) -> dict:
+    """Delete uploaded blobs that no active design references"""
+    if dry_run:
+        print("Skipping image rows of deleted designs (dry run)")
+    else:
+        removed_rows = db_service.delete_inactive_design_images(db)
+        print(f"Removed {removed_rows} image rows of deleted designs")
+
+    referenced = db_service.get_referenced_upload_filenames(db)
+    stats = {"kept": 0, "deleted": 0, "deleted_bytes": 0, "recent": 0}
+    stored = set()
+    for name, size, modified in upload_store.iter_blobs():
+        stored.add(name)
+        if name in referenced:
+            stats["kept"] += 1
+        elif modified > cutoff:
+            # May belong to an upload whose row is not committed yet
+            stats["recent"] += 1
+        else:
+            stats["deleted"] += 1
+            stats["deleted_bytes"] += size
+            if not dry_run:
+                upload_store.delete(name)
+
+    stats["missing"] = len(referenced - stored)
+    if stats["missing"]:
+        print(f"⚠️  {stats['missing']} referenced uploads have no stored file")
+
+    if hasattr(upload_store, "iter_temp_files"):
+        for path, modified in upload_store.iter_temp_files():
+            if modified <= cutoff and not dry_run:
+                os.remove(path)
+    return stats
+
+def collect_text_images(db, db_service: DatabaseService, dry_run: bool) -> dict:
+    """Delete cached text images that no active design references"""
+    referenced = db_service.get_referenced_text_image_filenames(db)
+    stats = {"kept": 0, "deleted": 0, "deleted_bytes": 0}
+    for name, size, _ in list(content_image_cache.store.iter_blobs()):
+        if name in referenced:
+            stats["kept"] += 1
+        else:
+            stats["deleted"] += 1
+            stats["deleted_bytes"] += size
+            if not dry_run:
+                content_image_cache.discard(name)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Remove stored files no active design references")
+    parser.add_argument("--dry-run", action="store_true", help="report without deleting anything")
+    parser.add_argument(
+        "--grace-seconds",
+        type=int,
+        default=settings.BLOB_GC_GRACE_SECONDS,
+        help="keep unreferenced uploads younger than this",
+    )
+    args = parser.parse_args()
+
+    db_service = DatabaseService()
+    db = SessionLocal()
+    try:
+        print(f"Collecting uploads ({settings.BLOB_STORE_BACKEND} store)...")
+        uploads = collect_uploads(db, db_service, time.time() - args.grace_seconds, args.dry_run)
+        print(
+            f"📦 Uploads: kept {uploads['kept']}, deleted {uploads['deleted']} "
+            f"({uploads['deleted_bytes']} bytes), skipped {uploads['recent']} recent"
+        )
+
+        print("Collecting text images...")
+        text_images = collect_text_images(db, db_service, args.dry_run)
+        print(
+            f"🖼️  Text images: kept {text_images['kept']}, deleted {text_images['deleted']} "
+            f"({text_images['deleted_bytes']} bytes)"
+        )
+
+        if args.dry_run:
+            print("\nDry run: nothing was deleted.")
+    except Exception as e:
+        print(f"❌ Error collecting blobs: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ sys.path.append(str(Path(__file__).parent))
 
 from app.core.database import create_tables, engine
 from app.models.database_models import Base
+from sqlalchemy import text
 
 def init_database():
     """Initialize the database by creating all tables"""
@@ -40,8 +41,12 @@ def reset_database():
     print("Resetting QuickQR database...")
     
     try:
-        # Drop all tables
+        # Drop all tables, including those created outside the models by
+        # migrations, and the migration version so they are recreated
         Base.metadata.drop_all(bind=engine)
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE IF EXISTS qr_designs_fts"))
+            connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
         print("🗑️  All tables dropped.")
         
         # Create all tables
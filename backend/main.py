@@ -1,10 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import uvicorn
-from app.api.routes import qr_router, ai_router, content_router
+from app.api.routes import qr_router, ai_router, content_router, media_router
 from app.core.config import settings, get_port
 from app.core.database import create_tables
+from app.services.render_executor import render_executor
+from app.services.font_registry import font_registry
+from app.services.scan_event_queue import scan_event_queue
 from app.models.database_models import Base
 
 # Create FastAPI app instance
@@ -29,21 +31,21 @@ app.add_middleware(
 app.include_router(qr_router, prefix="/api/v1/qr", tags=["QR Codes"])
 app.include_router(ai_router, prefix="/api/v1/ai", tags=["AI Features"])
 app.include_router(content_router, prefix="/api/v1", tags=["Content"])
-
-# Mount static files for content images and uploads
-import os
-
-# Create directories if they don't exist
-os.makedirs("content", exist_ok=True)
-os.makedirs("uploads", exist_ok=True)
-
-app.mount("/content", StaticFiles(directory="content"), name="content")
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.include_router(media_router, tags=["Content"])
 
 # Initialize database tables
 @app.on_event("startup")
 async def startup_event():
     create_tables()
+    # Load the text image font before the first content render needs it
+    font_registry.warm([24])
+    scan_event_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Write buffered scans before the process exits
+    await scan_event_queue.stop()
+    render_executor.shutdown()
 
 @app.get("/")
 async def root():
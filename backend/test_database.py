@@ -3,6 +3,9 @@
 Test script to verify database functionality
 """
 
+import os
+import re
+import sys
 import requests
 import json
 
@@ -89,11 +92,266 @@ def test_search_designs():
         print(f"Error: {response.text}")
     print()
 
+def test_query_plans():
+    """Check that DatabaseService queries use indexes (EXPLAIN QUERY PLAN on an in-memory SQLite database)"""
+    print("Testing query plans...")
+    os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+    from datetime import datetime, timezone
+    from sqlalchemy import event
+    from app.core.database import engine, SessionLocal, create_tables
+    from app.models.qr_models import QRCodeRequest
+    from app.services.database_service import DatabaseService
+    from app.services.pagination import encode_cursor
+    
+    create_tables()
+    service = DatabaseService()
+    db = SessionLocal()
+    design_id = service.create_qr_design(db, QRCodeRequest(content="https://example.com", qr_type="url")).id
+    service.save_content_data(db, design_id, "text", "text", "0" * 32 + "_text.png", None, "0" * 32)
+    event_row = {"id": "e1", "qr_design_id": design_id, "scanned_at": datetime.now(timezone.utc), "ip_address": "127.0.0.1"}
+    
+    statements = []
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+    
+    # Queries that read whole tables on purpose: blob GC listings
+    full_scans = {"get_referenced_upload_filenames", "get_referenced_text_image_filenames"}
+    checks = [
+        ("get_qr_design", lambda: service.get_qr_design(db, design_id)),
+        ("get_qr_designs", lambda: service.get_qr_designs(db, [design_id])),
+        ("get_existing_design_ids", lambda: service.get_existing_design_ids(db, [design_id])),
+        ("get_all_qr_designs", lambda: service.get_all_qr_designs(db)),
+        ("get_all_qr_designs (keyset)", lambda: service.get_all_qr_designs(db, after_id=design_id)),
+        ("get_content_data", lambda: service.get_content_data(db, design_id)),
+        ("get_qr_design_with_content", lambda: service.get_qr_design_with_content(db, design_id)),
+        ("get_qr_designs_with_content", lambda: service.get_qr_designs_with_content(db)),
+        ("get_content_data_for_image", lambda: service.get_content_data_for_image(db, "0" * 32 + "_text.png")),
+        ("get_content_data_for_image (legacy)", lambda: service.get_content_data_for_image(db, design_id + "_text.png")),
+        ("count_content_hash_references", lambda: service.count_content_hash_references(db, "0" * 32)),
+        ("get_design_images", lambda: service.get_design_images(db, design_id)),
+        ("count_upload_references", lambda: service.count_upload_references(db, "missing.png")),
+        ("delete_inactive_design_images", lambda: service.delete_inactive_design_images(db)),
+        ("record_qr_usage_batch", lambda: service.record_qr_usage_batch(db, [event_row])),
+        ("get_qr_usage_stats", lambda: service.get_qr_usage_stats(db, design_id)),
+        ("search_qr_designs", lambda: service.search_qr_designs(db, "example")),
+        ("search_qr_designs_page (keyset)", lambda: service.search_qr_designs_page(
+            db, "example", cursor=encode_cursor({"after": design_id, "rank": 0.0}))),
+        ("get_referenced_upload_filenames", lambda: service.get_referenced_upload_filenames(db)),
+        ("get_referenced_text_image_filenames", lambda: service.get_referenced_text_image_filenames(db)),
+    ]
+    
+    failures = 0
+    for name, call in checks:
+        statements.clear()
+        call()
+        captured = list(statements)
+        scans = []
+        with engine.connect() as connection:
+            for statement, parameters in captured:
+                plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+                scans.extend(row[-1] for row in plan if re.match(r"SCAN (?!CONSTANT ROW)(?!.*VIRTUAL TABLE INDEX)", row[-1]))
+        if name in full_scans:
+            print(f"  ⏭️  {name}: full scan expected")
+        elif scans:
+            failures += 1
+            print(f"  ❌ {name}: {'; '.join(scans)}")
+        else:
+            print(f"  ✅ {name}: {len(captured)} queries use indexes")
+    
+    event.remove(engine, "before_cursor_execute", capture)
+    db.close()
+    print()
+    return failures == 0
+
+def test_query_counts():
+    """Lock in how many SQL statements each read endpoint issues (in-memory SQLite, no server)"""
+    print("Testing query counts...")
+    os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from app.core.database import engine
+    from main import app
+    
+    # Statements per request; raise these only together with a reason
+    expected = {
+        "GET /api/v1/view/{id}": 1,
+        "GET /api/v1/content/{id}": 1,
+        "GET /api/v1/qr/designs": 1,
+        "GET /api/v1/qr/designs/{id}": 1,
+        "GET /api/v1/qr/designs/{id}/usage": 5,
+    }
+    
+    statements = []
+    commits = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    def count_commit(conn):
+        commits.append(conn)
+    
+    failures = 0
+    with TestClient(app) as client:
+        event.listen(engine, "before_cursor_execute", capture)
+        event.listen(engine, "commit", count_commit)
+        
+        # Generating a content QR inserts the design and its content in one
+        # transaction, then reads the content back once
+        response = client.post("/api/v1/qr/generate", json={
+            "content": "Query count check", "qr_type": "content", "title": "Counted"
+        })
+        design_id = response.json()["qr_id"]
+        if response.status_code != 200 or len(statements) != 3 or len(commits) != 1:
+            failures += 1
+            print(f"  ❌ POST /api/v1/qr/generate: {len(statements)} queries and {len(commits)} commits, expected 3 and 1")
+        else:
+            print("  ✅ POST /api/v1/qr/generate: 3 queries, 1 commit")
+        event.remove(engine, "commit", count_commit)
+        
+        for endpoint, count in expected.items():
+            statements.clear()
+            response = client.get(endpoint.split(" ", 1)[1].replace("{id}", design_id))
+            captured = list(statements)
+            if response.status_code != 200:
+                failures += 1
+                print(f"  ❌ {endpoint}: status {response.status_code}")
+            elif len(captured) != count:
+                failures += 1
+                print(f"  ❌ {endpoint}: {len(captured)} queries, expected {count}")
+                for statement in captured:
+                    print(f"      {' '.join(statement.split())[:120]}")
+            else:
+                print(f"  ✅ {endpoint}: {count} queries")
+        event.remove(engine, "before_cursor_execute", capture)
+    
+    print()
+    return failures == 0
+
+def test_blob_gc():
+    """Check that blob GC keeps uploads referenced only as a design logo (in-memory SQLite, temporary store)"""
+    print("Testing blob GC...")
+    os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+    import tempfile
+    import time
+    import gc_blobs
+    from app.core.database import SessionLocal, create_tables
+    from app.models.qr_models import QRCodeRequest
+    from app.services.blob_store import LocalBlobStore
+    from app.services.database_service import DatabaseService
+    
+    create_tables()
+    service = DatabaseService()
+    db = SessionLocal()
+    store = LocalBlobStore(tempfile.mkdtemp(prefix="quickqr-gc-"))
+    store.put("logo.png", b"logo")
+    store.put("orphan.png", b"orphan")
+    service.create_qr_design(db, QRCodeRequest(content="https://example.com", qr_type="url", logo_url="/uploads/logo.png"))
+    
+    # Every blob is past the grace period
+    upload_store = gc_blobs.upload_store
+    gc_blobs.upload_store = store
+    try:
+        stats = gc_blobs.collect_uploads(db, service, time.time() + 60, dry_run=False)
+    finally:
+        gc_blobs.upload_store = upload_store
+        db.close()
+    
+    failures = 0
+    if not store.exists("logo.png"):
+        failures += 1
+        print("  ❌ logo referenced through logo_url was deleted")
+    if store.exists("orphan.png"):
+        failures += 1
+        print("  ❌ unreferenced upload was kept")
+    if service.count_upload_references(SessionLocal(), "logo.png") != 1:
+        failures += 1
+        print("  ❌ count_upload_references does not count logos")
+    if not failures:
+        print(f"  ✅ kept {stats['kept']} logo upload, deleted {stats['deleted']} orphan")
+    print()
+    return failures == 0
+
+def test_encoder_parity():
+    """Check that the native encoder's matrices are bit-identical to the qrcode library's"""
+    print("Testing encoder parity...")
+    import numpy as np
+    from qrcode import constants
+    from app.services.qr_engine import QREngine
+    from app.services.qr_segments import choose_segments
+    
+    native = QREngine(matrix_cache_entries=1, backend="native")
+    reference = QREngine(matrix_cache_entries=1, backend="qrcode")
+    levels = {
+        "L": constants.ERROR_CORRECT_L,
+        "M": constants.ERROR_CORRECT_M,
+        "Q": constants.ERROR_CORRECT_Q,
+        "H": constants.ERROR_CORRECT_H,
+    }
+    # Repeating units for each mode, and one mixing all three
+    alphabets = {
+        "numeric": "0123456789",
+        "alphanumeric": "QUICKQR $%*+-./:",
+        "byte": "quickqr.example/ünïcode?",
+        "mixed": "https://quickqr.example/v/12345678901234567890?ref=ABCDEF",
+    }
+    
+    def fits(text, error_correction, version):
+        try:
+            return choose_segments(text, error_correction)[0] <= version
+        except ValueError:
+            return False
+    
+    def longest(alphabet, error_correction, version):
+        """Longest prefix of the repeated alphabet that fits in version"""
+        low, high = 1, 8000
+        while low < high:
+            middle = (low + high + 1) // 2
+            text = (alphabet * (middle // len(alphabet) + 1))[:middle]
+            if fits(text, error_correction, version):
+                low = middle
+            else:
+                high = middle - 1
+        return (alphabet * (low // len(alphabet) + 1))[:low + 1]
+    
+    failures = 0
+    checked = 0
+    for level, error_correction in levels.items():
+        for name, alphabet in alphabets.items():
+            # The last length of each version on either side of the character
+            # count width changes (9/10, 26/27), plus the smallest and largest symbols
+            texts = [alphabet[:1]]
+            for version in (1, 9, 10, 26, 27):
+                text = longest(alphabet, error_correction, version)
+                texts += [text[:-1], text]
+            texts.append(longest(alphabet, error_correction, 40)[:-1])
+            for text in texts:
+                expected = reference.encode(text, error_correction)
+                if not np.array_equal(native.encode(text, error_correction), expected):
+                    failures += 1
+                    print(f"  ❌ {level} {name} length {len(text)} (version {(expected.shape[0] - 17) // 4})")
+                checked += 1
+    
+    if not failures:
+        print(f"  ✅ {checked} symbols match the qrcode library")
+    print()
+    return failures == 0
+
 def main():
     """Run all tests"""
     print("🚀 QuickQR Database Test Suite")
     print("=" * 40)
     
+    # Query plans, query counts and encoder parity are checked locally and
+    # need no running server
+    checks = (test_query_plans, test_query_counts, test_blob_gc, test_encoder_parity)
+    if not all(check() for check in checks):
+        sys.exit(1)
+    if len(sys.argv) > 1 and sys.argv[1] == "plans":
+        return
+    
     # Test health
     test_health()
     
@@ -1,4 +1,4 @@
-import { useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { motion } from 'framer-motion'
 import { useForm } from 'react-hook-form'
 import toast from 'react-hot-toast'
@@ -12,7 +12,7 @@ import {
   CheckCircle
 } from 'lucide-react'
 import { QRCodeRequest, AISuggestionResponse } from '../types'
-import { qrCodeAPI, aiAPI } from '../services/api'
+import { qrCodeAPI, aiAPI, previewAPI } from '../services/api'
 import QRCodeForm from '../components/QRCodeForm'
 import QRCodePreview from '../components/QRCodePreview'
 import AISuggestions from '../components/AISuggestions'
@@ -20,6 +20,8 @@ import ColorPicker from '../components/ColorPicker'
 
 const GeneratorPage = () => {
   const [qrCodeData, setQrCodeData] = useState<string | null>(null)
+  const [previewData, setPreviewData] = useState<string | null>(null)
+  const previewChannel = useRef<ReturnType<typeof previewAPI.connect> | null>(null)
   const [isGenerating, setIsGenerating] = useState(false)
   const [aiSuggestions, setAiSuggestions] = useState<AISuggestionResponse | null>(null)
   const [showAdvanced, setShowAdvanced] = useState(false)
@@ -47,6 +49,37 @@ const GeneratorPage = () => {
 
   const watchedContent = watch('content')
   const watchedType = watch('qr_type')
+  const watchedSize = watch('size')
+  const watchedErrorCorrection = watch('error_correction')
+
+  // Live preview over WebSocket; previews are never saved
+  useEffect(() => {
+    const channel = previewAPI.connect((frame) => {
+      if (frame.success && frame.qr_code_data) {
+        setPreviewData(frame.qr_code_data)
+      }
+    })
+    previewChannel.current = channel
+    return () => channel.close()
+  }, [])
+
+  useEffect(() => {
+    // Edits after generating switch the preview back to live mode
+    setQrCodeData(null)
+    if (!watchedContent.trim()) {
+      setPreviewData(null)
+      return
+    }
+    previewChannel.current?.send({
+      content: watchedContent,
+      qr_type: watchedType,
+      size: Number(watchedSize),
+      error_correction: watchedErrorCorrection,
+      border: 4,
+      foreground_color: selectedColors.foreground,
+      background_color: selectedColors.background
+    })
+  }, [watchedContent, watchedType, watchedSize, watchedErrorCorrection, selectedColors])
 
   // Generate QR code
   const onSubmit = async (data: QRCodeRequest) => {
@@ -297,7 +330,7 @@ const GeneratorPage = () => {
               </h2>
               
               <QRCodePreview
-                qrCodeData={qrCodeData}
+                qrCodeData={qrCodeData ?? previewData}
                 isGenerating={isGenerating}
               />
 
@@ -1,5 +1,5 @@
 import axios from 'axios'
-import { QRCodeRequest, QRCodeResponse, AISuggestionRequest, AISuggestionResponse } from '../types'
+import { QRCodeRequest, QRCodeResponse, AISuggestionRequest, AISuggestionResponse, QRPreviewFrame } from '../types'
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'https://quickqr-backend.onrender.com/api/v1'
 
@@ -84,4 +84,31 @@ export const healthAPI = {
   },
 }
 
+export const previewAPI = {
+  // Open the live preview channel; only the newest pending frame is rendered
+  connect: (onFrame: (frame: QRPreviewFrame) => void) => {
+    const socket = new WebSocket(`${API_BASE_URL.replace(/^http/, 'ws')}/qr/preview`)
+    let seq = 0
+    let pending: string | null = null
+
+    socket.onopen = () => {
+      if (pending) socket.send(pending)
+      pending = null
+    }
+    socket.onmessage = (event) => onFrame(JSON.parse(event.data))
+
+    return {
+      send: (request: QRCodeRequest) => {
+        const message = JSON.stringify({ ...request, seq: ++seq })
+        if (socket.readyState === WebSocket.OPEN) {
+          socket.send(message)
+        } else {
+          pending = message
+        }
+      },
+      close: () => socket.close(),
+    }
+  },
+}
+
 export default api 
\ No newline at end of file
@@ -9,6 +9,9 @@ export interface QRCodeRequest {
   logo_url?: string
   title?: string
   description?: string
+  format?: OutputFormat
+  output_profile?: OutputProfile
+  compression_level?: number
 }
 
 export interface QRCodeResponse {
@@ -16,6 +19,7 @@ export interface QRCodeResponse {
   qr_code_data?: string
   qr_id?: string
   view_url?: string
+  image_url?: string
   error?: string
   metadata?: QRCodeMetadata
 }
@@ -25,6 +29,49 @@ export interface QRCodeMetadata {
   qr_type: QRCodeType
   size: number
   error_correction: ErrorCorrectionLevel
+  format?: OutputFormat
+  logo_applied?: boolean
+  version?: number
+  symbol?: QRSymbolInfo
+  encoding?: QREncodingInfo | null
+}
+
+export interface QRSymbolSegment {
+  mode: 'numeric' | 'alphanumeric' | 'byte' | 'kanji'
+  length: number
+  bits: number
+}
+
+export interface QRSymbolInfo {
+  version: number
+  modules: number
+  data_bits: number
+  capacity_bits: number
+  segments: QRSymbolSegment[]
+}
+
+export interface QREncodingInfo {
+  profile: OutputProfile | null
+  compression_level: number | null
+  cached: boolean
+  encode_ms: number
+  encoded_bytes: number
+}
+
+export interface QRPreviewFrame {
+  seq: number | null
+  success: boolean
+  qr_code_data?: string
+  error?: string
+  dropped: number
+  metadata?: {
+    content: string
+    size: number
+    error_correction: ErrorCorrectionLevel
+    version: number
+    modules: number
+    encoded_bytes: number
+  }
 }
 
 export interface AISuggestionRequest {
@@ -43,6 +90,10 @@ export type QRCodeType = 'url' | 'text' | 'contact' | 'wifi' | 'email' | 'phone'
 
 export type ErrorCorrectionLevel = 'L' | 'M' | 'Q' | 'H'
 
+export type OutputFormat = 'png' | 'svg' | 'pdf' | 'webp'
+
+export type OutputProfile = 'auto' | 'mono' | 'palette' | 'rgb'
+
 export interface QRCodeTypeOption {
   value: QRCodeType
   label: string